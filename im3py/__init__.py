@@ -9,6 +9,7 @@ License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
 
 from im3py.model import Model
 from im3py.install_supplement import InstallSupplement
+from im3py.progress import CancellationToken
 
 
-__all__ = ['Model', 'InstallSupplement']
+__all__ = ['Model', 'InstallSupplement', 'CancellationToken']
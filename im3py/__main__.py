@@ -0,0 +1,15 @@
+"""Run the `im3py` command line interface with `python -m im3py`.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import sys
+
+from im3py.cli import main
+
+
+sys.exit(main())
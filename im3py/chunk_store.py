@@ -0,0 +1,398 @@
+"""Chunked N-dimensional array store for ensemble results in a directory of NumPy chunk files.
+
+    <store>/array.json                  shape, chunk shape, dtype, compression, dimension names, and coordinates
+    <store>/chunks/<i>.<j>.<k>.npy      one chunk per file, optionally compressed with a registered codec
+
+Each chunk is written to a temporary file and renamed into place, so writers of disjoint chunks never need a lock
+and readers only ever see complete chunks.  Chunks that have not been written read as the fill value.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import io
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+from im3py.output_writer import atomic_write, get_codec
+
+
+# dimensions of ensemble results
+DIMENSIONS = ('member', 'step', 'variable')
+
+METADATA_FILE = 'array.json'
+CHUNKS_DIRECTORY = 'chunks'
+CHUNK_EXTENSION = '.npy'
+
+# target number of bytes in a chunk when no chunk shape is given
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+
+def default_chunks(shape, itemsize, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Chunk shape that keeps whole trailing dimensions and splits the leading dimension to about `chunk_bytes`."""
+
+    trailing = int(np.prod(shape[1:], dtype=np.int64)) * itemsize
+
+    leading = max(1, min(shape[0], chunk_bytes // max(trailing, 1))) if shape else 1
+
+    return (leading,) + tuple(max(1, i) for i in shape[1:])
+
+
+class ChunkStore:
+    """Lazily read and write an N-dimensional array stored as a grid of chunk files.
+
+    Indexing with integers and slices reads only the chunks that overlap the selection; uncompressed chunks are
+    memory mapped so only the selected part of each chunk is read from disk.  Writing a selection that covers whole
+    chunks writes them without reading; a selection that covers part of a chunk reads, updates, and rewrites the
+    chunk, so concurrent writers must write disjoint chunks.
+
+    :param store_directory:                     Full path to the directory of an existing store
+    :type store_directory:                      str
+
+    Examples:
+
+        >>> from im3py.chunk_store import ChunkStore
+        >>> store = ChunkStore("<store directory>")
+        >>> trajectory = store[3, :, 0]         # one member across all steps
+        >>> across_members = store[:, 10, 0]    # one step across all members
+
+    """
+
+    def __init__(self, store_directory):
+
+        self.store_directory = os.path.abspath(store_directory)
+
+        metadata_file = os.path.join(self.store_directory, METADATA_FILE)
+
+        if not os.path.isfile(metadata_file):
+            raise FileNotFoundError(f"'{store_directory}' is not a chunk store; '{METADATA_FILE}' does not exist.")
+
+        with open(metadata_file) as get:
+            self.metadata = json.load(get)
+
+        self.shape = tuple(self.metadata['shape'])
+        self.chunks = tuple(self.metadata['chunks'])
+        self.dtype = np.dtype(self.metadata['dtype'])
+        self.fill_value = self.metadata['fill_value']
+        self.dimensions = tuple(self.metadata['dimensions'])
+        self.coordinates = self.metadata.get('coordinates', {})
+        self.attributes = self.metadata.get('attributes', {})
+
+        compression = self.metadata.get('compression')
+        self.codec = None if compression is None else get_codec(compression)
+        self.level = self.metadata.get('level')
+
+    @classmethod
+    def create(cls, store_directory, shape, chunks=None, dtype='float64', fill_value=float('nan'),
+               dimensions=DIMENSIONS, coordinates=None, compression=None, level=None, attributes=None,
+               overwrite=False):
+        """Create an empty store.
+
+        :param store_directory:                 Full path to the directory of the store; created if needed
+        :type store_directory:                  str
+
+        :param shape:                           Shape of the array (e.g., (members, steps, variables))
+        :type shape:                            tuple
+
+        :param chunks:                          Optional.  Shape of each chunk; whole trailing dimensions and about
+                                                1 MB per chunk if None.
+        :type chunks:                           tuple
+
+        :param dtype:                           NumPy dtype of the array
+        :type dtype:                            str
+
+        :param fill_value:                      Value of elements in chunks that have not been written
+        :type fill_value:                       float
+
+        :param dimensions:                      Name of each dimension
+        :type dimensions:                       tuple
+
+        :param coordinates:                     Optional.  Dictionary of dimension name to a list of labels
+        :type coordinates:                      dict
+
+        :param compression:                     Optional.  Name of a registered codec used to compress each chunk
+        :type compression:                      str
+
+        :param level:                           Optional.  Compression level; the codec default if None.
+        :type level:                            int
+
+        :param attributes:                      Optional.  Dictionary of JSON serializable values stored with the array
+        :type attributes:                       dict
+
+        :param overwrite:                       Replace the metadata of an existing store; existing chunks are removed
+        :type overwrite:                        bool
+
+        :return:                                ChunkStore
+
+        """
+
+        shape = tuple(int(i) for i in shape)
+        dtype = np.dtype(dtype)
+        chunks = default_chunks(shape, dtype.itemsize) if chunks is None else tuple(int(i) for i in chunks)
+        dimensions = tuple(dimensions)[:len(shape)]
+
+        if len(chunks) != len(shape) or len(dimensions) != len(shape):
+            raise ValueError(f"Chunks {chunks} and dimensions {dimensions} must match the {len(shape)} dimensions of "
+                             f"shape {shape}.")
+
+        if any(i < 1 for i in chunks):
+            raise ValueError(f"Chunk sizes must be >= 1; received {chunks}.")
+
+        if compression is not None:
+            get_codec(compression)
+
+        coordinates = {k: list(v) for k, v in (coordinates or {}).items()}
+
+        for name, labels in coordinates.items():
+            if name not in dimensions or len(labels) != shape[dimensions.index(name)]:
+                raise ValueError(f"Coordinates of '{name}' do not match a dimension of shape {shape}.")
+
+        metadata_file = os.path.join(store_directory, METADATA_FILE)
+        chunks_directory = os.path.join(store_directory, CHUNKS_DIRECTORY)
+
+        if os.path.exists(metadata_file):
+
+            if not overwrite:
+                raise FileExistsError(f"Chunk store '{store_directory}' already exists.  Use `overwrite=True` to "
+                                      f"replace it.")
+
+            for name in os.listdir(chunks_directory):
+                os.remove(os.path.join(chunks_directory, name))
+
+        os.makedirs(chunks_directory, exist_ok=True)
+
+        metadata = {'shape': list(shape), 'chunks': list(chunks), 'dtype': dtype.str,
+                    'fill_value': np.asarray(fill_value, dtype=dtype).item(), 'dimensions': list(dimensions),
+                    'coordinates': coordinates, 'compression': compression, 'level': level,
+                    'attributes': attributes or {}}
+
+        atomic_write(metadata_file, json.dumps(metadata, indent=2).encode('utf-8'))
+
+        return cls(store_directory)
+
+    def __repr__(self):
+
+        return f"ChunkStore('{self.store_directory}', shape={self.shape}, chunks={self.chunks})"
+
+    def __len__(self):
+
+        return self.shape[0]
+
+    @property
+    def ndim(self):
+        """Number of dimensions."""
+
+        return len(self.shape)
+
+    @property
+    def grid(self):
+        """Number of chunks along each dimension."""
+
+        return tuple(math.ceil(s / c) for s, c in zip(self.shape, self.chunks))
+
+    def chunk_slices(self, index):
+        """Slices of the array covered by a chunk."""
+
+        return tuple(slice(i * c, min((i + 1) * c, s)) for i, c, s in zip(index, self.chunks, self.shape))
+
+    def chunk_shape(self, index):
+        """Shape of a chunk; chunks at the upper edge of a dimension may be smaller than `chunks`."""
+
+        return tuple(i.stop - i.start for i in self.chunk_slices(index))
+
+    def chunk_path(self, index):
+        """Full path to the file of a chunk."""
+
+        extension = CHUNK_EXTENSION if self.codec is None else CHUNK_EXTENSION + self.codec.extension
+
+        return os.path.join(self.store_directory, CHUNKS_DIRECTORY, '.'.join(str(i) for i in index) + extension)
+
+    def initialized_chunks(self):
+        """Indices of the chunks that have been written."""
+
+        directory = os.path.join(self.store_directory, CHUNKS_DIRECTORY)
+        indices = []
+
+        for name in os.listdir(directory):
+            if not name.startswith('.'):
+                indices.append(tuple(int(i) for i in name.split(CHUNK_EXTENSION)[0].split('.')))
+
+        return sorted(indices)
+
+    def read_chunk(self, index):
+        """Read a chunk; uncompressed chunks are returned as a read-only memory map.
+
+        :param index:                           Position of the chunk in the chunk grid
+        :type index:                            tuple
+
+        :return:                                numpy.ndarray
+
+        """
+
+        path = self.chunk_path(index)
+
+        if not os.path.isfile(path):
+            return np.full(self.chunk_shape(index), self.fill_value, dtype=self.dtype)
+
+        if self.codec is None:
+            return np.load(path, mmap_mode='r', allow_pickle=False)
+
+        with open(path, 'rb') as get:
+            data = self.codec.decompress(get.read())
+
+        return np.load(io.BytesIO(data), allow_pickle=False)
+
+    def write_chunk(self, index, data):
+        """Write a whole chunk.
+
+        :param index:                           Position of the chunk in the chunk grid
+        :type index:                            tuple
+
+        :param data:                            Values of the chunk with shape `chunk_shape(index)`
+        :type data:                             numpy.ndarray
+
+        """
+
+        index = tuple(int(i) for i in index)
+        data = np.asarray(data, dtype=self.dtype)
+
+        if len(index) != self.ndim or not all(0 <= i < n for i, n in zip(index, self.grid)):
+            raise IndexError(f"Chunk {index} is outside of the chunk grid {self.grid}.")
+
+        if data.shape != self.chunk_shape(index):
+            raise ValueError(f"Chunk {index} has shape {self.chunk_shape(index)}; received {data.shape}.")
+
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(data), allow_pickle=False)
+
+        content = buffer.getvalue()
+
+        if self.codec is not None:
+            content = self.codec.compress(content, self.level)
+
+        atomic_write(self.chunk_path(index), content)
+
+    def normalize_key(self, key):
+        """Convert an index of integers and slices to a (start, stop, step) range and a squeeze flag per dimension."""
+
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        if any(i is Ellipsis for i in key):
+            position = key.index(Ellipsis)
+            key = key[:position] + (slice(None),) * (self.ndim - len(key) + 1) + key[position + 1:]
+
+        if len(key) > self.ndim:
+            raise IndexError(f"Too many indices for a store with {self.ndim} dimensions.")
+
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        ranges = []
+
+        for item, size in zip(key, self.shape):
+
+            if isinstance(item, slice):
+                start, stop, step = item.indices(size)
+
+                if step < 1:
+                    raise IndexError("Chunk store slices must have a positive step.")
+
+                ranges.append((start, max(start, stop), step, False))
+
+            elif isinstance(item, (int, np.integer)):
+                position = int(item) + size if item < 0 else int(item)
+
+                if not 0 <= position < size:
+                    raise IndexError(f"Index {item} is out of bounds for a dimension of size {size}.")
+
+                ranges.append((position, position + 1, 1, True))
+
+            else:
+                raise TypeError(f"Chunk stores are indexed with integers and slices; received {type(item).__name__}.")
+
+        return ranges
+
+    def overlapping_chunks(self, ranges):
+        """Indices of the chunks that overlap a selection of (start, stop) ranges."""
+
+        spans = []
+
+        for (start, stop, _, _), c in zip(ranges, self.chunks):
+
+            if stop <= start:
+                return []
+
+            spans.append(range(start // c, (stop - 1) // c + 1))
+
+        return list(itertools.product(*spans))
+
+    def __getitem__(self, key):
+
+        ranges = self.normalize_key(key)
+
+        out = np.full(tuple(stop - start for start, stop, _, _ in ranges), self.fill_value, dtype=self.dtype)
+
+        for index in self.overlapping_chunks(ranges):
+
+            chunk = self.read_chunk(index)
+
+            source, target = [], []
+
+            for (start, stop, _, _), chunk_slice in zip(ranges, self.chunk_slices(index)):
+                low, high = max(start, chunk_slice.start), min(stop, chunk_slice.stop)
+                source.append(slice(low - chunk_slice.start, high - chunk_slice.start))
+                target.append(slice(low - start, high - start))
+
+            out[tuple(target)] = chunk[tuple(source)]
+
+        out = out[tuple(slice(None, None, step) for _, _, step, _ in ranges)]
+
+        return out.reshape(tuple(n for n, (_, _, _, squeeze) in zip(out.shape, ranges) if not squeeze))
+
+    def __setitem__(self, key, value):
+
+        ranges = self.normalize_key(key)
+
+        if any(step != 1 for _, _, step, _ in ranges):
+            raise IndexError("Chunk store writes require slices with a step of 1.")
+
+        region = tuple(stop - start for start, stop, _, _ in ranges)
+        value = np.broadcast_to(np.asarray(value, dtype=self.dtype),
+                                tuple(n for n, (_, _, _, squeeze) in zip(region, ranges) if not squeeze))
+        value = value.reshape(region)
+
+        for index in self.overlapping_chunks(ranges):
+
+            chunk_slices = self.chunk_slices(index)
+
+            source, target = [], []
+
+            for (start, stop, _, _), chunk_slice in zip(ranges, chunk_slices):
+                low, high = max(start, chunk_slice.start), min(stop, chunk_slice.stop)
+                source.append(slice(low - start, high - start))
+                target.append(slice(low - chunk_slice.start, high - chunk_slice.start))
+
+            covered = all(t.stop - t.start == s.stop - s.start for t, s in zip(target, chunk_slices))
+
+            if covered:
+                self.write_chunk(index, value[tuple(source)])
+
+            else:
+                chunk = np.array(self.read_chunk(index))
+                chunk[tuple(target)] = value[tuple(source)]
+                self.write_chunk(index, chunk)
+
+    def coordinate_index(self, dimension, label):
+        """Position of a coordinate label along a dimension (e.g., `coordinate_index('step', 2020)`)."""
+
+        try:
+            return self.coordinates[dimension].index(label)
+        except (KeyError, ValueError):
+            raise KeyError(f"'{label}' is not a coordinate of dimension '{dimension}'.")
@@ -0,0 +1,339 @@
+"""Command line interface for running batches of configurations in one warm process.
+
+    im3py run <config.yml> [<config.yml> ...] [--workers N] [--trace trace.json] [--dry-run]
+    im3py submit <queue directory> <config.yml> [<config.yml> ...]
+    im3py worker <queue directory> [--wait]
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import im3py.tracing as tracing
+from im3py.model import Model
+from im3py.resources import ResourceProbe
+from im3py.scenarios import ScenarioFile, is_scenario_config, read_config_data
+from im3py.work_queue import STATE_DONE, WorkQueue
+
+
+# extensions of configuration files found in directories
+CONFIG_EXTENSIONS = ('.yml', '.yaml')
+
+# status of each run in the summary table
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+
+def expand_configs(paths):
+    """Expand configuration files, directories of configuration files, and glob patterns into a list of files.
+
+    :param paths:                               Configuration files, directories, or glob patterns
+    :type paths:                                list
+
+    :return:                                    list; unique configuration files in the order given
+
+    """
+
+    config_files = []
+
+    for path in paths:
+
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, i) for i in os.listdir(path) if i.endswith(CONFIG_EXTENSIONS))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            raise FileNotFoundError(f"Configuration file '{path}' does not exist.")
+
+        config_files.extend(os.path.abspath(i) for i in matches if os.path.isfile(i))
+
+    config_files = list(dict.fromkeys(config_files))
+
+    if not config_files:
+        raise FileNotFoundError(f"No configuration files found in:  {paths}")
+
+    return config_files
+
+
+def expand_runs(config_files):
+    """Expand configuration files into runs; multi-scenario files give one run per scenario.
+
+    :param config_files:                        Full paths to configuration YAML files
+    :type config_files:                         list
+
+    :return:                                    list; (config file, scenario name or None) for each run
+
+    """
+
+    runs = []
+
+    for config_file in config_files:
+
+        if is_scenario_config(read_config_data(config_file)):
+            runs.extend((config_file, name) for name in ScenarioFile(config_file).names)
+        else:
+            runs.append((config_file, None))
+
+    return runs
+
+
+def run_config(config_file, kernel_backend='auto', scenario=None, incremental=False):
+    """Run the model for all steps of one configuration file and record the outcome.
+
+    Imports, compiled kernels, and parsed configuration files are kept by the process between calls, so only the
+    first run in a process pays their startup cost.
+
+    :param config_file:                         Full path to configuration YAML file
+    :type config_file:                          str
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :param scenario:                            Optional.  Scenario name for multi-scenario files.
+    :type scenario:                             str
+
+    :param incremental:                         Reuse the outputs of steps unchanged since the previous run
+    :type incremental:                          bool
+
+    :return:                                    dict; 'config', 'scenario', 'status', 'steps', 'seconds', and 'error'
+
+    """
+
+    td = time.perf_counter()
+
+    record = {'config': config_file, 'scenario': scenario or '', 'status': STATUS_COMPLETED, 'steps': 0,
+              'seconds': 0.0, 'error': ''}
+
+    try:
+        if scenario is None:
+            run = Model(config_file=config_file, kernel_backend=kernel_backend, incremental=incremental)
+        else:
+            run = ScenarioFile(config_file).model(scenario, kernel_backend=kernel_backend, incremental=incremental)
+
+        record['steps'] = len(run.step_list)
+        run.run_all_steps()
+
+    except Exception as e:
+        record['status'] = STATUS_FAILED
+        record['error'] = repr(e)
+
+    record['seconds'] = time.perf_counter() - td
+
+    # pool workers may be stopped without running exit handlers
+    tracing.flush()
+
+    return record
+
+
+def run_configs(config_files, workers=1, kernel_backend='auto', incremental=False):
+    """Run many configuration files in this process or in a pool of warm worker processes.  Multi-scenario files
+    run each of their scenarios.
+
+    :param config_files:                        Full paths to configuration YAML files
+    :type config_files:                         list
+
+    :param workers:                             Number of worker processes.  1 runs all configurations in this
+                                                process; None sizes the pool with `ResourceProbe`.
+    :type workers:                              int
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :param incremental:                         Reuse the outputs of steps unchanged since the previous run
+    :type incremental:                          bool
+
+    :return:                                    pandas.DataFrame; one row per run
+
+    """
+
+    runs = expand_runs(config_files)
+    chunksize = 1
+
+    if workers is None:
+        decision = ResourceProbe().plan(len(runs))
+        workers = decision['workers']
+        chunksize = decision['chunksize']
+
+    files = [config_file for config_file, _ in runs]
+    scenarios = [scenario for _, scenario in runs]
+
+    if workers <= 1:
+        records = [run_config(f, kernel_backend, s, incremental) for f, s in zip(files, scenarios)]
+
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(run_config, files, [kernel_backend] * len(runs), scenarios,
+                                        [incremental] * len(runs), chunksize=chunksize))
+
+    df = pd.DataFrame.from_records(records, columns=['config', 'scenario', 'status', 'steps', 'seconds', 'error'])
+    df['steps_per_second'] = (df['steps'] / df['seconds']).where(df['seconds'] > 0, 0.0)
+
+    return df
+
+
+def plan_configs(config_files, workers=1, kernel_backend='auto'):
+    """Plan every run of many configuration files without running them and predict the runtime of the batch.
+
+    :param config_files:                        Full paths to configuration YAML files
+    :type config_files:                         list
+
+    :param workers:                             Number of worker processes for the batch; None sizes the pool with
+                                                `ResourceProbe`.
+    :type workers:                              int
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :return:                                    tuple; list of ((config file, scenario), ExecutionPlan) and the
+                                                predicted seconds of the batch
+
+    """
+
+    runs = expand_runs(config_files)
+    plans = []
+
+    for config_file, scenario in runs:
+
+        if scenario is None:
+            run = Model(config_file=config_file, kernel_backend=kernel_backend, write_logfile=False)
+        else:
+            run = ScenarioFile(config_file).model(scenario, kernel_backend=kernel_backend, write_logfile=False)
+
+        plans.append(((config_file, scenario), run.plan()))
+
+    if workers is None:
+        workers = ResourceProbe().plan(len(runs))['workers']
+
+    seconds = [i.predicted_seconds for _, i in plans]
+
+    # runs are spread over the workers but the batch takes at least as long as its longest run
+    batch_seconds = max(sum(seconds) / max(1, workers), max(seconds, default=0.0))
+
+    return plans, batch_seconds
+
+
+def build_parser():
+    """Build the argument parser of the `im3py` command."""
+
+    parser = argparse.ArgumentParser(prog='im3py', description="Run im3py models from configuration files.")
+    # set after creation; `add_subparsers(required=...)` needs Python 3.7
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help="Run one or more configuration files in one process")
+    run_parser.add_argument('configs', nargs='+',
+                            help="Configuration or multi-scenario YAML files, directories of them, or glob patterns")
+    run_parser.add_argument('--workers', type=int, default=1,
+                            help="Number of worker processes; 0 sizes the pool to the CPU and memory limits")
+    run_parser.add_argument('--kernel-backend', default='auto', help="Backend used to run the step kernels")
+    run_parser.add_argument('--dry-run', action='store_true',
+                            help="Calibrate and print the execution plan of each run without running it")
+    run_parser.add_argument('--incremental', action='store_true',
+                            help="Reuse the outputs of steps whose inputs are unchanged since the previous run")
+    run_parser.add_argument('--trace', metavar='FILE',
+                            help="Write a Chrome Trace Event JSON timeline of all runs and workers to FILE")
+
+    submit_parser = subparsers.add_parser('submit', help="Write the specs of configuration files into a work queue")
+    submit_parser.add_argument('queue', help="Queue directory on a file system shared by the workers")
+    submit_parser.add_argument('configs', nargs='+',
+                               help="Configuration or multi-scenario YAML files, directories of them, or glob patterns")
+
+    worker_parser = subparsers.add_parser('worker', help="Claim and run specs from a work queue")
+    worker_parser.add_argument('queue', help="Queue directory on a file system shared by the workers")
+    worker_parser.add_argument('--wait', action='store_true',
+                               help="Keep polling until every spec is finished so that stale leases are reclaimed")
+    worker_parser.add_argument('--max-tasks', type=int, help="Stop after running this many specs")
+    worker_parser.add_argument('--lease-timeout', type=float, default=60.0,
+                               help="Seconds without a heartbeat after which a lease is reclaimed")
+    worker_parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between polls while waiting")
+    worker_parser.add_argument('--kernel-backend', default='auto', help="Backend used to run the step kernels")
+
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point of the `im3py` command.
+
+    :return:                                    int; exit status, 1 if any run failed
+
+    """
+
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'run':
+
+        config_files = expand_configs(args.configs)
+
+        if args.dry_run:
+
+            plans, batch_seconds = plan_configs(config_files, args.workers or None, args.kernel_backend)
+
+            for (config_file, scenario), execution_plan in plans:
+                print(f"{config_file} {scenario or ''}".rstrip())
+                print(execution_plan)
+                print()
+
+            print(f"{len(plans)} run(s) predicted to take {batch_seconds:.3f} s")
+
+            return 0
+
+        if args.trace:
+            tracing.enable(f"{os.path.abspath(args.trace)}.events")
+
+        try:
+            df = run_configs(config_files, args.workers or None, args.kernel_backend, args.incremental)
+        finally:
+            if args.trace:
+                tracing.export(args.trace, clean=True)
+
+        print(df.drop(columns='error').to_string(index=False, float_format='{:.3f}'.format))
+
+        failed = df[df['status'] == STATUS_FAILED]
+
+        for config_file, scenario, error in zip(failed['config'], failed['scenario'], failed['error']):
+            print(f"FAILED {config_file} {scenario}:  {error}", file=sys.stderr)
+
+        print(f"{len(df) - len(failed)} of {len(df)} run(s) completed in {df['seconds'].sum():.3f} s")
+
+        return 1 if len(failed) else 0
+
+    if args.command == 'submit':
+
+        queue = WorkQueue(args.queue)
+
+        task_ids = [queue.submit_config(config_file, scenario)
+                    for config_file, scenario in expand_runs(expand_configs(args.configs))]
+
+        print(f"Submitted {len(task_ids)} spec(s) to {queue.queue_directory}:  {queue.status()}")
+
+        return 0
+
+    if args.command == 'worker':
+
+        queue = WorkQueue(args.queue, lease_timeout=args.lease_timeout)
+
+        records = queue.run_worker(max_tasks=args.max_tasks, wait=args.wait, poll_interval=args.poll_interval,
+                                   kernel_backend=args.kernel_backend)
+
+        failed = sum(1 for i in records if i['status'] != STATE_DONE)
+
+        print(f"Worker ran {len(records)} spec(s), {failed} failed")
+
+        return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Read-only virtual data store over a zip archive that reads members lazily without extracting them.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import io
+import logging
+import mmap
+import os
+import posixpath
+import struct
+import zipfile
+
+import numpy as np
+
+
+# central directory indices of opened archives keyed by (path, modification time, size)
+_INDEX_CACHE = {}
+
+
+class _IndexedZipFile(zipfile.ZipFile):
+    """ZipFile that takes the members of an already parsed central directory instead of reading it again.
+
+    :param file:                                Open binary file object of the archive
+    :type file:                                 file
+
+    :param infolist:                            ZipInfo of each member; None reads the central directory
+    :type infolist:                             list
+
+    """
+
+    def __init__(self, file, infolist=None):
+
+        self._cached_infolist = infolist
+
+        super().__init__(file)
+
+    def _RealGetContents(self):
+
+        if self._cached_infolist is None:
+            return super()._RealGetContents()
+
+        for info in self._cached_infolist:
+            self.filelist.append(info)
+            self.NameToInfo[info.filename] = info
+
+
+class ZipDataStore:
+    """Read-only virtual file system over a zip archive.  The central directory index and the member data offsets
+    are cached per archive, members are read lazily on request, and members stored without compression are served
+    directly from a memory map of the archive without copying.
+
+    :param archive:                             Full path with file name and extension to the zip archive.
+    :type archive:                              str
+
+    Examples:
+
+        >>> from im3py.data_store import ZipDataStore
+        >>> with ZipDataStore("<path to archive.zip>") as store:
+        >>>     store.listdir('test')
+        >>>     arr = store.read_array('test/test_no-header.csv', delimiter=',', dtype=str)
+
+    """
+
+    # size of the fixed part of a zip local file header
+    LOCAL_HEADER_SIZE = 30
+    LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+    def __init__(self, archive):
+
+        if not os.path.isfile(archive):
+            raise FileNotFoundError(f"Zip archive '{archive}' does not exist.")
+
+        self.archive = os.path.abspath(archive)
+
+        self._file = open(self.archive, 'rb')
+        self._mmap = None
+
+        self._index = self.build_index()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        self.close()
+
+    def __contains__(self, name):
+
+        return self.normalize(name) in self._index
+
+    def __repr__(self):
+
+        return f"ZipDataStore('{self.archive}', members={len(self._index)})"
+
+    def build_index(self):
+        """Get the central directory index from the cache or read it from the archive, and open the archive over
+        it without parsing the central directory again.  Data offsets resolved from the local file headers are cached
+        with the index so they are only read once per archive.
+
+        :return:                                dict; member name to [ZipInfo, data offset]
+
+        """
+
+        stat = os.fstat(self._file.fileno())
+        key = (self.archive, stat.st_mtime_ns, stat.st_size)
+
+        index = _INDEX_CACHE.get(key)
+
+        self._zip = _IndexedZipFile(self._file, None if index is None else [i[0] for i in index.values()])
+
+        if index is None:
+
+            index = {info.filename.rstrip('/'): [info, None] for info in self._zip.infolist()}
+
+            # drop stale entries for earlier versions of the same archive
+            for stale in [k for k in _INDEX_CACHE if k[0] == self.archive]:
+                del _INDEX_CACHE[stale]
+
+            _INDEX_CACHE[key] = index
+
+        return index
+
+    @staticmethod
+    def normalize(name):
+        """Normalize a member name to the posix form used inside zip archives."""
+
+        name = posixpath.normpath(name.replace(os.sep, '/')).strip('/')
+
+        return '' if name == '.' else name
+
+    def info(self, name):
+        """Get the ZipInfo for a member."""
+
+        try:
+            return self._index[self.normalize(name)][0]
+        except KeyError:
+            raise FileNotFoundError(f"'{name}' is not a member of '{self.archive}'.")
+
+    def namelist(self):
+        """List all file members in the archive."""
+
+        return [name for name, entry in self._index.items() if not entry[0].is_dir()]
+
+    def listdir(self, path=''):
+        """List the names of the entries directly within a directory of the archive.
+
+        :param path:                            Directory within the archive; '' for the root.
+        :type path:                             str
+
+        :return:                                list
+
+        """
+
+        prefix = self.normalize(path)
+        prefix = f"{prefix}/" if prefix else ''
+
+        children = set()
+
+        for name in self._index:
+            if name.startswith(prefix) and name != prefix.rstrip('/'):
+                children.add(name[len(prefix):].split('/')[0])
+
+        if prefix and not children and prefix.rstrip('/') not in self._index:
+            raise FileNotFoundError(f"'{path}' is not a directory in '{self.archive}'.")
+
+        return sorted(children)
+
+    def isfile(self, name):
+        """True if `name` is a file member of the archive."""
+
+        entry = self._index.get(self.normalize(name))
+
+        return entry is not None and not entry[0].is_dir()
+
+    def is_stored(self, name):
+        """True if the member is stored without compression and can be memory mapped."""
+
+        return self.info(name).compress_type == zipfile.ZIP_STORED
+
+    def data_offset(self, name):
+        """Byte offset of a member's data within the archive, read from its local file header."""
+
+        entry = self._index[self.normalize(name)]
+
+        if entry[1] is None:
+
+            info = entry[0]
+
+            # a separate handle; the shared one is positioned by ZipFile reads in other threads
+            with open(self.archive, 'rb') as get:
+                get.seek(info.header_offset)
+                header = get.read(self.LOCAL_HEADER_SIZE)
+
+            if header[:4] != self.LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(f"Bad local file header for '{name}' in '{self.archive}'.")
+
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            entry[1] = info.header_offset + self.LOCAL_HEADER_SIZE + name_length + extra_length
+
+        return entry[1]
+
+    def read_bytes(self, name):
+        """Read the content of a member.  Uncompressed members are returned as a zero-copy memoryview of the
+        memory-mapped archive; compressed members are decompressed into bytes.
+
+        :param name:                            Member name
+        :type name:                             str
+
+        :return:                                memoryview; bytes
+
+        """
+
+        info = self.info(name)
+
+        if info.compress_type != zipfile.ZIP_STORED or info.file_size == 0:
+            return self._zip.read(info)
+
+        if self._mmap is None:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offset = self.data_offset(name)
+
+        return memoryview(self._mmap)[offset:offset + info.file_size]
+
+    def open(self, name, mode='r', encoding='utf-8'):
+        """Open a member as a lazily read file object.
+
+        :param name:                            Member name
+        :type name:                             str
+
+        :param mode:                            'r' for text or 'rb' for binary
+        :type mode:                             str
+
+        :param encoding:                        Text encoding used when `mode` is 'r'
+        :type encoding:                         str
+
+        :return:                                file object
+
+        """
+
+        if mode not in ('r', 'rb'):
+            raise ValueError(f"Mode '{mode}' is not supported; the data store is read-only.")
+
+        stream = self._zip.open(self.info(name))
+
+        if mode == 'rb':
+            return stream
+
+        return io.TextIOWrapper(stream, encoding=encoding)
+
+    def read_array(self, name, **kwargs):
+        """Read a member into a NumPy array.  '.npy' members stored without compression are memory mapped;
+        all other members are parsed as delimited text with `numpy.loadtxt`.
+
+        :param name:                            Member name
+        :type name:                             str
+
+        :param kwargs:                          Keyword arguments passed to `numpy.loadtxt` for text members
+                                                (e.g., `delimiter=','`).
+
+        :return:                                numpy.ndarray
+
+        """
+
+        if name.endswith('.npy'):
+
+            content = self.read_bytes(name)
+
+            if isinstance(content, memoryview):
+                return self.npy_from_buffer(content)
+
+            return np.load(io.BytesIO(content), allow_pickle=False)
+
+        if name.endswith('.csv'):
+            kwargs.setdefault('delimiter', ',')
+
+        with self.open(name) as get:
+            return np.loadtxt(get, **kwargs)
+
+    @staticmethod
+    def npy_from_buffer(buffer):
+        """Build a read-only array over an '.npy' file held in a buffer without copying the data."""
+
+        stream = io.BytesIO(buffer[:min(len(buffer), 65536)])
+
+        version = np.lib.format.read_magic(stream)
+
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+
+        if dtype.hasobject:
+            raise ValueError("Object arrays cannot be read from the data store.")
+
+        count = int(np.prod(shape, dtype=np.int64))
+        arr = np.frombuffer(buffer, dtype=dtype, count=count, offset=stream.tell())
+
+        return arr.reshape(shape, order='F' if fortran_order else 'C')
+
+    def extract(self, directory, members=None):
+        """Optionally extract members to disk.
+
+        :param directory:                       Full path to the directory to extract to
+        :type directory:                        str
+
+        :param members:                         Optional.  Member names to extract; all if None.
+        :type members:                          list
+
+        """
+
+        for name in members or self.namelist():
+            logging.info(f"Unzipped: {os.path.join(directory, name)}")
+            self._zip.extract(self.info(name), directory)
+
+    def close(self):
+        """Release the memory map and close the archive."""
+
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # arrays still reference the map; it is released when they are garbage collected
+                pass
+            self._mmap = None
+
+        self._zip.close()
+        self._file.close()
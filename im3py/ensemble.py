@@ -0,0 +1,449 @@
+"""Run ensembles of model members that differ by parameter values and reduce their outputs online.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import im3py.tracing as tracing
+from im3py.chunk_store import ChunkStore
+from im3py.model import Model
+from im3py.read_config import ReadConfig
+from im3py.reducers import EnsembleReducer
+from im3py.resources import ResourceProbe
+
+
+class Ensemble:
+    """Run ensemble members and feed each member's per-step values directly to streaming reducers.  Reducer memory
+    is O(steps) rather than O(steps x members), and members are split into chunks so that each worker process
+    returns a single reducer that is merged by the coordinator.
+
+    :param members:                             List of dictionaries of parameter overrides, one per member
+                                                (e.g., [{'alpha_param': 1.0, 'beta_param': 0.5}, ...]).
+    :type members:                              list
+
+    :param output_directory:                    Full path to the root output directory.  Each member writes to a
+                                                'member_<n>' subdirectory.  Defaults to the `output_directory` of the
+                                                base configuration.
+    :type output_directory:                     str
+
+    :param config_file:                         Optional.  Full path to a base configuration YAML file.
+    :type config_file:                          str
+
+    :param workers:                             Number of worker processes.  1 runs all members in this process.  If
+                                                None (default), ensembles of fewer than `MIN_SIZED_MEMBERS` members
+                                                run in this process; for larger ensembles the first member is run as a
+                                                calibration run in a worker process to measure its peak memory, and
+                                                the number of workers and the chunk size for the remaining members are
+                                                chosen from the CPU and memory limits of the node with `ResourceProbe`.
+    :type workers:                              int
+
+    :param quantiles:                           Quantiles to report for each step
+    :type quantiles:                            tuple
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :param trace:                               Record a timeline of member compute, writes, logging, and the waits
+                                                of the coordinator and workers and export it as Chrome Trace Event
+                                                JSON to 'trace_<datetime>.json' in the output directory.
+    :type trace:                                bool
+
+    :param config_kwargs:                       Base configuration values passed as arguments (e.g., `start_step`).
+                                                These take precedence over the base configuration file.
+
+    Examples:
+
+        >>> from im3py.ensemble import Ensemble
+        >>> members = [{'alpha_param': a, 'beta_param': b} for a in (-1.0, 0.0, 1.0) for b in (0.5, 1.0)]
+        >>> ens = Ensemble(members, output_directory="<output directory path>", start_step=2015,
+        >>>                through_step=2030, time_step=1)
+        >>> summary = ens.run().to_frame(ens.time_axis)
+
+    """
+
+    # keys of the configuration that may be set for the base run
+    CONFIG_KEYS = (ReadConfig.OUT_DIR_KEY, ReadConfig.START_STEP_KEY, ReadConfig.THROUGH_STEP_KEY,
+                   ReadConfig.TIME_STEP_KEY, ReadConfig.ALPHA_KEY, ReadConfig.BETA_KEY, ReadConfig.TIME_UNIT_KEY,
+                   ReadConfig.TIME_STEPS_KEY, ReadConfig.SUPPLEMENT_KEY, ReadConfig.OUTPUT_LAYOUT_KEY,
+                   ReadConfig.OUTPUT_COMPRESSION_KEY, ReadConfig.OUTPUT_DURABILITY_KEY, ReadConfig.OUTPUT_BUFFER_KEY)
+
+    # keys that define the time axis; these must be shared by all members
+    TIME_KEYS = (ReadConfig.START_STEP_KEY, ReadConfig.THROUGH_STEP_KEY, ReadConfig.TIME_STEP_KEY,
+                 ReadConfig.TIME_UNIT_KEY, ReadConfig.TIME_STEPS_KEY)
+
+    # name of each member's output subdirectory
+    MEMBER_DIR_PREFIX = 'member_'
+
+    # variables of each step written to a results store
+    VARIABLES = ('value',)
+
+    # smallest ensemble sized automatically when workers is None; smaller ones do not pay for a calibration worker
+    MIN_SIZED_MEMBERS = 16
+
+    def __init__(self, members, output_directory=None, config_file=None, workers=None, quantiles=(0.05, 0.5, 0.95),
+                 kernel_backend='auto', trace=False, **config_kwargs):
+
+        unknown = set(config_kwargs) - set(self.CONFIG_KEYS)
+        if unknown:
+            raise TypeError(f"Unexpected configuration arguments:  {sorted(unknown)}")
+
+        self.members = [dict(i) for i in members]
+        self.workers = workers
+        self.quantiles = tuple(quantiles)
+        self.kernel_backend = kernel_backend
+        self.trace = trace
+
+        for index, overrides in enumerate(self.members):
+
+            shared = set(overrides) & set(self.TIME_KEYS + (ReadConfig.OUT_DIR_KEY,))
+
+            if shared:
+                raise ValueError(f"Member {index} overrides {sorted(shared)}; the time axis and output directory "
+                                 f"are shared by all members.")
+
+        # base parameters from the configuration file overridden by arguments
+        self.base_parameters = {}
+
+        if config_file is not None:
+            config = ReadConfig(config_file=config_file).config
+            self.base_parameters.update({k: v for k, v in config.items() if k in self.CONFIG_KEYS})
+
+        self.base_parameters.update({k: v for k, v in config_kwargs.items() if v is not None})
+
+        if output_directory is not None:
+            self.base_parameters[ReadConfig.OUT_DIR_KEY] = output_directory
+
+        self.output_directory = ReadConfig.validate_directory(self.base_parameters.get(ReadConfig.OUT_DIR_KEY))
+
+        if self.output_directory is None:
+            raise ValueError("An `output_directory` is required for an ensemble.")
+
+        self.time_axis = ReadConfig(**{k: self.base_parameters.get(k) for k in self.TIME_KEYS}).time_axis
+
+        # reducer holding the results of the last run
+        self.reducer = None
+
+    def __len__(self):
+
+        return len(self.members)
+
+    def member_directory(self, index):
+        """Full path to the output directory of a member."""
+
+        width = len(str(max(len(self.members) - 1, 0)))
+
+        return os.path.join(self.output_directory, f"{self.MEMBER_DIR_PREFIX}{index:0{width}d}")
+
+    def member_parameters(self, index):
+        """Keyword arguments used to build the `Model` for a member."""
+
+        parameters = dict(self.base_parameters)
+        parameters.update(self.members[index])
+        parameters[ReadConfig.OUT_DIR_KEY] = self.member_directory(index)
+
+        return parameters
+
+    def chunks(self, indices=None, workers=None, chunksize=None):
+        """Split member indices into chunks that are each reduced by a single worker task.
+
+        :param indices:                         Optional.  Member indices to split; all members if None.
+        :type indices:                          list
+
+        :param workers:                         Optional.  Number of workers; defaults to `workers`.
+        :type workers:                          int
+
+        :param chunksize:                       Optional.  Number of members per chunk; four chunks per worker if None.
+        :type chunksize:                        int
+
+        :return:                                list
+
+        """
+
+        indices = np.arange(len(self.members)) if indices is None else np.asarray(indices, dtype=int)
+
+        if chunksize is None:
+            n_chunks = min(indices.size, max(1, workers or self.workers or 1) * ResourceProbe.CHUNKS_PER_WORKER)
+        else:
+            n_chunks = -(-indices.size // max(1, chunksize))
+
+        return [i.tolist() for i in np.array_split(indices, max(1, n_chunks)) if i.size > 0]
+
+    def plan(self, cpus=None, sample_steps=5):
+        """Calibrate the first member on a short sample of steps and choose the execution strategy and output sink
+        for the whole ensemble without running it.
+
+        :param cpus:                            Optional.  Number of CPUs available; probed if None.
+        :type cpus:                             int
+
+        :param sample_steps:                    Number of steps run to calibrate the costs
+        :type sample_steps:                     int
+
+        :return:                                ExecutionPlan
+
+        """
+
+        if not self.members:
+            raise ValueError("An ensemble without members has nothing to plan.")
+
+        # the member directories are not created by planning
+        parameters = dict(self.member_parameters(0), output_directory=self.output_directory)
+
+        model = Model(write_logfile=False, kernel_backend=self.kernel_backend, **parameters)
+
+        return model.plan(members=len(self.members), cpus=cpus, sample_steps=sample_steps)
+
+    def create_store(self, store_directory, member_chunk=None, compression=None, overwrite=False):
+        """Create a chunked results store of shape (members, steps, variables) for `run` to write into.
+
+        Each chunk holds all steps of `member_chunk` members, so a member's trajectory is one read and a step across
+        all members is one read per member chunk.
+
+        :param store_directory:                 Full path to the directory of the store
+        :type store_directory:                  str
+
+        :param member_chunk:                    Optional.  Number of members per chunk; four chunks per worker if None.
+        :type member_chunk:                     int
+
+        :param compression:                     Optional.  Name of a registered codec used to compress each chunk
+        :type compression:                      str
+
+        :param overwrite:                       Replace an existing store
+        :type overwrite:                        bool
+
+        :return:                                ChunkStore
+
+        """
+
+        if member_chunk is None:
+            workers = self.workers or ResourceProbe().cpu_limit
+            member_chunk = math.ceil(len(self.members) / (max(1, workers) * ResourceProbe.CHUNKS_PER_WORKER))
+
+        n_steps = len(self.time_axis)
+
+        coordinates = {'member': list(range(len(self.members))), 'step': self.time_axis.steps,
+                       'variable': list(self.VARIABLES)}
+
+        attributes = {'members': [ReadConfig.serializable_parameters(i) for i in self.members]}
+
+        return ChunkStore.create(store_directory, (len(self.members), n_steps, len(self.VARIABLES)),
+                                 chunks=(max(1, member_chunk), n_steps, len(self.VARIABLES)), coordinates=coordinates,
+                                 compression=compression, attributes=attributes, overwrite=overwrite)
+
+    def run(self, store=None, member_outputs=None):
+        """Run all members and return the merged reducer.
+
+        :param store:                           Optional.  `ChunkStore` from `create_store`, or the full path to its
+                                                directory, that each worker writes the values of its members into.
+                                                Work is split along the member chunks of the store so that workers
+                                                write disjoint chunks.
+        :type store:                            ChunkStore; str
+
+        :param member_outputs:                  Optional.  Write the output files of each member to its
+                                                'member_<n>' subdirectory.  If None, they are written only when there
+                                                is no `store`.
+        :type member_outputs:                   bool
+
+        :return:                                EnsembleReducer
+
+        """
+
+        td = time.time()
+
+        owns_trace = self.trace and not tracing.is_enabled()
+
+        if owns_trace:
+            tracing.enable(os.path.join(self.output_directory, Model.TRACE_DIRECTORY))
+
+        self.reducer = EnsembleReducer(len(self.time_axis), self.quantiles)
+
+        store_directory = None
+
+        if store is not None:
+
+            store = store if isinstance(store, ChunkStore) else ChunkStore(store)
+            store_directory = store.store_directory
+
+            if store.shape[:2] != (len(self.members), len(self.time_axis)):
+                raise ValueError(f"Store of shape {store.shape} does not match {len(self.members)} members and "
+                                 f"{len(self.time_axis)} steps.")
+
+        write_outputs = store is None if member_outputs is None else bool(member_outputs)
+
+        indices = list(range(len(self.members)))
+        workers = self.workers
+        chunksize = None
+
+        if workers is None and len(indices) < self.MIN_SIZED_MEMBERS:
+            workers = 1
+
+        if workers is None and indices:
+
+            # calibration run of the first member, or the first member chunk of the store, in a fresh worker to
+            # measure the memory a worker needs
+            calibration = indices[:1] if store is None else indices[:store.chunks[0]]
+
+            probe = ResourceProbe()
+            reducer, peak_memory = probe.calibrate(run_members, [self.member_parameters(i) for i in calibration],
+                                                   len(self.time_axis), self.quantiles, self.kernel_backend, None,
+                                                   store_directory, calibration[0], write_outputs)
+            self.reducer.merge(reducer)
+
+            logging.info(f"Calibration of {len(calibration)} member(s) used a peak of {peak_memory / 1e6:.1f} MB")
+
+            indices = indices[len(calibration):]
+
+            decision = probe.plan(len(indices), memory_per_worker=peak_memory)
+            workers = decision['workers']
+            chunksize = decision['chunksize']
+
+        logging.info(f"Starting ensemble of {len(self.members)} members with {workers or 1} worker(s)")
+
+        if store is None:
+            chunks = self.chunks(indices, workers, chunksize)
+        else:
+            # one task per member chunk of the store so that no two workers write the same chunk file
+            chunks = [indices[i:i + store.chunks[0]] for i in range(0, len(indices), store.chunks[0])]
+
+        tasks = [[self.member_parameters(i) for i in chunk] for chunk in chunks]
+        offsets = [chunk[0] for chunk in chunks]
+
+        if workers is None or workers <= 1:
+
+            for task, offset in zip(tasks, offsets):
+                reducer = run_members(task, len(self.time_axis), self.quantiles, self.kernel_backend, None,
+                                      store_directory, offset, write_outputs)
+
+                with tracing.span('merge', tracing.CATEGORY_RUN, members=len(task)):
+                    self.reducer.merge(reducer)
+
+        else:
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+
+                # workers record the time each chunk waited in the queue from this submission time
+                submitted = time.perf_counter() if tracing.is_enabled() else None
+
+                futures = [executor.submit(run_members, task, len(self.time_axis), self.quantiles,
+                                           self.kernel_backend, submitted, store_directory, offset, write_outputs)
+                           for task, offset in zip(tasks, offsets)]
+
+                pending = as_completed(futures)
+
+                for _ in range(len(futures)):
+
+                    with tracing.span('wait for worker', tracing.CATEGORY_WAIT):
+                        future = next(pending)
+
+                    with tracing.span('merge', tracing.CATEGORY_RUN):
+                        self.reducer.merge(future.result())
+
+        logging.info("Ensemble run completed in {} minutes.".format((time.time() - td) / 60))
+
+        if owns_trace:
+            trace_file = os.path.join(self.output_directory, f"trace_{time.strftime(ReadConfig.DATETIME_FORMAT)}.json")
+            tracing.export(trace_file, clean=True)
+            logging.info(f"Trace written to {trace_file}")
+
+        return self.reducer
+
+
+def run_member(parameters, kernel_backend='auto', write_outputs=True):
+    """Run a single model member and return its value for each step.
+
+    :param parameters:                          Keyword arguments for `Model`
+    :type parameters:                           dict
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :param write_outputs:                       Write the output file of each step
+    :type write_outputs:                        bool
+
+    :return:                                    numpy.ndarray
+
+    """
+
+    Model.make_dir(parameters[ReadConfig.OUT_DIR_KEY])
+
+    run = Model(write_logfile=False, kernel_backend=kernel_backend, write_outputs=write_outputs, **parameters)
+
+    # a failed member must not leave its log handlers and writer to the next member run in this process
+    try:
+        run.initialize()
+
+        values = np.fromiter((run.advance_step() for _ in range(len(run.step_list))), dtype=np.float64,
+                             count=len(run.step_list))
+    finally:
+        run.close()
+
+    return values
+
+
+def run_members(parameter_list, n_steps, quantiles, kernel_backend='auto', submitted=None, store_directory=None,
+                member_offset=0, write_outputs=True):
+    """Run a chunk of members and reduce their values into a single reducer.
+
+    :param parameter_list:                      List of keyword arguments for `Model`, one per member
+    :type parameter_list:                       list
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    :param quantiles:                           Quantiles to report
+    :type quantiles:                            tuple
+
+    :param kernel_backend:                      Backend used to run the step kernels
+    :type kernel_backend:                       str
+
+    :param submitted:                           Optional.  `time.perf_counter` when the chunk was submitted to a
+                                                worker; recorded as a queue wait when tracing.
+    :type submitted:                            float
+
+    :param store_directory:                     Optional.  Directory of a `ChunkStore` to write the values of the
+                                                members into.
+    :type store_directory:                      str
+
+    :param member_offset:                       Position in the store of the first member of the chunk
+    :type member_offset:                        int
+
+    :param write_outputs:                       Write the output files of each member
+    :type write_outputs:                        bool
+
+    :return:                                    EnsembleReducer
+
+    """
+
+    if submitted is not None:
+        tracing.record('queued', tracing.CATEGORY_WAIT, submitted, members=len(parameter_list))
+
+    reducer = EnsembleReducer(n_steps, quantiles)
+
+    block = None if store_directory is None else np.empty((len(parameter_list), n_steps))
+
+    with tracing.span('members', tracing.CATEGORY_RUN, members=len(parameter_list)):
+        for index, parameters in enumerate(parameter_list):
+            values = run_member(parameters, kernel_backend, write_outputs)
+            reducer.update(values)
+
+            if block is not None:
+                block[index] = values
+
+    if block is not None:
+        with tracing.span('store', tracing.CATEGORY_WRITE, members=len(parameter_list)):
+            ChunkStore(store_directory)[member_offset:member_offset + len(parameter_list), :, 0] = block
+
+    # worker processes may be stopped without running exit handlers
+    tracing.flush()
+
+    return reducer
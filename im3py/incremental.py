@@ -0,0 +1,159 @@
+"""Incremental recompute of a run by diffing its resolved parameters and per-step inputs against the previous run in
+the same output directory.
+
+Each incremental run saves 'run_parameters.json' in its output directory with the resolved parameters and, for every
+completed step, the inputs that determine its output (step, alpha, beta, kernel, and output path) and its value.  A
+step of a new run is reused when its inputs are unchanged and its output file still exists, so extending the horizon
+computes only the new steps, moving the start step recomputes only the steps whose kernel changes from sum to mean or
+back, and changing alpha or beta recomputes every step whose value changes.  While a run is in progress the file lists
+only the steps it reuses, so a run that is interrupted never leaves the outputs it overwrote listed with the inputs of
+the previous run.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import json
+import logging
+import os
+
+from im3py.output_writer import atomic_write
+from im3py.read_config import ReadConfig
+
+
+RUN_PARAMETERS_FILE = 'run_parameters.json'
+
+# version of the saved file; files of other versions are ignored
+RUN_PARAMETERS_VERSION = 1
+
+# inputs of a step that must be unchanged for its output to be reused
+SIGNATURE_KEYS = ('step', 'alpha_param', 'beta_param', 'kernel', 'path')
+
+
+def run_parameters_file(output_directory):
+    """Full path to the saved run parameters of an output directory."""
+
+    return os.path.join(output_directory, RUN_PARAMETERS_FILE)
+
+
+def read_run_parameters(output_directory):
+    """Read the saved run parameters of an output directory; None if there are none or they cannot be used.
+
+    :return:                                    dict; 'parameters' and 'steps'
+
+    """
+
+    try:
+        with open(run_parameters_file(output_directory)) as get:
+            saved = json.load(get)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(saved, dict) or saved.get('version') != RUN_PARAMETERS_VERSION:
+        return None
+
+    return saved
+
+
+def write_run_parameters(output_directory, parameters, steps):
+    """Save the resolved parameters and the completed steps of a run.
+
+    :param output_directory:                    Full path to the output directory
+    :type output_directory:                     str
+
+    :param parameters:                          Resolved parameters of the run
+    :type parameters:                           dict
+
+    :param steps:                               Signature and 'value' of each completed step
+    :type steps:                                list
+
+    """
+
+    content = {'version': RUN_PARAMETERS_VERSION, 'parameters': ReadConfig.serializable_parameters(parameters),
+               'steps': steps}
+
+    atomic_write(run_parameters_file(output_directory), json.dumps(content, indent=2).encode('utf-8'))
+
+
+def diff_parameters(previous, current):
+    """Parameters that differ between two runs.
+
+    :return:                                    dict; parameter name to (previous value, current value)
+
+    """
+
+    current = ReadConfig.serializable_parameters(current)
+
+    return {k: (previous.get(k), current.get(k)) for k in sorted(set(previous) | set(current))
+            if previous.get(k) != current.get(k)}
+
+
+def plan_reuse(saved, signatures, output_exists):
+    """Work out which steps of a new run can reuse the outputs of the previous run.
+
+    :param saved:                               Saved run parameters from `read_run_parameters`; None for a first run
+    :type saved:                                dict
+
+    :param signatures:                          Signature of each step of the new run
+    :type signatures:                           list
+
+    :param output_exists:                       Callable that takes the signature of a step and returns True if its
+                                                output file exists
+    :type output_exists:                        callable
+
+    :return:                                    dict; step index to the saved value of each reusable step
+
+    """
+
+    if saved is None:
+        return {}
+
+    previous = {i['step']: i for i in saved.get('steps', [])}
+
+    reuse = {}
+
+    for index, signature in enumerate(signatures):
+
+        record = previous.get(signature['step'])
+
+        if record is None or any(record.get(k) != signature[k] for k in SIGNATURE_KEYS):
+            continue
+
+        if output_exists(signature):
+            reuse[index] = record['value']
+
+    return reuse
+
+
+def report(saved, parameters, signatures, reuse):
+    """Summarize what an incremental run reuses and recomputes and log it.
+
+    :return:                                    dict; 'changed' parameters, and the 'reused', 'computed', and
+                                                'dropped' steps
+
+    """
+
+    previous_steps = [i['step'] for i in saved.get('steps', [])] if saved is not None else []
+    current_steps = [i['step'] for i in signatures]
+
+    summary = {'changed': diff_parameters(saved['parameters'], parameters) if saved is not None else {},
+               'reused': [current_steps[i] for i in sorted(reuse)],
+               'computed': [s for i, s in enumerate(current_steps) if i not in reuse],
+               'dropped': [s for s in previous_steps if s not in set(current_steps)]}
+
+    if saved is None:
+        logging.info("Incremental run:  no previous run parameters; computing all steps")
+
+    else:
+        changed = ', '.join(summary['changed']) or 'none'
+
+        logging.info(f"Incremental run:  reusing {len(summary['reused'])} of {len(current_steps)} step(s) and "
+                     f"computing {len(summary['computed'])}; changed parameters:  {changed}")
+
+        if summary['dropped']:
+            logging.info(f"Steps no longer in the run; their outputs are left in place:  {summary['dropped']}")
+
+    return summary
@@ -7,14 +7,19 @@ License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
 
 """
 
+import hashlib
 import os
 import requests
 import logging
+import time
 import zipfile
 
+from concurrent.futures import ThreadPoolExecutor
 from pkg_resources import get_distribution
 from io import BytesIO
 
+from im3py.data_store import ZipDataStore
+
 
 class InstallSupplement:
     """Download and unpack example data supplement from a remote source that matches the current installed distribution.
@@ -24,6 +29,14 @@ class InstallSupplement:
                                                 for the user.
     :type example_data_directory:               str
 
+    :param max_workers:                         Maximum number of artifacts downloaded concurrently.
+    :type max_workers:                          int
+
+    :param manifest:                            Optional.  List of artifacts to use instead of the manifest for the
+                                                current version.  Each artifact is a dictionary with the keys 'name'
+                                                (file name), 'url', 'size' (bytes), and 'sha256'.
+    :type manifest:                             list
+
     """
 
     PACKAGE_NAME = 'im3py'
@@ -31,11 +44,29 @@ class InstallSupplement:
     # URL for DOI minted example data hosted on Zenodo
     DATA_VERSION_URLS = {'0.1.0': 'https://zenodo.org/record/3856417/files/test.zip?download=1'}
 
-    def __init__(self, example_data_directory):
+    # artifacts that make up the data supplement for each version; a `size` or `sha256` of None is not verified
+    DATA_VERSION_MANIFESTS = {'0.1.0': [{'name': 'test.zip',
+                                         'url': DATA_VERSION_URLS['0.1.0'],
+                                         'size': None,
+                                         'sha256': None}]}
+
+    # bytes per chunk when streaming artifacts to disk
+    CHUNK_SIZE = 1024 * 1024
+
+    # seconds to wait for a connection and between bytes received before a download fails
+    TIMEOUT = (10, 60)
+
+    def __init__(self, example_data_directory, max_workers=4, manifest=None):
 
         # full path to the root directory where the example dir will be stored
         self._example_data_directory = example_data_directory
 
+        self.max_workers = max_workers
+        self._manifest = manifest
+
+        # size, duration, and throughput of the last call to `download_artifacts`
+        self.download_stats = None
+
     @property
     def example_data_directory(self):
         """Check validitiy of user provided directory"""
@@ -68,7 +99,213 @@ class InstallSupplement:
         # retrieve content from URL
         logging.info(f"Downloading data for version {self.current_version}")
 
-        return requests.get(self.data_url)
+        return requests.get(self.data_url, timeout=self.TIMEOUT)
+
+    @property
+    def manifest(self):
+        """Get the list of artifacts that make up the data supplement for the current package version."""
+
+        if self._manifest is not None:
+            return self._manifest
+
+        try:
+            return self.DATA_VERSION_MANIFESTS[self.current_version]
+
+        except KeyError:
+            raise KeyError(f"Data manifest missing for current version:  {self.current_version}.  Please contact admin.")
+
+    def artifact(self, name=None):
+        """Get an artifact from the manifest by name; the first artifact if `name` is None."""
+
+        manifest = self.manifest
+
+        if name is None:
+            return manifest[0]
+
+        for artifact in manifest:
+            if artifact['name'] == name:
+                return artifact
+
+        raise KeyError(f"Artifact '{name}' is not in the data manifest:  {[i['name'] for i in manifest]}")
+
+    def artifact_path(self, name=None):
+        """Full path to the cached file of an artifact."""
+
+        return os.path.join(self.example_data_directory, self.artifact(name)['name'])
+
+    def build_session(self):
+        """Build a session whose connection pool can serve every download worker."""
+
+        session = requests.Session()
+
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        return session
+
+    @staticmethod
+    def is_valid(path, artifact):
+        """Check an artifact file against the size and checksum in the manifest.
+
+        :return:                                bool
+
+        """
+
+        if not os.path.isfile(path):
+            return False
+
+        if artifact.get('size') is not None and os.path.getsize(path) != artifact['size']:
+            return False
+
+        if artifact.get('sha256') is not None:
+
+            sha256 = hashlib.sha256()
+
+            with open(path, 'rb') as get:
+                for chunk in iter(lambda: get.read(InstallSupplement.CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+
+            return sha256.hexdigest() == artifact['sha256']
+
+        return True
+
+    def download_artifact(self, session, artifact):
+        """Stream one artifact to disk, verifying its size and checksum before moving it into place.
+
+        :param session:                         Shared HTTP session
+        :type session:                          requests.Session
+
+        :param artifact:                        Artifact from the manifest
+        :type artifact:                         dict
+
+        :return:                                int; number of bytes downloaded
+
+        """
+
+        path = os.path.join(self.example_data_directory, artifact['name'])
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+
+        sha256 = hashlib.sha256()
+        n_bytes = 0
+
+        logging.info(f"Downloading {artifact['name']} from {artifact['url']}")
+
+        try:
+
+            with session.get(artifact['url'], stream=True, timeout=self.TIMEOUT) as response, open(tmp_file, 'wb') as out:
+
+                response.raise_for_status()
+
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    out.write(chunk)
+                    sha256.update(chunk)
+                    n_bytes += len(chunk)
+
+            if artifact.get('size') is not None and n_bytes != artifact['size']:
+                raise ValueError(f"Size of '{artifact['name']}' is {n_bytes} bytes; expected {artifact['size']}.")
+
+            if artifact.get('sha256') is not None and sha256.hexdigest() != artifact['sha256']:
+                raise ValueError(f"Checksum of '{artifact['name']}' does not match the data manifest.")
+
+            os.replace(tmp_file, path)
+
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+        return n_bytes
+
+    def download_artifacts(self, names=None):
+        """Concurrently download artifacts of the data supplement that are not already cached and valid.
+
+        :param names:                           Optional.  Names of the artifacts to download; all if None.
+        :type names:                            list
+
+        :return:                                dict; artifact name to full path of the downloaded file
+
+        """
+
+        artifacts = [self.artifact(i) for i in names] if names is not None else list(self.manifest)
+        paths = {i['name']: os.path.join(self.example_data_directory, i['name']) for i in artifacts}
+
+        pending = [i for i in artifacts if not self.is_valid(paths[i['name']], i)]
+
+        td = time.time()
+
+        if pending:
+            with self.build_session() as session, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                n_bytes = sum(executor.map(lambda artifact: self.download_artifact(session, artifact), pending))
+        else:
+            n_bytes = 0
+
+        seconds = time.time() - td
+
+        self.download_stats = {'artifacts': len(pending),
+                               'cached': len(artifacts) - len(pending),
+                               'bytes': n_bytes,
+                               'seconds': seconds,
+                               'throughput_mb_per_second': n_bytes / 1e6 / seconds if seconds > 0 else 0.0}
+
+        logging.info(f"Downloaded {len(pending)} artifact(s) ({n_bytes / 1e6:.2f} MB) in {seconds:.2f} s "
+                     f"({self.download_stats['throughput_mb_per_second']:.2f} MB/s); "
+                     f"{self.download_stats['cached']} already cached")
+
+        return paths
+
+    def fetch_data(self, name=None, extract=False):
+        """Download an artifact of the data supplement to the cache, if not already present, and open it as a data
+        store that reads members directly from the archive.
+
+        :param name:                            Optional.  Name of the artifact; the first artifact if None.
+        :type name:                             str
+
+        :param extract:                         Optional.  Also extract every member to `example_data_directory`.
+        :type extract:                          bool
+
+        :return:                                ZipDataStore
+
+        """
+
+        name = self.artifact(name)['name']
+        archive = self.download_artifacts([name])[name]
+
+        logging.info(f"Data supplement archive:  {archive}")
+
+        store = ZipDataStore(archive)
+
+        if extract:
+            store.extract(self.example_data_directory)
+
+        return store
+
+    def fetch_all_data(self, extract=False):
+        """Concurrently download every artifact of the data supplement and open each zip archive as a data store.
+        Artifacts that are not zip archives are left as downloaded in `example_data_directory`.
+
+        :param extract:                         Optional.  Also extract every member to `example_data_directory`.
+        :type extract:                          bool
+
+        :return:                                dict; artifact name to ZipDataStore, or to the full path of the
+                                                downloaded file for artifacts that are not zip archives
+
+        """
+
+        stores = {}
+
+        for name, path in self.download_artifacts().items():
+
+            if zipfile.is_zipfile(path):
+                stores[name] = ZipDataStore(path)
+
+                if extract:
+                    stores[name].extract(self.example_data_directory)
+
+            else:
+                logging.info(f"Artifact '{name}' is not a zip archive; left unextracted:  {path}")
+                stores[name] = path
+
+        return stores
 
     def fetch_unpack_data(self):
         """Download and unzip example data supplement for the current distribution."""
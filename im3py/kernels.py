@@ -0,0 +1,294 @@
+"""Registry of step kernels with pure-Python, NumPy-vectorized, and optional Numba-compiled implementations.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import logging
+
+import numpy as np
+
+import im3py.some_code as fake
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# errors raised when Numba cannot type or compile a kernel; other errors are bugs or bad inputs and are raised
+if numba is None:
+    NUMBA_ERRORS = ()
+else:
+    try:
+        from numba.core.errors import NumbaError
+    except ImportError:
+        from numba.errors import NumbaError
+
+    NUMBA_ERRORS = (NumbaError,)
+
+
+# backends in order of preference; the first available backend is selected when `backend='auto'`
+BACKEND_NUMBA = 'numba'
+BACKEND_NUMPY = 'numpy'
+BACKEND_PYTHON = 'python'
+BACKEND_AUTO = 'auto'
+BACKENDS = (BACKEND_NUMBA, BACKEND_NUMPY, BACKEND_PYTHON)
+
+# registered kernels by name
+_REGISTRY = {}
+
+
+class Kernel:
+    """A step kernel that declares its inputs and outputs and carries one or more backend implementations.
+
+    All implementations must accept the declared inputs as positional arguments in order and return the same
+    result.  The pure-Python implementation is required and is the reference used for parity testing.
+
+    :param name:                                Unique name of the kernel.
+    :type name:                                 str
+
+    :param inputs:                              Names of the inputs in the order they are passed.
+    :type inputs:                               tuple
+
+    :param outputs:                             Names of the outputs that the kernel returns.
+    :type outputs:                              tuple
+
+    :param python:                              Pure-Python implementation.
+    :type python:                               function
+
+    :param numpy:                               Optional.  NumPy-vectorized implementation.
+    :type numpy:                                function
+
+    :param numba:                               Optional.  Python function written in the Numba nopython subset.
+                                                It is compiled for the CPU on first use if Numba is installed.
+    :type numba:                                function
+
+    """
+
+    def __init__(self, name, inputs, outputs, python, numpy=None, numba=None):
+
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+        self._implementations = {BACKEND_PYTHON: python,
+                                 BACKEND_NUMPY: numpy,
+                                 BACKEND_NUMBA: numba}
+
+        # compiled Numba dispatcher; built lazily
+        self._compiled = None
+
+    def __repr__(self):
+
+        return f"Kernel(name='{self.name}', inputs={self.inputs}, outputs={self.outputs}, backends={self.available_backends})"
+
+    @property
+    def available_backends(self):
+        """Backends that have an implementation and whose dependencies are installed, in order of preference."""
+
+        available = []
+
+        for backend in BACKENDS:
+
+            if self._implementations[backend] is None:
+                continue
+
+            if backend == BACKEND_NUMBA and numba is None:
+                continue
+
+            available.append(backend)
+
+        return tuple(available)
+
+    def select_backend(self, backend=BACKEND_AUTO):
+        """Resolve the backend to use.  'auto' and requests for a backend that is not available resolve to the
+        preferred available backend in the order of `BACKENDS`.  The order is not a measurement:  for very small
+        inputs the pure-Python backend can be faster, so use `Model.plan` to time the backends on a workload.
+
+        :param backend:                         Requested backend; one of 'auto', 'numba', 'numpy', or 'python'.
+                                                None is treated as 'auto'.
+        :type backend:                          str
+
+        :return:                                str; name of the selected backend
+
+        """
+
+        available = self.available_backends
+
+        if backend is None or backend == BACKEND_AUTO:
+            return available[0]
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Kernel backend '{backend}' is not one of:  {(BACKEND_AUTO,) + BACKENDS}")
+
+        if backend in available:
+            return backend
+
+        fallback = available[0]
+        logging.warning(f"Backend '{backend}' is not available for kernel '{self.name}'; using '{fallback}'.")
+
+        return fallback
+
+    def implementation(self, backend=BACKEND_AUTO):
+        """Get the callable implementation for a backend.
+
+        :param backend:                         Requested backend; see `select_backend`.
+        :type backend:                          str
+
+        :return:                                function
+
+        """
+
+        backend = self.select_backend(backend)
+
+        if backend != BACKEND_NUMBA:
+            return self._implementations[backend]
+
+        if self._compiled is None:
+            self._compiled = self.compile_numba(self._implementations[BACKEND_NUMBA])
+
+        return self._compiled
+
+    @staticmethod
+    def compile_numba(func):
+        """Compile a function with Numba for the CPU.  List and tuple inputs are converted to float64 arrays
+        since Numba does not accept reflected Python lists efficiently.
+
+        :param func:                            Function written in the Numba nopython subset.
+        :type func:                             function
+
+        :return:                                function
+
+        """
+
+        dispatcher = numba.njit(cache=False)(func)
+
+        def compiled(*args):
+            args = [np.asarray(i, dtype=np.float64) if isinstance(i, (list, tuple)) else i for i in args]
+            return dispatcher(*args)
+
+        compiled.__name__ = func.__name__
+
+        return compiled
+
+    def __call__(self, *args, backend=BACKEND_AUTO):
+        """Run the kernel with the selected backend.
+
+        :param args:                            Inputs in the order declared by `inputs`.
+
+        :param backend:                         Requested backend; see `select_backend`.
+        :type backend:                          str
+
+        """
+
+        if len(args) != len(self.inputs):
+            raise TypeError(f"Kernel '{self.name}' expects inputs {self.inputs}; received {len(args)} argument(s).")
+
+        func = self.implementation(backend)
+
+        if func is not self._compiled:
+            return func(*args)
+
+        # Numba compiles on first call; fall back cleanly if the kernel cannot be typed
+        try:
+            return func(*args)
+        except NUMBA_ERRORS as e:
+            logging.warning(f"Numba backend failed for kernel '{self.name}' ({e}); disabling it for this kernel.")
+            self._implementations[BACKEND_NUMBA] = None
+            self._compiled = None
+            return self.implementation(BACKEND_AUTO)(*args)
+
+
+def register_kernel(kernel, overwrite=False):
+    """Add a kernel to the registry.
+
+    :param kernel:                              Kernel to register.
+    :type kernel:                               Kernel
+
+    :param overwrite:                           Replace an existing kernel with the same name.
+    :type overwrite:                            bool
+
+    :return:                                    Kernel
+
+    """
+
+    if kernel.name in _REGISTRY and not overwrite:
+        raise KeyError(f"Kernel '{kernel.name}' is already registered.  Use `overwrite=True` to replace it.")
+
+    _REGISTRY[kernel.name] = kernel
+
+    return kernel
+
+
+def get_kernel(name):
+    """Get a registered kernel by name.
+
+    :param name:                                Name of the kernel.
+    :type name:                                 str
+
+    :return:                                    Kernel
+
+    """
+
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"Kernel '{name}' is not registered.  Registered kernels:  {sorted(_REGISTRY)}")
+
+
+def list_kernels():
+    """List the names of all registered kernels."""
+
+    return sorted(_REGISTRY)
+
+
+def _numpy_sum(list_of_values):
+    """NumPy implementation of the sum kernel."""
+
+    return float(np.sum(np.asarray(list_of_values, dtype=np.float64)))
+
+
+def _numpy_mean(list_of_values):
+    """NumPy implementation of the mean kernel."""
+
+    return float(np.mean(np.asarray(list_of_values, dtype=np.float64)))
+
+
+def _numba_sum(list_of_values):
+    """Numba implementation of the sum kernel; follows the summation order of the Python reference."""
+
+    total = 0.0
+
+    for value in list_of_values:
+        total += value
+
+    return total
+
+
+def _numba_mean(list_of_values):
+    """Numba implementation of the mean kernel; follows the summation order of the Python reference."""
+
+    total = 0.0
+
+    for value in list_of_values:
+        total += value
+
+    return total / len(list_of_values)
+
+
+register_kernel(Kernel(name='sum',
+                       inputs=('list_of_values',),
+                       outputs=('value',),
+                       python=fake.get_sum,
+                       numpy=_numpy_sum,
+                       numba=_numba_sum))
+
+register_kernel(Kernel(name='mean',
+                       inputs=('list_of_values',),
+                       outputs=('value',),
+                       python=fake.get_mean,
+                       numpy=_numpy_mean,
+                       numba=_numba_mean))
@@ -8,13 +8,54 @@ License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
 """
 
 import logging
+import multiprocessing
 import os
+import shutil
 import time
 
+import numpy as np
+
+import im3py.incremental as incremental
+import im3py.planner as planner
 import im3py.process_step as proc
+import im3py.tracing as tracing
+from im3py.data_store import ZipDataStore
+from im3py.kernels import get_kernel
+from im3py.output_writer import (JOURNAL_DIRECTORY, NullWriter, OutputWriter, read_output, recover_outputs,
+                                 resolve_output_path)
 
 # Logger inherits ReadConfig
 from im3py.logger import Logger
+from im3py.progress import CancellationToken, ProgressReporter
+from im3py.resources import ResourceProbe
+
+
+# model and snapshot that forked branch workers continue from; only set while `Model.branch` runs
+_BRANCH_SOURCE = None
+
+
+def _run_branch(task):
+    """Continue a branch in a forked worker from the model state inherited from the parent process."""
+
+    model, snapshot = _BRANCH_SOURCE
+    index, overrides = task
+
+    model.restore(snapshot)
+
+    # log each branch to its own directory instead of the inherited handlers
+    model.close_logger()
+
+    for key, value in overrides.items():
+        setattr(model, key, value)
+
+    model.initialize_logger()
+    model.log_parameters()
+
+    try:
+        return model.run_branch(index, overrides)
+    finally:
+        model.close_logger()
+        tracing.flush()
 
 
 class Model(Logger):
@@ -22,9 +63,10 @@ class Model(Logger):
     Input parameters are specified and controlled in ReadConfig class in 'read_config.py'.
 
     :param config_file:                         Full path to configuration YAML file with file name and
-                                                extension. If not provided by the user, the code will default to the
-                                                expectation of alternate arguments.
-    :type config_file:                          str
+                                                extension, or an already parsed configuration mapping (e.g., a
+                                                scenario view from `ScenarioFile`). If not provided by the user, the
+                                                code will default to the expectation of alternate arguments.
+    :type config_file:                          str; collections.abc.Mapping
 
 
     :param output_directory:                    Full path with file name and extension to the output directory
@@ -40,12 +82,96 @@ class Model(Logger):
     :param time_step:                           Number of steps
     :type time_step:                            int
 
-    :param alpha_param:                         Alpha parameter for model.  Acceptable range:  -2.0 to 2.0
-    :type alpha_param:                          float
-
-
-    :param beta_param:                          Beta parameter for model.  Acceptable range:  -2.0 to 2.0
-    :type beta_param:                           float
+    :param alpha_param:                         Alpha parameter for model.  Acceptable range:  -2.0 to 2.0.  May also
+                                                be a trajectory with one value per step, or a dictionary with a
+                                                'schedule' of step to value and an optional 'interpolation' of 'step'
+                                                (default) or 'linear'.
+    :type alpha_param:                          float; list; numpy.ndarray; dict
+
+
+    :param beta_param:                          Beta parameter for model.  Acceptable range:  -2.0 to 2.0.  Accepts
+                                                the same trajectory and schedule forms as `alpha_param`.
+    :type beta_param:                           float; list; numpy.ndarray; dict
+
+    :param write_logfile:                       Optional, choose to write log as file.
+    :type write_logfile:                        bool
+
+    :param time_unit:                           Optional.  Unit of the time step; one of 'Y' (years; default),
+                                                'M' (months), 'W' (weeks), 'D' (days), 'h' (hours), 'm' (minutes), or
+                                                's' (seconds).  For units other than years, `start_step` and
+                                                `through_step` are ISO 8601 strings (e.g., '2015-01').
+    :type time_unit:                            str
+
+    :param time_steps:                          Optional.  List of irregular time steps as integer years or ISO 8601
+                                                strings in ascending order.  If provided, `start_step`,
+                                                `through_step`, and `time_step` are not used.
+    :type time_steps:                           list
+
+    :param supplement_archive:                  Optional.  Full path with file name and extension to a zip archive of
+                                                supplement input data.  Inputs are read directly from the archive
+                                                through `Model.supplement` without extracting it.
+    :type supplement_archive:                   str
+
+    :param output_layout:                       Optional.  Layout of the step outputs in the output directory; one of
+                                                'flat' (default), 'time' (nested by decade, year, month, and day), or
+                                                'hash' (nested by hash prefix).  The layout is recorded in the output
+                                                directory so that readers resolve outputs to the same paths.
+    :type output_layout:                        str; dict
+
+    :param output_compression:                  Optional.  Codec used to compress step outputs; one of 'gzip',
+                                                'bz2', 'lzma', or 'zstd' (requires `zstandard`).  Compressed outputs
+                                                get the codec extension (e.g., 'output_year_2015.txt.gz') and are read
+                                                back with `Model.read_output`.
+    :type output_compression:                   str
+
+    :param output_durability:                   Optional.  When step outputs are synced to disk; 'none' (default),
+                                                'file' (every file), 'close' (once when the run closes), or a number
+                                                of steps N (every N steps).
+    :type output_durability:                    str; int
+
+    :param output_buffer_size:                  Optional.  Number of bytes of step outputs collected in memory before
+                                                they are written together; 0 (default) writes every step immediately.
+    :type output_buffer_size:                   int
+
+    :param progress_callback:                   Optional.  A callable or list of callables that receive a dictionary
+                                                of progress information (completed steps, steps/s, ETA) during
+                                                `run_all_steps`.
+    :type progress_callback:                    callable; list
+
+    :param progress_interval:                   Minimum number of seconds between progress reports.
+    :type progress_interval:                    float
+
+    :param status_file:                         Optional.  Full path with file name and extension to a JSON status
+                                                file that is rewritten with each progress report so that schedulers
+                                                can poll the run.
+    :type status_file:                          str
+
+    :param cancel_token:                        Optional.  A `CancellationToken` that is checked between steps.  When
+                                                cancelled, the run stops after the current step and closes cleanly.
+    :type cancel_token:                         CancellationToken
+
+    :param kernel_backend:                      Backend used to run the step kernels; one of 'auto', 'numba',
+                                                'numpy', or 'python'.  'auto' selects the preferred backend that is
+                                                available and falls back cleanly when Numba is not installed.
+    :type kernel_backend:                       str
+
+    :param trace:                               Optional.  Record a timeline of step compute, writes, logging, and
+                                                worker waits and export it as Chrome Trace Event JSON to
+                                                'trace_<datetime>.json' in the output directory when the run closes.
+                                                View it in Perfetto or chrome://tracing.
+    :type trace:                                bool
+
+    :param incremental:                         Optional.  Save the resolved parameters and per-step inputs of the
+                                                run to 'run_parameters.json' in the output directory and, on the next
+                                                incremental run in the same directory, reuse the outputs of every step
+                                                whose inputs are unchanged.  What was reused is logged and available
+                                                as `incremental_report`.
+    :type incremental:                          bool
+
+    :param write_outputs:                       Optional.  Write the output file of each step.  If False, step values
+                                                are computed and returned by `advance_step` but no output files are
+                                                written, e.g. for ensemble members whose values go to a results store.
+    :type write_outputs:                        bool
 
     Examples:
 
@@ -88,13 +214,91 @@ class Model(Logger):
         # close out run
         >>> run.close()
 
+        # Option 4:  pass full per-step trajectories instead of updating parameters between steps
+        >>> run = Model(output_directory="<output directory path>",
+        >>>             start_step=2015,
+        >>>             through_step=2030,
+        >>>             time_step=1,
+        >>>             alpha_param={'schedule': {2015: 0.5, 2030: 2.0}, 'interpolation': 'linear'},
+        >>>             beta_param=[1.42] * 8 + [1.0] * 8)
+        >>> run.run_all_steps()
+
+        # Option 5:  run a shared prefix of steps once and branch into several parameter changes from there
+        >>> run.initialize()
+        >>> run.advance_step()
+        >>> run.advance_step()
+        >>> results = run.branch(3, [{'alpha_param': -1.0}, {'alpha_param': 0.0}, {'alpha_param': 1.0}])
+        >>> run.close()
+
+        # Option 6:  report progress to a callback and a status file and stop cleanly on request
+        >>> from im3py.progress import CancellationToken
+        >>> token = CancellationToken(cancel_file="<path to a file a scheduler can create to stop the run>")
+        >>> run = Model(config_file="<path to your config file with the file name and extension.>",
+        >>>             progress_callback=print,
+        >>>             progress_interval=30,
+        >>>             status_file="<path to status JSON file>",
+        >>>             cancel_token=token)
+        >>> run.run_all_steps()
+
     """
 
+    # parameters that may be changed when branching
+    BRANCH_KEYS = ('alpha_param', 'beta_param', 'output_directory')
+
+    # directory within the output directory holding the event files of each process while a run is traced
+    TRACE_DIRECTORY = '.im3py_trace'
+
     def __init__(self, config_file=None, output_directory=None, start_step=None,  through_step=None,
-                 time_step=None, alpha_param=None, beta_param=None, write_logfile=True):
+                 time_step=None, alpha_param=None, beta_param=None, write_logfile=True, progress_callback=None,
+                 progress_interval=10.0, status_file=None, cancel_token=None, kernel_backend='auto', time_unit=None,
+                 time_steps=None, supplement_archive=None, output_layout=None, output_compression=None,
+                 output_durability=None, output_buffer_size=None, trace=False, incremental=False,
+                 write_outputs=True):
 
         super(Logger, self).__init__(config_file, output_directory, start_step,  through_step,
-                                     time_step, alpha_param, beta_param, write_logfile)
+                                     time_step, alpha_param, beta_param, write_logfile, time_unit, time_steps,
+                                     supplement_archive, output_layout, output_compression, output_durability,
+                                     output_buffer_size)
+
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.status_file = status_file
+
+        if cancel_token is None:
+            self.cancel_token = CancellationToken()
+        else:
+            self.cancel_token = cancel_token
+
+        # progress reporter for the current run; created by `run_all_steps`
+        self.progress = None
+
+        self.kernel_backend = kernel_backend
+
+        # tracing is exported by the run that enabled it
+        self.trace = trace
+        self._owns_trace = False
+
+        # incremental runs reuse the outputs of unchanged steps of the previous run in the output directory
+        self.incremental = incremental
+        self.incremental_report = None
+        self._signatures = None
+        self._reuse = {}
+        self._step_records = {}
+
+        # runs without output files still compute and return the value of each step
+        self.write_outputs = write_outputs
+
+        # data store over the supplement archive; opened on first use
+        self._supplement = None
+
+        # index of the next step to process on the time axis
+        self._step_index = 0
+
+        # output path of each step relative to the output directory; computed once on first use
+        self._output_paths = None
+
+        # writer of the step outputs; created on first use
+        self._writer = None
 
         # initialize time step generator
         self._timestep_generator = self.build_timestep_generator()
@@ -113,14 +317,108 @@ class Model(Logger):
         logging.info(f"start_step = {self.start_step}")
         logging.info(f"through_step = {self.through_step}")
         logging.info(f"time_step = {self.time_step}")
-        logging.info(f"alpha_param = {self.alpha_param}")
-        logging.info(f"beta_param = {self.beta_param}")
+        logging.info(f"time_unit = {self.time_unit}")
+        logging.info(f"time_axis = {self.time_axis}")
+        logging.info(f"alpha_param = {self.describe_parameter(self.alpha_param)}")
+        logging.info(f"beta_param = {self.describe_parameter(self.beta_param)}")
+        logging.info(f"supplement_archive = {self.supplement_archive}")
+        logging.info(f"output_layout = {self.output_layout.to_dict()}")
+        logging.info(f"output_compression = {self.output_compression}")
+        logging.info(f"output_durability = {self.output_durability}")
+        logging.info(f"output_buffer_size = {self.output_buffer_size}")
+
+        for name in (proc.START_STEP_KERNEL, proc.STEP_KERNEL):
+            logging.info(f"kernel '{name}' backend = {get_kernel(name).select_backend(self.kernel_backend)}")
+
+    @staticmethod
+    def describe_parameter(value):
+        """Describe a scalar parameter or a per-step trajectory for the log."""
+
+        if np.ndim(value) == 0:
+            return value
+
+        return f"trajectory of {len(value)} values from {value[0]} to {value[-1]} (min {value.min()}, max {value.max()})"
+
+    @property
+    def supplement(self):
+        """Data store that reads supplement inputs directly from the zip archive; None if no archive is set."""
+
+        if self._supplement is None and self.supplement_archive is not None:
+            self._supplement = ZipDataStore(self.supplement_archive)
+
+        return self._supplement
+
+    @property
+    def output_paths(self):
+        """Output path of each step relative to the output directory under the output layout."""
+
+        if self._output_paths is None:
+            self._output_paths = self.output_layout.relative_paths(self.time_axis)
+
+        return self._output_paths
+
+    def output_path(self, step):
+        """Full path to the output of a step.
+
+        :param step:                            Time step as an integer year or ISO 8601 string
+        :type step:                             int; str
+
+        :return:                                str
+
+        """
+
+        return os.path.join(self.output_directory, *self.output_paths[self.time_axis.index(step)].split('/'))
+
+    @property
+    def writer(self):
+        """Writer of the step outputs with the configured compression, buffering, and durability."""
+
+        if self._writer is None and not self.write_outputs:
+            self._writer = NullWriter(self.output_compression)
+
+        if self._writer is None:
+            self._writer = OutputWriter(self.output_compression, durability=self.output_durability,
+                                        buffer_size=self.output_buffer_size,
+                                        journal_directory=os.path.join(self.output_directory, JOURNAL_DIRECTORY))
+
+        return self._writer
+
+    def read_output(self, step):
+        """Read the output of a step, decompressing it if it was written with a codec.
+
+        :param step:                            Time step as an integer year or ISO 8601 string
+        :type step:                             int; str
+
+        :return:                                str
+
+        """
+
+        return read_output(self.output_path(step))
+
+    def prepare_output_directory(self, output_directory):
+        """Create the output directory and the directories of the output layout, and record the layout."""
+
+        self.make_dir(output_directory)
+
+        # finish committing outputs of an earlier run that was killed part way through a batch
+        recover_outputs(output_directory)
+
+        if not self.write_outputs:
+            return
+
+        layout = self.output_layout
+        layout.write_marker(output_directory)
+        layout.make_directories(output_directory, self.output_paths)
 
     def initialize(self):
         """Setup model."""
 
         # build output directory first to store logfile and other outputs
-        self.make_dir(self.output_directory)
+        self.prepare_output_directory(self.output_directory)
+
+        if self.trace and not tracing.is_enabled():
+            tracing.enable(os.path.join(self.output_directory, self.TRACE_DIRECTORY))
+            self._owns_trace = True
 
         # initialize logger
         self.initialize_logger()
@@ -131,22 +429,343 @@ class Model(Logger):
         logging.info("Model parameters:")
         self.log_parameters()
 
-    def build_timestep_generator(self):
-        """Construct time step generator from ProcessStep class."""
+        if self.incremental:
+            self.plan_incremental()
+
+    def step_signature(self, index):
+        """Inputs that determine the output of a step; a step whose signature is unchanged can be reused.
+
+        :param index:                           Index of the step on the time axis
+        :type index:                            int
+
+        :return:                                dict
+
+        """
+
+        return {'step': self.time_axis.steps[index],
+                'alpha_param': float(self.alpha_trajectory[index]),
+                'beta_param': float(self.beta_trajectory[index]),
+                'kernel': proc.START_STEP_KERNEL if index == 0 else proc.STEP_KERNEL,
+                'path': self.output_paths[index] + self.writer.extension}
+
+    def plan_incremental(self):
+        """Diff this run against the run parameters saved in the output directory and select the steps to reuse.
+
+        :return:                                dict; 'changed' parameters, and the 'reused', 'computed', and
+                                                'dropped' steps
+
+        """
+
+        saved = incremental.read_run_parameters(self.output_directory)
+
+        self._signatures = [self.step_signature(i) for i in range(len(self.time_axis))]
+
+        self._reuse = incremental.plan_reuse(saved, self._signatures,
+                                             lambda i: os.path.isfile(os.path.join(self.output_directory,
+                                                                                   *i['path'].split('/'))))
+
+        self.incremental_report = incremental.report(saved, self.resolved_parameters, self._signatures, self._reuse)
+
+        # until this run closes, list only the steps whose outputs are valid so that a run interrupted after
+        # overwriting outputs does not have them reused with the inputs of the previous run
+        self.save_run_parameters(completed=False)
+
+        return self.incremental_report
+
+    def plan(self, members=1, cpus=None, sample_steps=5):
+        """Run a short calibration sample of steps in a temporary directory and choose the execution strategy and
+        output sink for this workload without running it.  The output directory is not touched.
+
+        :param members:                         Number of members of the same size, e.g. of an ensemble
+        :type members:                          int
+
+        :param cpus:                            Optional.  Number of CPUs available; probed if None.
+        :type cpus:                             int
+
+        :param sample_steps:                    Number of steps run to calibrate the costs
+        :type sample_steps:                     int
+
+        :return:                                ExecutionPlan; printing it shows the predicted runtime and I/O volume
+
+        """
+
+        return planner.plan(self, members, cpus, sample_steps)
+
+    def save_run_parameters(self, completed=True):
+        """Save the resolved parameters and the steps of an incremental run whose outputs are valid.
+
+        :param completed:                       Include the steps computed by this run; only once their outputs are
+                                                written.
+        :type completed:                        bool
 
-        for step in self.step_list:
-            yield proc.process_step(step, self.alpha_param, self.beta_param, self.start_step, self.output_directory)
+        """
+
+        records = dict(self._step_records) if completed else {}
+
+        # reusable steps that were not reached still have valid outputs
+        for index, value in self._reuse.items():
+            records.setdefault(index, dict(self._signatures[index], value=value))
+
+        incremental.write_run_parameters(self.output_directory, self.resolved_parameters,
+                                         [records[i] for i in sorted(records)])
+
+    def build_timestep_generator(self, start_index=0):
+        """Construct time step generator from ProcessStep class.
+
+        :param start_index:                     Index on the time axis of the first step to process
+        :type start_index:                      int
+
+        """
+
+        time_axis = self.time_axis
+        start_step = time_axis[0]
+        output_paths = self.output_paths
+        writer = self.writer
+
+        for index in range(start_index, len(time_axis)):
+
+            signature = self.step_signature(index) if self.incremental else None
+
+            # parameters reassigned between steps change the signature and force the step to be recomputed
+            if signature is not None and index in self._reuse and signature == self._signatures[index]:
+                value = self._reuse[index]
+                logging.info(f"Reusing the output of step {time_axis[index]} from the previous run")
+
+            else:
+                # the saved output of a reusable step is about to be overwritten
+                if index in self._reuse:
+                    self._reuse.pop(index)
+                    self.save_run_parameters(completed=False)
+
+                # trajectories are resolved and validated once; reassigning a parameter between steps refreshes them
+                with tracing.span('step', tracing.CATEGORY_RUN, step=time_axis[index]):
+                    value = proc.process_step(time_axis[index], float(self.alpha_trajectory[index]),
+                                              float(self.beta_trajectory[index]), start_step, self.output_directory,
+                                              backend=self.kernel_backend, file_name=output_paths[index],
+                                              writer=writer)
+
+            if signature is not None:
+                self._step_records[index] = dict(signature, value=float(value))
+
+            self._step_index = index + 1
+
+            yield value
+
+    @property
+    def step_index(self):
+        """Index on the time axis of the next step to process."""
+
+        return self._step_index
+
+    def snapshot(self):
+        """Capture the position of the time step generator and the resolved run state.
+
+        :return:                                dict; snapshot that can be passed to `restore`
+
+        """
+
+        time_axis = self.time_axis
+
+        return {'step_index': self._step_index,
+                'next_step': time_axis[self._step_index] if self._step_index < len(time_axis) else None,
+                'output_directory': self.output_directory,
+                'alpha_param': self.alpha_param,
+                'beta_param': self.beta_param}
+
+    def restore(self, snapshot):
+        """Return the model to the state captured by `snapshot`.
+
+        :param snapshot:                        Snapshot from `snapshot()`
+        :type snapshot:                         dict
+
+        """
+
+        self.output_directory = snapshot['output_directory']
+        self.alpha_param = snapshot['alpha_param']
+        self.beta_param = snapshot['beta_param']
+
+        self._step_index = snapshot['step_index']
+        self._timestep_generator = self.build_timestep_generator(self._step_index)
+
+    def branch(self, n, param_overrides, workers=None, link_prefix=True):
+        """Continue the run from the current step into `n` branches with different parameters.  The steps already
+        processed (the prefix) are computed once.  Each branch runs the remaining steps in a worker process forked
+        from this one so the prefix state is shared copy-on-write; where fork is not available, branches run one
+        after the other in this process.
+
+        :param n:                               Number of branches
+        :type n:                                int
+
+        :param param_overrides:                 A dictionary of parameter overrides applied to every branch, or a
+                                                list of `n` dictionaries, one per branch.  Supported keys are
+                                                'alpha_param', 'beta_param', and 'output_directory'.  Branches write
+                                                to '<output_directory>/branch_<n>' unless overridden.
+        :type param_overrides:                  dict; list
+
+        :param workers:                         Optional.  Number of worker processes; defaults to `n` limited by the
+                                                CPU affinity mask and cgroup CPU quota (see `ResourceProbe`).
+        :type workers:                          int
+
+        :param link_prefix:                     Hard link (or copy) the prefix outputs into each branch directory
+                                                so that each branch holds a complete set of outputs.
+        :type link_prefix:                      bool
+
+        :return:                                list; one dictionary per branch with the keys 'branch',
+                                                'output_directory', 'alpha_param', 'beta_param', and 'values'
+
+        """
+
+        if isinstance(param_overrides, dict):
+            param_overrides = [param_overrides] * n
+
+        if len(param_overrides) != n:
+            raise ValueError(f"Expected {n} sets of parameter overrides; received {len(param_overrides)}.")
+
+        unknown = set().union(*param_overrides) - set(self.BRANCH_KEYS)
+        if unknown:
+            raise ValueError(f"Branch overrides {sorted(unknown)} are not one of:  {self.BRANCH_KEYS}")
+
+        # pending outputs of the prefix are written before they are linked and before workers are forked
+        self.writer.flush()
+
+        snapshot = self.snapshot()
+
+        logging.info(f"Branching into {n} runs at step index {snapshot['step_index']} ({snapshot['next_step']})")
+
+        tasks = []
+
+        for index, overrides in enumerate(param_overrides):
+
+            overrides = dict(overrides)
+            overrides.setdefault(self.OUT_DIR_KEY, os.path.join(snapshot['output_directory'], f"branch_{index}"))
+
+            self.prepare_output_directory(overrides[self.OUT_DIR_KEY])
+
+            if link_prefix:
+                self.link_outputs(snapshot['output_directory'], overrides[self.OUT_DIR_KEY], snapshot['step_index'])
+
+            tasks.append((index, overrides))
+
+        if workers is None:
+            workers = ResourceProbe().plan(n)['workers']
+
+        global _BRANCH_SOURCE
+
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+
+            _BRANCH_SOURCE = (self, snapshot)
+
+            try:
+                with multiprocessing.get_context('fork').Pool(processes=workers) as pool, \
+                        tracing.span('wait for branches', tracing.CATEGORY_WAIT, branches=n):
+                    results = pool.map(_run_branch, tasks)
+            finally:
+                _BRANCH_SOURCE = None
+
+        else:
+
+            results = []
+
+            try:
+                for task in tasks:
+                    self.restore(snapshot)
+                    results.append(self.run_branch(*task))
+            finally:
+                self.restore(snapshot)
+
+        return results
+
+    def run_branch(self, index, overrides):
+        """Run the remaining steps of the time axis with parameter overrides applied.
+
+        :param index:                           Branch number
+        :type index:                            int
+
+        :param overrides:                       Parameter overrides for the branch
+        :type overrides:                        dict
+
+        :return:                                dict
+
+        """
+
+        for key, value in overrides.items():
+            setattr(self, key, value)
+
+        n_remaining = len(self.time_axis) - self._step_index
+        values = [self.advance_step() for _ in range(n_remaining)]
+
+        self.writer.close()
+
+        return {'branch': index,
+                'output_directory': self.output_directory,
+                'alpha_param': self.alpha_param,
+                'beta_param': self.beta_param,
+                'values': values}
+
+    def link_outputs(self, source_directory, target_directory, n_steps):
+        """Hard link, or copy where links are not supported, the outputs of the first `n_steps` steps.
+
+        :param source_directory:                Directory holding the outputs
+        :type source_directory:                 str
+
+        :param target_directory:                Directory to link the outputs into
+        :type target_directory:                 str
+
+        :param n_steps:                         Number of steps from the start of the time axis
+        :type n_steps:                          int
+
+        """
+
+        for relative_path in self.output_paths[:n_steps]:
+
+            path = os.path.join(source_directory, *relative_path.split('/'))
+            source = resolve_output_path(path)
+
+            if source is None:
+                continue
+
+            # keep the compression extension of the output as written
+            target = os.path.join(target_directory, *relative_path.split('/')) + source[len(path):]
+
+            if os.path.exists(target):
+                continue
+
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
 
     def advance_step(self):
-        """Advance time step."""
+        """Advance time step.
+
+        :return:                                float; value calculated for the step
+
+        """
 
-        next(self._timestep_generator)
+        return next(self._timestep_generator)
 
     def close(self):
         """End model run and close log files."""
 
         logging.info("End time:  {}".format(time.strftime(self.datetime_format)))
 
+        if self._supplement is not None:
+            self._supplement.close()
+            self._supplement = None
+
+        if self._writer is not None:
+            self._writer.close()
+
+        # saved once every output it records has been written
+        if self.incremental and self._signatures is not None:
+            self.save_run_parameters()
+
+        if self._owns_trace:
+            trace_file = os.path.join(self.output_directory, f"trace_{self.date_time_string}.json")
+            tracing.export(trace_file, clean=True)
+            self._owns_trace = False
+            logging.info(f"Trace written to {trace_file}")
+
         # Remove logging handlers
         self.close_logger()
 
@@ -161,13 +780,42 @@ class Model(Logger):
 
         logging.info("Starting model run")
 
-        # process all years
-        for _ in self.step_list:
+        step_list = self.step_list
+
+        self.progress = ProgressReporter(total_steps=len(step_list),
+                                         callbacks=self.progress_callback,
+                                         interval=self.progress_interval,
+                                         status_file=self.status_file)
+        self.progress.start()
+
+        try:
+
+            # process all years; cancellation is checked between steps so no step is left half written
+            for step in step_list:
+
+                if self.cancel_token.cancelled:
+                    logging.warning(f"Model run cancelled before step {step}:  {self.cancel_token.reason}")
+                    self.progress.finish(ProgressReporter.STATUS_CANCELLED, self.cancel_token.reason)
+                    break
+
+                logging.info(step)
+                self.advance_step()
+
+                self.progress.update(step)
+
+            else:
+                self.progress.finish(ProgressReporter.STATUS_COMPLETED)
 
-            logging.info(_)
-            self.advance_step()
+        except BaseException as e:
+            self.progress.finish(ProgressReporter.STATUS_FAILED, repr(e))
+            self.close()
+            raise
 
-        logging.info("Model run completed in {} minutes.".format((time.time() - td) / 60))
+        if self.cancel_token.cancelled:
+            logging.info(f"Model run cancelled after {self._step_index} of {len(step_list)} step(s) in "
+                         f"{(time.time() - td) / 60} minutes.")
+        else:
+            logging.info("Model run completed in {} minutes.".format((time.time() - td) / 60))
 
         # clean logger
         self.close()
@@ -0,0 +1,409 @@
+"""Hierarchical output directory layouts that keep the number of entries per directory small for very long runs.
+
+The layout of an output directory is recorded in a marker file so that writers and readers resolve step outputs to
+the same location, and flat directories from earlier runs can be migrated in place:
+
+    python -m im3py.output_layout <output directory> --layout time
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+from im3py.time_axis import TimeAxis
+
+
+# layout schemes
+LAYOUT_FLAT = 'flat'
+LAYOUT_TIME = 'time'
+LAYOUT_HASH = 'hash'
+LAYOUTS = (LAYOUT_FLAT, LAYOUT_TIME, LAYOUT_HASH)
+
+# file recording the layout of an output directory
+MARKER_FILE = '.im3py_layout.json'
+
+# step output file names generated by `TimeAxis.file_names` with an optional compression extension
+OUTPUT_FILE_PATTERN = re.compile(r'^output_(?P<unit>{})_(?P<label>[0-9T\-]+)\.txt(?P<extension>\.[A-Za-z0-9]+)?$'
+                                 .format('|'.join(TimeAxis.UNIT_NAMES.values())))
+
+
+class OutputLayout:
+    """Map step output file names to paths relative to the output directory.
+
+    'flat' writes every output directly in the output directory.  'time' nests outputs by decade, year, month, and
+    day down to one level above the unit of the time axis (e.g., '2010s/2015/output_month_2015-01.txt').  'hash'
+    nests outputs under `hash_levels` directories named by the leading hex digits of the MD5 of the file name, which
+    spreads irregular or very dense time axes evenly.
+
+    :param scheme:                              One of 'flat' (default), 'time', or 'hash'
+    :type scheme:                               str
+
+    :param hash_levels:                         Number of directory levels for the 'hash' scheme
+    :type hash_levels:                          int
+
+    :param hash_width:                          Number of hex digits per directory level for the 'hash' scheme
+    :type hash_width:                           int
+
+    """
+
+    # number of time directory levels (decade, year, month, day) for each unit of the time axis
+    TIME_LEVELS = {'Y': 1, 'M': 2, 'W': 2, 'D': 3, 'h': 4, 'm': 4, 's': 4}
+
+    def __init__(self, scheme=LAYOUT_FLAT, hash_levels=2, hash_width=2):
+
+        if scheme not in LAYOUTS:
+            raise ValueError(f"Output layout '{scheme}' is not one of:  {LAYOUTS}")
+
+        if int(hash_levels) < 1 or int(hash_width) < 1:
+            raise ValueError("`hash_levels` and `hash_width` must be positive integers.")
+
+        self.scheme = scheme
+        self.hash_levels = int(hash_levels)
+        self.hash_width = int(hash_width)
+
+    def __eq__(self, other):
+
+        if not isinstance(other, OutputLayout):
+            return NotImplemented
+
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+
+        return f"OutputLayout({self.to_dict()})"
+
+    @classmethod
+    def from_setting(cls, setting):
+        """Build a layout from a configuration value.
+
+        :param setting:                         None or a scheme name for the default settings, a dictionary with a
+                                                'scheme' and optional 'hash_levels' and 'hash_width', or a layout
+        :type setting:                          str; dict; OutputLayout
+
+        :return:                                OutputLayout
+
+        """
+
+        if isinstance(setting, OutputLayout):
+            return setting
+
+        if setting is None:
+            return cls()
+
+        if isinstance(setting, dict):
+            return cls(**setting)
+
+        return cls(setting)
+
+    @classmethod
+    def detect(cls, directory):
+        """Read the layout recorded in an output directory; directories without a marker are flat."""
+
+        marker = os.path.join(directory, MARKER_FILE)
+
+        if not os.path.isfile(marker):
+            return cls()
+
+        with open(marker) as get:
+            return cls.from_setting(json.load(get))
+
+    def to_dict(self):
+        """Dictionary of the layout settings."""
+
+        if self.scheme == LAYOUT_HASH:
+            return {'scheme': self.scheme, 'hash_levels': self.hash_levels, 'hash_width': self.hash_width}
+
+        return {'scheme': self.scheme}
+
+    @property
+    def is_flat(self):
+        """True if outputs are written directly in the output directory."""
+
+        return self.scheme == LAYOUT_FLAT
+
+    @classmethod
+    def time_directories(cls, values, unit):
+        """Time directories for an array of steps.
+
+        :param values:                          Time steps
+        :type values:                           numpy.ndarray of numpy.datetime64
+
+        :param unit:                            numpy datetime unit of the time axis
+        :type unit:                             str
+
+        :return:                                list of str
+
+        """
+
+        levels = cls.TIME_LEVELS[unit]
+
+        years = values.astype('datetime64[Y]').astype(np.int64) + TimeAxis.EPOCH_YEAR
+        months = values.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        days = (values.astype('datetime64[D]') - values.astype('datetime64[M]').astype('datetime64[D]')).astype(
+            np.int64) + 1
+
+        parts = [[f"{year // 10 * 10}s" for year in years.tolist()],
+                 [str(year) for year in years.tolist()],
+                 [f"{month:02d}" for month in months.tolist()],
+                 [f"{day:02d}" for day in days.tolist()]]
+
+        return ['/'.join(i) for i in zip(*parts[:levels])]
+
+    def hash_directory(self, file_name):
+        """Hash prefix directories for a file name."""
+
+        digest = hashlib.md5(file_name.encode('utf-8')).hexdigest()
+
+        return '/'.join(digest[i * self.hash_width:(i + 1) * self.hash_width] for i in range(self.hash_levels))
+
+    def relative_paths(self, time_axis):
+        """Output path relative to the output directory for every step of a time axis.
+
+        :param time_axis:                       Time axis of the run
+        :type time_axis:                        TimeAxis
+
+        :return:                                list of str
+
+        """
+
+        file_names = time_axis.file_names.tolist()
+
+        if self.scheme == LAYOUT_FLAT:
+            return file_names
+
+        if self.scheme == LAYOUT_TIME:
+            directories = self.time_directories(time_axis.values, time_axis.unit)
+        else:
+            directories = [self.hash_directory(i) for i in file_names]
+
+        return [f"{d}/{f}" for d, f in zip(directories, file_names)]
+
+    def relative_path(self, file_name):
+        """Output path relative to the output directory for a single step output file name.  Compressed outputs are
+        placed with their uncompressed name.
+
+        :param file_name:                       Output file name (e.g., 'output_year_2015.txt' or
+                                                'output_year_2015.txt.gz')
+        :type file_name:                        str
+
+        :return:                                str
+
+        """
+
+        if self.scheme == LAYOUT_FLAT:
+            return file_name
+
+        if self.scheme == LAYOUT_HASH:
+            match = OUTPUT_FILE_PATTERN.match(file_name)
+            extension = match.group('extension') if match else None
+            name = file_name[:-len(extension)] if extension else file_name
+            return f"{self.hash_directory(name)}/{file_name}"
+
+        value, unit = parse_file_name(file_name)
+
+        return f"{self.time_directories(np.array([value]), unit)[0]}/{file_name}"
+
+    def path(self, output_directory, file_name):
+        """Full path to a step output within an output directory."""
+
+        return os.path.join(output_directory, *self.relative_path(file_name).split('/'))
+
+    def make_directories(self, output_directory, relative_paths):
+        """Create each distinct directory of a set of relative output paths once."""
+
+        for directory in sorted({posix_dirname(i) for i in relative_paths} - {''}):
+            os.makedirs(os.path.join(output_directory, *directory.split('/')), exist_ok=True)
+
+    def write_marker(self, output_directory):
+        """Record the layout in an output directory.  Flat directories are not marked so that they are unchanged.
+
+        :raises:                                ValueError if the directory already holds outputs in another layout,
+                                                including flat outputs that a nested layout would orphan
+
+        """
+
+        marker = os.path.join(output_directory, MARKER_FILE)
+
+        if os.path.isfile(marker) and self.detect(output_directory) != self:
+            raise ValueError(f"Output directory '{output_directory}' uses layout {self.detect(output_directory).to_dict()}; migrate it with "
+                             f"`python -m im3py.output_layout` before writing with layout {self.to_dict()}.")
+
+        if self.is_flat:
+            return
+
+        if not os.path.isfile(marker):
+
+            with os.scandir(output_directory) as entries:
+                flat = any(i.is_file() and OUTPUT_FILE_PATTERN.match(i.name) for i in entries)
+
+            if flat:
+                raise ValueError(f"Output directory '{output_directory}' holds flat outputs that layout {self.to_dict()} "
+                                 f"would leave behind; migrate them with `python -m im3py.output_layout "
+                                 f"{output_directory} --layout {self.scheme}` first.")
+
+        with open(marker, 'w') as out:
+            json.dump(self.to_dict(), out)
+
+    def shard_names(self, depth):
+        """Pattern of directory names this layout creates at a depth below the output directory."""
+
+        if self.scheme == LAYOUT_HASH:
+            return re.compile(f'^[0-9a-f]{{{self.hash_width}}}$') if depth < self.hash_levels else None
+
+        if self.scheme == LAYOUT_TIME:
+            return re.compile(r'^-?\d+s$' if depth == 0 else r'^-?\d+$') if depth < 4 else None
+
+        return None
+
+    def iter_outputs(self, output_directory):
+        """Relative paths of all step outputs in an output directory written with this layout.
+
+        Only directories named like this layout's shards are searched, so branch and member subdirectories that hold
+        outputs of their own are not included.
+
+        """
+
+        def walk(relative, depth):
+
+            directory = os.path.join(output_directory, *relative.split('/')) if relative else output_directory
+            pattern = self.shard_names(depth)
+
+            with os.scandir(directory) as entries:
+                for entry in sorted(entries, key=lambda i: i.name):
+
+                    name = f"{relative}/{entry.name}" if relative else entry.name
+
+                    if entry.is_file() and OUTPUT_FILE_PATTERN.match(entry.name):
+                        yield name
+
+                    elif entry.is_dir() and pattern is not None and pattern.match(entry.name):
+                        yield from walk(name, depth + 1)
+
+        return list(walk('', 0))
+
+
+def posix_dirname(relative_path):
+    """Directory part of a '/' separated relative path."""
+
+    return relative_path.rpartition('/')[0]
+
+
+def parse_file_name(file_name):
+    """Recover the step and time unit from a step output file name.
+
+    :param file_name:                           Output file name (e.g., 'output_hour_2015-01-01T05.txt')
+    :type file_name:                            str
+
+    :return:                                    tuple; (numpy.datetime64, unit)
+
+    """
+
+    match = OUTPUT_FILE_PATTERN.match(file_name)
+
+    if match is None:
+        raise ValueError(f"'{file_name}' is not a step output file name.")
+
+    unit = {v: k for k, v in TimeAxis.UNIT_NAMES.items()}[match.group('unit')]
+    label = match.group('label')
+
+    # colons are removed from the time of day in file names
+    if 'T' in label:
+        date, clock = label.split('T')
+        label = f"{date}T{':'.join(clock[i:i + 2] for i in range(0, len(clock), 2))}"
+
+    return TimeAxis.to_datetime64(label, unit), unit
+
+
+def migrate(output_directory, layout, dry_run=False):
+    """Move the step outputs of an existing output directory into another layout in place.
+
+    :param output_directory:                    Full path to the output directory
+    :type output_directory:                     str
+
+    :param layout:                              Target layout as a scheme name, settings dictionary, or layout
+    :type layout:                               str; dict; OutputLayout
+
+    :param dry_run:                             If True, report the moves without changing anything
+    :type dry_run:                              bool
+
+    :return:                                    list; (source, target) relative paths of the moved outputs
+
+    """
+
+    source = OutputLayout.detect(output_directory)
+    target = OutputLayout.from_setting(layout)
+
+    moves = []
+
+    for relative in source.iter_outputs(output_directory):
+
+        new = target.relative_path(relative.rpartition('/')[2])
+
+        if new != relative:
+            moves.append((relative, new))
+
+    logging.info(f"Migrating {len(moves)} outputs in '{output_directory}' from {source.to_dict()} to "
+                 f"{target.to_dict()}")
+
+    if dry_run:
+        return moves
+
+    target.make_directories(output_directory, [new for _, new in moves])
+
+    for old, new in moves:
+        os.replace(os.path.join(output_directory, *old.split('/')), os.path.join(output_directory, *new.split('/')))
+
+    # remove the shard directories of the source layout that are now empty
+    for old in sorted({posix_dirname(old) for old, _ in moves} - {''}, key=len, reverse=True):
+        try:
+            os.removedirs(os.path.join(output_directory, *old.split('/')))
+        except OSError:
+            pass
+
+    marker = os.path.join(output_directory, MARKER_FILE)
+
+    if target.is_flat:
+        if os.path.isfile(marker):
+            os.remove(marker)
+    else:
+        with open(marker, 'w') as out:
+            json.dump(target.to_dict(), out)
+
+    return moves
+
+
+def main(argv=None):
+    """Command line entry point to migrate an output directory to another layout."""
+
+    parser = argparse.ArgumentParser(description="Move the step outputs of an im3py output directory into another "
+                                                 "directory layout in place.")
+    parser.add_argument('output_directory', help="Output directory to migrate")
+    parser.add_argument('--layout', default=LAYOUT_TIME, choices=LAYOUTS, help="Target layout")
+    parser.add_argument('--hash-levels', type=int, default=2, help="Directory levels of the 'hash' layout")
+    parser.add_argument('--hash-width', type=int, default=2, help="Hex digits per level of the 'hash' layout")
+    parser.add_argument('--dry-run', action='store_true', help="Report the moves without changing anything")
+
+    args = parser.parse_args(argv)
+
+    moves = migrate(args.output_directory, OutputLayout(args.layout, args.hash_levels, args.hash_width),
+                    args.dry_run)
+
+    for old, new in moves:
+        print(f"{old} -> {new}")
+
+    print(f"{'Would move' if args.dry_run else 'Moved'} {len(moves)} output(s).")
+
+
+if __name__ == '__main__':
+    main()
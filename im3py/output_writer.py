@@ -0,0 +1,469 @@
+"""Buffered step output writer with optional compression and a configurable durability policy, and the matching
+reader that decompresses transparently.
+
+Every output is written to a temporary file in its final directory and committed by renaming it into place, so an
+output file that exists is always complete.  Batches of outputs record their pending renames in a journal that is
+replayed by `recover_outputs` if a run is killed part way through committing a batch.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import os
+import re
+from collections import namedtuple
+
+import im3py.tracing as tracing
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# a compression codec:  `compress(data, level)` and `decompress(data)` operate on bytes
+Codec = namedtuple('Codec', ['name', 'extension', 'compress', 'decompress'])
+
+# durability policies
+DURABILITY_NONE = 'none'
+DURABILITY_FILE = 'file'
+DURABILITY_CLOSE = 'close'
+DURABILITY_POLICIES = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_CLOSE)
+
+# directory within the output directory holding the journals of batches being committed
+JOURNAL_DIRECTORY = '.im3py_journal'
+
+# temporary files are hidden and never match the step output file names
+TEMP_FILE_PATTERN = re.compile(r'^\.output_.+\.\d+\.tmp$')
+
+# registered codecs by name
+_CODECS = {}
+
+
+def register_codec(codec, overwrite=False):
+    """Register a compression codec so that it can be selected by name and read back by extension.
+
+    :param codec:                               Codec to register
+    :type codec:                                Codec
+
+    :param overwrite:                           Replace a codec that is already registered under the same name
+    :type overwrite:                            bool
+
+    """
+
+    if codec.name in _CODECS and not overwrite:
+        raise ValueError(f"Codec '{codec.name}' is already registered.  Use `overwrite=True` to replace it.")
+
+    _CODECS[codec.name] = codec
+
+
+def get_codec(name):
+    """Get a registered codec by name."""
+
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise ValueError(f"Compression codec '{name}' is not one of:  {list_codecs()}")
+
+
+def list_codecs():
+    """Names of all registered codecs."""
+
+    return sorted(_CODECS)
+
+
+def codec_extensions():
+    """File extensions of all registered codecs."""
+
+    return [i.extension for i in _CODECS.values()]
+
+
+register_codec(Codec('gzip', '.gz',
+                     lambda data, level: gzip.compress(data, compresslevel=9 if level is None else level, mtime=0),
+                     gzip.decompress))
+
+register_codec(Codec('bz2', '.bz2',
+                     lambda data, level: bz2.compress(data, compresslevel=9 if level is None else level),
+                     bz2.decompress))
+
+register_codec(Codec('lzma', '.xz',
+                     lambda data, level: lzma.compress(data, preset=level),
+                     lzma.decompress))
+
+if zstandard is not None:
+    register_codec(Codec('zstd', '.zst',
+                         lambda data, level: zstandard.ZstdCompressor(level=3 if level is None else level).compress(data),
+                         lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)))
+
+
+class OutputWriter:
+    """Write step outputs through an in-memory batch buffer with optional compression.
+
+    Outputs are collected until `buffer_size` bytes are pending and then written together.  The durability policy
+    sets when written files are synced to disk:  'none' leaves it to the operating system, 'file' syncs every file
+    as it is written (and disables batching), an integer N syncs all files written so far every N steps, and
+    'close' syncs all files once when the writer is closed.
+
+    :param compression:                         Optional.  Name of a registered codec ('gzip', 'bz2', 'lzma', or
+                                                'zstd' when `zstandard` is installed); None writes plain text.
+    :type compression:                          str
+
+    :param level:                               Optional.  Compression level; the codec default if None.
+    :type level:                                int
+
+    :param durability:                          'none' (default), 'file', 'close', or a number of steps N
+    :type durability:                           str; int
+
+    :param buffer_size:                         Number of pending bytes that triggers a write; 0 writes each step
+                                                immediately.
+    :type buffer_size:                          int
+
+    :param journal_directory:                   Optional.  Directory for the journal of each batch of more than one
+                                                output.  If None, batches are renamed into place without a journal.
+    :type journal_directory:                    str
+
+    """
+
+    def __init__(self, compression=None, level=None, durability=DURABILITY_NONE, buffer_size=0,
+                 journal_directory=None):
+
+        self.codec = None if compression is None else get_codec(compression)
+        self.level = level
+        self.durability = self.validate_durability(durability)
+        self.buffer_size = int(buffer_size)
+        self.journal_directory = journal_directory
+
+        # (path, data) of outputs not yet written
+        self._pending = []
+        self._pending_bytes = 0
+
+        # written files that have not been synced yet
+        self._unsynced = []
+
+        self._steps = 0
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        self.close()
+
+    @staticmethod
+    def validate_durability(durability):
+        """Ensure the durability policy is a known policy name or a positive number of steps."""
+
+        if durability is None:
+            return DURABILITY_NONE
+
+        if isinstance(durability, str) and not durability.isdigit():
+
+            if durability not in DURABILITY_POLICIES:
+                raise ValueError(f"Durability '{durability}' is not one of {DURABILITY_POLICIES} or a number of steps.")
+
+            return durability
+
+        if int(durability) < 1:
+            raise ValueError(f"Durability of every N steps requires N >= 1; received '{durability}'.")
+
+        return int(durability)
+
+    @property
+    def extension(self):
+        """Extension added to output file names by the codec; '' without compression."""
+
+        return '' if self.codec is None else self.codec.extension
+
+    def write(self, path, text):
+        """Queue the output of a step.
+
+        :param path:                            Full path to the uncompressed output file
+        :type path:                             str
+
+        :param text:                            Content of the output file
+        :type text:                             str
+
+        """
+
+        data = text.encode('utf-8')
+
+        if self.codec is not None:
+            data = self.codec.compress(data, self.level)
+
+        self._pending.append((path + self.extension, data))
+        self._pending_bytes += len(data)
+        self._steps += 1
+
+        if self._pending_bytes >= self.buffer_size or self.durability == DURABILITY_FILE:
+            self.flush()
+
+        if isinstance(self.durability, int) and self._steps % self.durability == 0:
+            self.flush()
+            self.sync()
+
+    def flush(self):
+        """Write all pending outputs to temporary files and commit them together by renaming them into place."""
+
+        if not self._pending:
+            return
+
+        sync = self.durability == DURABILITY_FILE
+
+        with tracing.span('flush', tracing.CATEGORY_WRITE, files=len(self._pending), bytes=self._pending_bytes):
+
+            renames = [(write_temp(path, data, sync), path) for path, data in self._pending]
+
+            journal = None
+
+            if self.journal_directory is not None and len(renames) > 1:
+                journal = write_journal(self.journal_directory, renames, sync)
+
+            commit(renames, sync)
+
+            if journal is not None:
+                os.remove(journal)
+
+        if self.durability not in (DURABILITY_NONE, DURABILITY_FILE):
+            self._unsynced.extend(path for _, path in renames)
+
+        self._pending = []
+        self._pending_bytes = 0
+
+    def sync(self):
+        """Sync all written files and their directories to disk."""
+
+        directories = set()
+
+        with tracing.span('fsync', tracing.CATEGORY_WRITE, files=len(self._unsynced)):
+
+            for path in self._unsynced:
+                fsync_path(path)
+                directories.add(os.path.dirname(path))
+
+            for directory in directories:
+                fsync_path(directory)
+
+        self._unsynced = []
+
+    def close(self):
+        """Write all pending outputs and apply the durability policy."""
+
+        self.flush()
+
+        if self.durability != DURABILITY_NONE:
+            self.sync()
+
+
+class NullWriter(OutputWriter):
+    """Writer that discards step outputs, for runs whose values are collected elsewhere (e.g., in a results store)."""
+
+    def write(self, path, text):
+        """Discard the output of a step."""
+
+        self._steps += 1
+
+
+def temp_path(path):
+    """Hidden temporary file next to an output that is unique to this process."""
+
+    directory, name = os.path.split(path)
+
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+
+def write_temp(path, data, sync=False):
+    """Write data to the temporary file of an output.
+
+    :param path:                                Full path to the output
+    :type path:                                 str
+
+    :param data:                                Content of the output
+    :type data:                                 bytes
+
+    :param sync:                                Sync the temporary file to disk before returning
+    :type sync:                                 bool
+
+    :return:                                    str; full path to the temporary file
+
+    """
+
+    temp = temp_path(path)
+
+    try:
+        out = open(temp, 'wb')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(temp), exist_ok=True)
+        out = open(temp, 'wb')
+
+    with out:
+        out.write(data)
+
+        if sync:
+            out.flush()
+            os.fsync(out.fileno())
+
+    return temp
+
+
+def commit(renames, sync=False):
+    """Rename temporary files into place.
+
+    :param renames:                             (temporary file, output) full paths
+    :type renames:                              list
+
+    :param sync:                                Sync the directories of the outputs so the renames are durable
+    :type sync:                                 bool
+
+    """
+
+    for temp, path in renames:
+        os.replace(temp, path)
+
+    if sync:
+        for directory in {os.path.dirname(path) for _, path in renames}:
+            fsync_path(directory)
+
+
+def atomic_write(path, data, sync=False):
+    """Write an output so that it either exists complete or not at all."""
+
+    commit([(write_temp(path, data, sync), path)], sync)
+
+
+def write_journal(journal_directory, renames, sync=False):
+    """Record the renames of a batch before they are made.
+
+    :return:                                    str; full path to the journal
+
+    """
+
+    os.makedirs(journal_directory, exist_ok=True)
+
+    journal = os.path.join(journal_directory, f"batch_{os.getpid()}.json")
+
+    os.replace(write_temp(journal, json.dumps(renames).encode('utf-8'), sync), journal)
+
+    return journal
+
+
+def recover_outputs(output_directory, remove_temporary=False):
+    """Finish committing the batches of a run that was killed while renaming them, and optionally remove the
+    temporary files of outputs that were never committed.
+
+    Journals are only written once every temporary file of a batch is complete, so the renames they record are
+    replayed; temporary files without a journal are incomplete and are never renamed.
+
+    :param output_directory:                    Full path to the output directory
+    :type output_directory:                     str
+
+    :param remove_temporary:                    Walk the output directory and remove uncommitted temporary files
+    :type remove_temporary:                     bool
+
+    :return:                                    int; number of outputs committed from journals
+
+    """
+
+    committed = 0
+    journal_directory = os.path.join(output_directory, JOURNAL_DIRECTORY)
+
+    if os.path.isdir(journal_directory):
+
+        for name in sorted(os.listdir(journal_directory)):
+
+            journal = os.path.join(journal_directory, name)
+
+            # a journal that was never renamed into place is incomplete; its batch was not committed
+            if name.endswith('.tmp'):
+                os.remove(journal)
+                continue
+
+            with open(journal) as get:
+                renames = json.load(get)
+
+            for temp, path in renames:
+                if os.path.isfile(temp):
+                    os.replace(temp, path)
+                    committed += 1
+
+            os.remove(journal)
+
+    if committed:
+        logging.info(f"Committed {committed} output(s) from interrupted batches in '{output_directory}'")
+
+    if remove_temporary:
+        for root, _, files in os.walk(output_directory):
+            for name in files:
+                if TEMP_FILE_PATTERN.match(name):
+                    os.remove(os.path.join(root, name))
+
+    return committed
+
+
+def fsync_path(path):
+    """Sync a file or directory to disk by path.  Directories cannot be opened on Windows, where syncing a file also
+    records its name, so they are skipped there."""
+
+    if os.name == 'nt' and os.path.isdir(path):
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def resolve_output_path(path):
+    """Get the path of an output as written, with or without a codec extension; None if it does not exist.
+
+    :param path:                                Full path to the uncompressed output file
+    :type path:                                 str
+
+    :return:                                    str
+
+    """
+
+    if os.path.isfile(path):
+        return path
+
+    for extension in codec_extensions():
+        if os.path.isfile(path + extension):
+            return path + extension
+
+    return None
+
+
+def read_output(path):
+    """Read the content of an output file and decompress it if it was written with a codec.
+
+    :param path:                                Full path to the output file, with or without the codec extension
+    :type path:                                 str
+
+    :return:                                    str
+
+    """
+
+    actual = resolve_output_path(path)
+
+    if actual is None:
+        raise FileNotFoundError(f"Output '{path}' does not exist with or without a compression extension.")
+
+    with open(actual, 'rb') as get:
+        data = get.read()
+
+    for codec in _CODECS.values():
+        if actual.endswith(codec.extension):
+            data = codec.decompress(data)
+            break
+
+    return data.decode('utf-8')
@@ -0,0 +1,340 @@
+"""Execution planner that calibrates the cost of a workload and chooses how to run it.
+
+A short sample of steps is run in a temporary directory to measure the compute cost of each kernel backend, the
+write cost and size of each output sink, and the per-step and per-member overheads.  These are combined with the
+number of steps, the ensemble size, and the CPUs available to predict the runtime and I/O volume of each candidate:
+
+    serial                                      one process with the pure-Python kernels
+    vectorized                                  one process with the fastest NumPy or Numba kernels
+    parallel                                    a pool of worker processes, one member per task
+
+and of each output sink ('text' or buffered 'gzip' files).  The candidate with the lowest predicted runtime is
+chosen; candidates within `TIE_TOLERANCE` of it are treated as ties and go to the smaller I/O volume.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import logging
+import math
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import im3py.process_step as proc
+import im3py.some_code as fake
+from im3py.kernels import BACKEND_PYTHON, get_kernel
+from im3py.output_writer import OutputWriter
+from im3py.resources import ResourceProbe
+
+
+STRATEGY_SERIAL = 'serial'
+STRATEGY_VECTORIZED = 'vectorized'
+STRATEGY_PARALLEL = 'parallel'
+STRATEGIES = (STRATEGY_SERIAL, STRATEGY_VECTORIZED, STRATEGY_PARALLEL)
+
+# output sinks and the writer settings of each
+SINK_TEXT = 'text'
+SINK_GZIP = 'gzip'
+SINKS = {SINK_TEXT: {'output_compression': None, 'output_buffer_size': 0},
+         SINK_GZIP: {'output_compression': 'gzip', 'output_buffer_size': 1 << 20}}
+
+# seconds to start a worker process and import the model in it
+WORKER_STARTUP_SECONDS = 0.25
+
+# number of times each sample step is repeated when timing kernels
+KERNEL_REPEATS = 20
+
+# candidates predicted within this fraction of the fastest are ties; calibration timings are not more precise
+TIE_TOLERANCE = 0.1
+
+
+class ExecutionPlan:
+    """The chosen strategy and output sink of a workload with the predicted cost of every candidate.
+
+    :param candidates:                          One row per strategy and sink with 'strategy', 'kernel_backend',
+                                                'workers', 'sink', 'seconds', 'io_bytes', and 'files'
+    :type candidates:                           pandas.DataFrame
+
+    :param calibration:                         Measured costs used for the predictions
+    :type calibration:                          dict
+
+    :param n_steps:                             Number of steps of each member
+    :type n_steps:                              int
+
+    :param members:                             Number of members
+    :type members:                              int
+
+    :param cpus:                                Number of CPUs available
+    :type cpus:                                 int
+
+    """
+
+    def __init__(self, candidates, calibration, n_steps, members, cpus):
+
+        self.candidates = candidates.sort_values(['seconds', 'io_bytes']).reset_index(drop=True)
+        self.calibration = calibration
+        self.n_steps = n_steps
+        self.members = members
+        self.cpus = cpus
+
+        ties = self.candidates[self.candidates['seconds'] <= self.candidates['seconds'].min() * (1 + TIE_TOLERANCE)]
+        best = ties.sort_values(['io_bytes', 'seconds']).iloc[0]
+
+        self.strategy = best['strategy']
+        self.kernel_backend = best['kernel_backend']
+        self.workers = int(best['workers'])
+        self.sink = best['sink']
+        self.predicted_seconds = float(best['seconds'])
+        self.io_bytes = int(best['io_bytes'])
+        self.files = int(best['files'])
+
+    def __repr__(self):
+
+        return (f"ExecutionPlan(strategy='{self.strategy}', kernel_backend='{self.kernel_backend}', "
+                f"workers={self.workers}, sink='{self.sink}', predicted_seconds={self.predicted_seconds:.3f})")
+
+    def __str__(self):
+
+        lines = [f"Workload:  {self.members} member(s) x {self.n_steps} step(s) on {self.cpus} CPU(s)",
+                 f"Strategy:  {self.strategy} (kernel backend '{self.kernel_backend}', {self.workers} worker(s))",
+                 f"Output sink:  {self.sink}",
+                 f"Predicted runtime:  {self.predicted_seconds:.3f} s",
+                 f"Predicted I/O:  {self.io_bytes / 1e6:.3f} MB in {self.files} file(s)",
+                 "Candidates:",
+                 self.candidates.to_string(index=False, float_format='{:.4f}'.format)]
+
+        return '\n'.join(lines)
+
+    @property
+    def model_kwargs(self):
+        """Keyword arguments for `Model` that apply the plan."""
+
+        return dict(SINKS[self.sink], kernel_backend=self.kernel_backend)
+
+
+def time_kernels(alpha, beta, backends, repeats=KERNEL_REPEATS):
+    """Seconds per step of the step kernels for each backend.
+
+    :param alpha:                               Alpha value of each sample step
+    :type alpha:                                list
+
+    :param beta:                                Beta value of each sample step
+    :type beta:                                 list
+
+    :param backends:                            Backends to time
+    :type backends:                             list
+
+    :return:                                    dict; backend to (seconds per step, seconds of the first call)
+
+    """
+
+    costs = {}
+
+    for backend in backends:
+
+        kernels = [get_kernel(proc.START_STEP_KERNEL)] + [get_kernel(proc.STEP_KERNEL)] * (len(alpha) - 1)
+
+        # the first call includes compilation for Numba
+        td = time.perf_counter()
+        for kernel, a, b in zip(kernels, alpha, beta):
+            kernel([a, b], backend=backend)
+        first = time.perf_counter() - td
+
+        td = time.perf_counter()
+        for _ in range(repeats):
+            for kernel, a, b in zip(kernels, alpha, beta):
+                kernel([a, b], backend=backend)
+
+        costs[backend] = ((time.perf_counter() - td) / (repeats * len(alpha)), first)
+
+    return costs
+
+
+def time_sinks(steps, output_paths, values):
+    """Seconds and bytes per step of writing the outputs of the sample steps with each sink.
+
+    :return:                                    dict; sink to (seconds per step, bytes per step)
+
+    """
+
+    costs = {}
+
+    for sink, settings in SINKS.items():
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            writer = OutputWriter(settings['output_compression'], buffer_size=settings['output_buffer_size'])
+
+            td = time.perf_counter()
+
+            for step, file_name, value in zip(steps, output_paths, values):
+                fake.write_value_file(step, value, dirpath, file_name, writer)
+
+            writer.close()
+
+            seconds = time.perf_counter() - td
+
+            n_bytes = sum(os.path.getsize(os.path.join(root, i)) for root, _, files in os.walk(dirpath) for i in files)
+
+        costs[sink] = (seconds / len(steps), n_bytes / len(steps))
+
+    return costs
+
+
+def calibrate(model, sample_steps=5):
+    """Measure the costs of a model's workload on a short sample of its steps without touching its output directory.
+
+    :param model:                               Model to calibrate; it does not need to be initialized
+    :type model:                                Model
+
+    :param sample_steps:                        Number of steps to sample from the start of the time axis
+    :type sample_steps:                         int
+
+    :return:                                    dict; 'compute' (backend to seconds per step), 'compile' (backend to
+                                                seconds of the first call), 'write' (sink to seconds per step),
+                                                'bytes' (sink to bytes per step), 'step_overhead' and
+                                                'member_overhead' in seconds
+
+    """
+
+    n = max(1, min(sample_steps, len(model.time_axis)))
+
+    steps = model.time_axis.steps[:n]
+    alpha = [float(i) for i in model.alpha_trajectory[:n]]
+    beta = [float(i) for i in model.beta_trajectory[:n]]
+    output_paths = model.output_paths[:n]
+
+    backends = get_kernel(proc.STEP_KERNEL).available_backends
+    kernel_costs = time_kernels(alpha, beta, backends)
+
+    values = [get_kernel(proc.START_STEP_KERNEL)([alpha[0], beta[0]])] + \
+             [get_kernel(proc.STEP_KERNEL)([a, b]) for a, b in zip(alpha[1:], beta[1:])]
+
+    sink_costs = time_sinks(steps, output_paths, values)
+
+    # the whole step, including logging, in a scratch directory
+    with tempfile.TemporaryDirectory() as dirpath:
+
+        td = time.perf_counter()
+
+        for index in range(n):
+            proc.process_step(steps[index], alpha[index], beta[index], steps[0], dirpath,
+                              backend=model.kernel_backend, file_name=output_paths[index])
+
+        step_seconds = (time.perf_counter() - td) / n
+
+    backend = get_kernel(proc.STEP_KERNEL).select_backend(model.kernel_backend)
+    step_overhead = max(0.0, step_seconds - kernel_costs[backend][0] - sink_costs[SINK_TEXT][0])
+
+    # building the run of a member:  configuration, time axis, trajectories, and output paths
+    td = time.perf_counter()
+    member = type(model)(write_logfile=False, **{k: v for k, v in model.resolved_parameters.items()
+                                                 if k != 'write_logfile'})
+    _ = member.alpha_trajectory, member.beta_trajectory, member.output_paths
+    member_overhead = time.perf_counter() - td
+
+    return {'sample_steps': n,
+            'compute': {k: v[0] for k, v in kernel_costs.items()},
+            'compile': {k: v[1] for k, v in kernel_costs.items()},
+            'write': {k: v[0] for k, v in sink_costs.items()},
+            'bytes': {k: v[1] for k, v in sink_costs.items()},
+            'step_overhead': step_overhead,
+            'member_overhead': member_overhead}
+
+
+def predict(calibration, n_steps, members=1, cpus=None):
+    """Predict the runtime and I/O volume of every strategy and output sink.
+
+    :param calibration:                         Measured costs from `calibrate`
+    :type calibration:                          dict
+
+    :param n_steps:                             Number of steps of each member
+    :type n_steps:                              int
+
+    :param members:                             Number of members
+    :type members:                              int
+
+    :param cpus:                                Optional.  Number of CPUs available; probed with `ResourceProbe` if None.
+    :type cpus:                                 int
+
+    :return:                                    pandas.DataFrame; one row per candidate
+
+    """
+
+    cpus = ResourceProbe().cpu_limit if cpus is None else max(1, int(cpus))
+
+    compute = calibration['compute']
+
+    # backends are ranked by their total compute time for the workload including their one-time compile cost
+    def total(backend):
+        return compute[backend] * n_steps * members + calibration['compile'][backend]
+
+    vectorized = [b for b in compute if b != BACKEND_PYTHON]
+
+    strategies = [(STRATEGY_SERIAL, BACKEND_PYTHON, 1)]
+
+    if vectorized:
+        strategies.append((STRATEGY_VECTORIZED, min(vectorized, key=total), 1))
+
+    if members > 1 and cpus > 1:
+        strategies.append((STRATEGY_PARALLEL, min(compute, key=total), min(cpus, members)))
+
+    rows = []
+
+    for strategy, backend, workers in strategies:
+
+        for sink in SINKS:
+
+            per_member = calibration['member_overhead'] + n_steps * (compute[backend] + calibration['write'][sink] +
+                                                                     calibration['step_overhead'])
+
+            # workers compile their kernels at the same time, so compilation is paid once in wall time
+            seconds = math.ceil(members / workers) * per_member + calibration['compile'][backend]
+
+            if strategy == STRATEGY_PARALLEL:
+                seconds += workers * WORKER_STARTUP_SECONDS
+
+            rows.append({'strategy': strategy, 'kernel_backend': backend, 'workers': workers, 'sink': sink,
+                         'seconds': seconds, 'io_bytes': int(round(members * n_steps * calibration['bytes'][sink])),
+                         'files': members * n_steps})
+
+    return pd.DataFrame.from_records(rows, columns=['strategy', 'kernel_backend', 'workers', 'sink', 'seconds',
+                                                    'io_bytes', 'files'])
+
+
+def plan(model, members=1, cpus=None, sample_steps=5):
+    """Calibrate a model's workload and choose how to run it.
+
+    :param model:                               Model to plan; it does not need to be initialized
+    :type model:                                Model
+
+    :param members:                             Number of members of the same size, e.g. of an ensemble
+    :type members:                              int
+
+    :param cpus:                                Optional.  Number of CPUs available; probed with `ResourceProbe` if None.
+    :type cpus:                                 int
+
+    :param sample_steps:                        Number of steps run to calibrate the costs
+    :type sample_steps:                         int
+
+    :return:                                    ExecutionPlan
+
+    """
+
+    cpus = ResourceProbe().cpu_limit if cpus is None else max(1, int(cpus))
+
+    calibration = calibrate(model, sample_steps)
+
+    candidates = predict(calibration, len(model.time_axis), members, cpus)
+
+    execution_plan = ExecutionPlan(candidates, calibration, len(model.time_axis), members, cpus)
+
+    logging.info(f"Execution plan:\n{execution_plan}")
+
+    return execution_plan
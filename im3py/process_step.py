@@ -11,9 +11,17 @@ import logging
 import time
 
 import im3py.some_code as fake
+import im3py.tracing as tracing
+from im3py.kernels import get_kernel
 
 
-def process_step(step, alpha_param, beta_param, start_step, output_directory):
+# registered kernels used for the start step and all other steps
+START_STEP_KERNEL = 'sum'
+STEP_KERNEL = 'mean'
+
+
+def process_step(step, alpha_param, beta_param, start_step, output_directory, backend='auto', file_name=None,
+                 writer=None):
     """Process a time step based on a condition.
 
     :param step:                                Current time step
@@ -31,11 +39,27 @@ def process_step(step, alpha_param, beta_param, start_step, output_directory):
     :param beta_param:                          Beta parameter for model.  Acceptable range:  -2.0 to 2.0
     :type beta_param:                           float
 
+    :param output_directory:                    Full path to the output directory
+    :type output_directory:                     str
+
+    :param backend:                             Kernel backend; one of 'auto', 'numba', 'numpy', or 'python'.
+                                                'auto' selects the preferred available backend.
+    :type backend:                              str
+
+    :param file_name:                           Optional.  Output file name with extension for the step.
+    :type file_name:                            str
+
+    :param writer:                              Optional.  Writer that buffers, compresses, and syncs the output.
+    :type writer:                               OutputWriter
+
+    :return:                                    float; value calculated for the step
+
     """
 
     start_time = time.time()
 
-    logging.info("Processing step:  {}".format(step))
+    with tracing.span('log', tracing.CATEGORY_LOG):
+        logging.info("Processing step:  {}".format(step))
 
     # create a value list for each parameter
     value_list = [alpha_param, beta_param]
@@ -43,12 +67,21 @@ def process_step(step, alpha_param, beta_param, start_step, output_directory):
     if step == start_step:
 
         # if year one, generate sum message file
-        fake.write_sum_file(step, value_list, output_directory)
+        kernel = get_kernel(START_STEP_KERNEL)
 
     else:
 
         # for other years, generate a mean message file
-        fake.write_mean_file(step, value_list, output_directory)
+        kernel = get_kernel(STEP_KERNEL)
+
+    with tracing.span(kernel.name, tracing.CATEGORY_COMPUTE):
+        value = kernel(value_list, backend=backend)
+
+    with tracing.span('write', tracing.CATEGORY_WRITE):
+        fake.write_value_file(step, value, output_directory, file_name, writer)
+
+    with tracing.span('log', tracing.CATEGORY_LOG):
+        logging.info("Processing for step {} completed in {} minutes.".format(step, (time.time() - start_time) / 60))
 
-    logging.info("Processing for step {} completed in {} minutes.".format(step, (time.time() - start_time) / 60))
+    return value
 
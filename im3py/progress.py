@@ -0,0 +1,240 @@
+"""Progress reporting and cooperative cancellation for model runs.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import json
+import logging
+import os
+import time
+
+
+class CancellationToken:
+    """Cooperative cancellation flag that is checked by the model between time steps.
+
+    A run can be cancelled either by calling `cancel()` from a callback or another thread, or externally by
+    creating the optional cancel file (e.g., from a scheduler epilogue or `touch`).
+
+    :param cancel_file:                         Optional.  Full path with file name and extension to a sentinel
+                                                file.  If this file exists the token is considered cancelled.
+    :type cancel_file:                          str
+
+    """
+
+    def __init__(self, cancel_file=None):
+
+        self._cancel_file = cancel_file
+        self._cancelled = False
+        self._reason = None
+
+    def cancel(self, reason="cancel requested"):
+        """Request cancellation of the run.
+
+        :param reason:                          Reason for the cancellation that will be logged and reported.
+        :type reason:                           str
+
+        """
+
+        self._cancelled = True
+        self._reason = reason
+
+    @property
+    def cancelled(self):
+        """True if cancellation has been requested."""
+
+        if not self._cancelled and self._cancel_file is not None and os.path.exists(self._cancel_file):
+            self.cancel(f"cancel file found:  {self._cancel_file}")
+
+        return self._cancelled
+
+    @property
+    def reason(self):
+        """Reason for cancellation; None if not cancelled."""
+
+        return self._reason
+
+
+class ProgressReporter:
+    """Track completed steps and report throughput and ETA to callbacks and a pollable status file.
+
+    :param total_steps:                         Total number of steps in the run.
+    :type total_steps:                          int
+
+    :param callbacks:                           Optional.  A callable or list of callables that receive a single
+                                                dictionary of progress information each time a report is made.
+    :type callbacks:                            callable; list
+
+    :param interval:                            Minimum number of seconds between reports.  The first and final
+                                                reports are always made.
+    :type interval:                             float
+
+    :param status_file:                         Optional.  Full path with file name and extension to a JSON status
+                                                file that is rewritten atomically on each report.
+    :type status_file:                          str
+
+    """
+
+    # status values written to the status file
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, total_steps, callbacks=None, interval=10.0, status_file=None):
+
+        self._total_steps = total_steps
+        self._interval = interval
+        self._status_file = status_file
+
+        if callbacks is None:
+            self._callbacks = []
+        elif callable(callbacks):
+            self._callbacks = [callbacks]
+        else:
+            self._callbacks = list(callbacks)
+
+        self._completed = 0
+        self._current_step = None
+        self._status = self.STATUS_RUNNING
+        self._message = None
+        self._start_time = None
+        self._last_report = None
+
+    @property
+    def completed(self):
+        """Number of completed steps."""
+
+        return self._completed
+
+    @property
+    def status(self):
+        """Current run status."""
+
+        return self._status
+
+    @property
+    def elapsed(self):
+        """Seconds elapsed since `start()` was called."""
+
+        if self._start_time is None:
+            return 0.0
+
+        return time.time() - self._start_time
+
+    @property
+    def steps_per_second(self):
+        """Throughput in completed steps per second."""
+
+        elapsed = self.elapsed
+
+        if elapsed <= 0:
+            return 0.0
+
+        return self._completed / elapsed
+
+    @property
+    def eta(self):
+        """Estimated seconds remaining; None if throughput is not yet known."""
+
+        rate = self.steps_per_second
+
+        if rate <= 0:
+            return None
+
+        return (self._total_steps - self._completed) / rate
+
+    @property
+    def info(self):
+        """Dictionary of the current progress information."""
+
+        return {'status': self._status,
+                'message': self._message,
+                'completed_steps': self._completed,
+                'total_steps': self._total_steps,
+                'current_step': None if self._current_step is None else str(self._current_step),
+                'elapsed_seconds': self.elapsed,
+                'steps_per_second': self.steps_per_second,
+                'eta_seconds': self.eta,
+                'pid': os.getpid(),
+                'updated': time.time()}
+
+    def start(self):
+        """Start the clock and make the initial report."""
+
+        self._start_time = time.time()
+        self.report()
+
+    def update(self, step):
+        """Register a completed step and report if the reporting interval has elapsed.
+
+        :param step:                            The step that was just completed.
+
+        """
+
+        self._completed += 1
+        self._current_step = step
+
+        if (time.time() - self._last_report) >= self._interval:
+            self.report()
+
+    def finish(self, status=STATUS_COMPLETED, message=None):
+        """Make the final report with the closing status of the run.
+
+        :param status:                          Final status of the run.
+        :type status:                           str
+
+        :param message:                         Optional message such as a cancellation reason.
+        :type message:                          str
+
+        """
+
+        self._status = status
+        self._message = message
+        self.report()
+
+    def report(self):
+        """Push the current progress information to all callbacks and the status file."""
+
+        self._last_report = time.time()
+
+        info = self.info
+
+        logging.info(f"Progress:  {info['completed_steps']} of {info['total_steps']} steps "
+                     f"({info['steps_per_second']:.3f} steps/s; ETA {self.format_eta(info['eta_seconds'])})")
+
+        for callback in self._callbacks:
+            callback(info)
+
+        if self._status_file is not None:
+            self.write_status_file(info)
+
+    def write_status_file(self, info):
+        """Atomically write progress information to the status file so pollers never see a partial file.
+
+        :param info:                            Progress information
+        :type info:                             dict
+
+        """
+
+        tmp_file = f"{self._status_file}.{os.getpid()}.tmp"
+
+        with open(tmp_file, 'w') as out:
+            json.dump(info, out, indent=2)
+
+        os.replace(tmp_file, self._status_file)
+
+    @staticmethod
+    def format_eta(seconds):
+        """Format an ETA in seconds as a string."""
+
+        if seconds is None:
+            return 'unknown'
+
+        minutes, secs = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
@@ -7,18 +7,66 @@ License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
 
 """
 
+import copy
 import datetime
 import os
+from collections.abc import Mapping
+
 import yaml
 
+import numpy as np
+
+from im3py.output_layout import OutputLayout
+from im3py.output_writer import OutputWriter
+from im3py.time_axis import TimeAxis
+from im3py.trajectory import is_scalar, resolve_trajectory, validate_trajectory_range
+
+
+# libyaml based loader when PyYAML is built with it; same semantics as the pure-Python FullLoader
+YAML_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
+# parsed configuration files keyed by (path, modification time, size) so repeated runs in one process parse once
+_CONFIG_CACHE = {}
+
+
+def load_config(config_file):
+    """Parse a configuration YAML file, or get it from the cache if the file is unchanged since it was parsed.
+
+    :param config_file:                         Full path to configuration YAML file with file name and extension
+    :type config_file:                          str
+
+    :return:                                    dict; a copy that the caller may change without affecting the cache
+
+    """
+
+    path = os.path.abspath(config_file)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    config = _CONFIG_CACHE.get(key)
+
+    if config is None:
+
+        with open(path, 'r') as yml:
+            config = yaml.load(yml, Loader=YAML_LOADER)
+
+        # drop stale entries for earlier versions of the same file
+        for stale in [k for k in _CONFIG_CACHE if k[0] == path]:
+            del _CONFIG_CACHE[stale]
+
+        _CONFIG_CACHE[key] = config
+
+    return copy.deepcopy(config)
+
 
 class ReadConfig:
     """Read configuration data either provided in the configuration YAML file or as passed in via arguments.
 
     :param config_file:                         Full path to configuration YAML file with file name and
-                                                extension. If not provided by the user, the code will default to the
-                                                expectation of alternate arguments.
-    :type config_file:                          str
+                                                extension, or an already parsed configuration mapping (e.g., a
+                                                scenario view from `ScenarioFile`). If not provided by the user, the
+                                                code will default to the expectation of alternate arguments.
+    :type config_file:                          str; collections.abc.Mapping
 
 
     :param output_directory:                    Full path with file name and extension to the output directory
@@ -34,16 +82,55 @@ class ReadConfig:
     :param time_step:                           Number of steps
     :type time_step:                            int
 
-    :param alpha_param:                         Alpha parameter for model.  Acceptable range:  -2.0 to 2.0
-    :type alpha_param:                          float
+    :param alpha_param:                         Alpha parameter for model.  Acceptable range:  -2.0 to 2.0.  May also
+                                                be a trajectory with one value per step, or a dictionary with a
+                                                'schedule' of step to value and an optional 'interpolation' of 'step'
+                                                (default) or 'linear'.
+    :type alpha_param:                          float; list; numpy.ndarray; dict
 
 
-    :param beta_param:                          Beta parameter for model.  Acceptable range:  -2.0 to 2.0
-    :type beta_param:                           float
+    :param beta_param:                          Beta parameter for model.  Acceptable range:  -2.0 to 2.0.  Accepts
+                                                the same trajectory and schedule forms as `alpha_param`.
+    :type beta_param:                           float; list; numpy.ndarray; dict
 
     :param write_logfile:                       Optional, choose to write log as file.
     :type write_logfile:                        bool
 
+    :param time_unit:                           Optional.  Unit of the time step; one of 'Y' (years; default),
+                                                'M' (months), 'W' (weeks), 'D' (days), 'h' (hours), 'm' (minutes), or
+                                                's' (seconds).  For units other than years, `start_step` and
+                                                `through_step` are ISO 8601 strings (e.g., '2015-01').
+    :type time_unit:                            str
+
+    :param time_steps:                          Optional.  List of irregular time steps as integer years or ISO 8601
+                                                strings in ascending order.  If provided, `start_step`,
+                                                `through_step`, and `time_step` are not used.
+    :type time_steps:                           list
+
+    :param supplement_archive:                  Optional.  Full path with file name and extension to a zip archive of
+                                                supplement input data that is read without extracting it.
+    :type supplement_archive:                   str
+
+    :param output_layout:                       Optional.  Layout of the step outputs in the output directory; one of
+                                                'flat' (default), 'time' (nested by decade, year, month, and day), or
+                                                'hash' (nested by hash prefix), or a dictionary with a 'scheme' and
+                                                optional 'hash_levels' and 'hash_width'.
+    :type output_layout:                        str; dict
+
+    :param output_compression:                  Optional.  Codec used to compress step outputs; one of 'gzip',
+                                                'bz2', 'lzma', or 'zstd' (requires `zstandard`).  None (default)
+                                                writes plain text.
+    :type output_compression:                   str
+
+    :param output_durability:                   Optional.  When step outputs are synced to disk; 'none' (default),
+                                                'file' (every file), 'close' (once when the run closes), or a number
+                                                of steps N (every N steps).
+    :type output_durability:                    str; int
+
+    :param output_buffer_size:                  Optional.  Number of bytes of step outputs collected in memory before
+                                                they are written together; 0 (default) writes every step immediately.
+    :type output_buffer_size:                   int
+
     """
 
     OUT_DIR_KEY = 'output_directory'
@@ -52,6 +139,16 @@ class ReadConfig:
     TIME_STEP_KEY = 'time_step'
     ALPHA_KEY = 'alpha_param'
     BETA_KEY = 'beta_param'
+    TIME_UNIT_KEY = 'time_unit'
+    TIME_STEPS_KEY = 'time_steps'
+    SUPPLEMENT_KEY = 'supplement_archive'
+    OUTPUT_LAYOUT_KEY = 'output_layout'
+    OUTPUT_COMPRESSION_KEY = 'output_compression'
+    OUTPUT_DURABILITY_KEY = 'output_durability'
+    OUTPUT_BUFFER_KEY = 'output_buffer_size'
+
+    # default time unit of years
+    DEFAULT_TIME_UNIT = TimeAxis.ANNUAL_UNIT
 
     # definition of acceptable range of values for parameters
     MAX_PARAM_VALUE = 2.0
@@ -61,7 +158,9 @@ class ReadConfig:
     DATETIME_FORMAT = '%Y-%m-%d_%Hh%Mm%Ss'
 
     def __init__(self, config_file=None, output_directory=None, start_step=None,  through_step=None,
-                 time_step=None, alpha_param=None, beta_param=None, write_logfile=True):
+                 time_step=None, alpha_param=None, beta_param=None, write_logfile=True, time_unit=None,
+                 time_steps=None, supplement_archive=None, output_layout=None, output_compression=None,
+                 output_durability=None, output_buffer_size=None):
 
         self._config_file = config_file
         self._output_directory = output_directory
@@ -71,6 +170,23 @@ class ReadConfig:
         self._alpha_param = alpha_param
         self._beta_param = beta_param
         self._write_logfile = write_logfile
+        self._time_unit = time_unit
+        self._time_steps = time_steps
+        self._supplement_archive = supplement_archive
+        self._output_layout = output_layout
+        self._output_compression = output_compression
+        self._output_durability = output_durability
+        self._output_buffer_size = output_buffer_size
+
+        # values assigned through setters after instantiation; these take precedence over the configuration file
+        self._overrides = {}
+
+        # parsed configuration file and per-step parameter trajectories; computed once on first use
+        self._config = None
+        self._trajectories = {}
+
+        # time axis is computed once on first use
+        self._time_axis = None
 
     @property
     def date_time_string(self):
@@ -97,14 +213,22 @@ class ReadConfig:
         if self._config_file is None:
             return None
 
-        else:
-            with open(self._config_file, 'r') as yml:
-                return yaml.load(yml, Loader=yaml.FullLoader)
+        if self._config is None:
+
+            if isinstance(self._config_file, Mapping):
+                self._config = self._config_file
+            else:
+                self._config = load_config(self._config_file)
+
+        return self._config
 
     @property
     def output_directory(self):
         """Validate output directory."""
 
+        if self.OUT_DIR_KEY in self._overrides:
+            return self._overrides[self.OUT_DIR_KEY]
+
         if self.config is None:
             return self.validate_directory(self._output_directory)
         else:
@@ -116,54 +240,256 @@ class ReadConfig:
         """Update output directory."""
 
         self._output_directory = self.validate_directory(value)
+        self._overrides[self.OUT_DIR_KEY] = self._output_directory
 
     @property
     def start_step(self):
         """Start time step."""
 
+        if self.time_steps is not None:
+            return self.time_axis[0]
+
         return self.validate_step(self._start_step, self.START_STEP_KEY)
 
     @property
     def through_step(self):
         """Through time step."""
 
+        if self.time_steps is not None:
+            return self.time_axis[-1]
+
         return self.validate_step(self._through_step, self.THROUGH_STEP_KEY)
 
     @property
     def time_step(self):
-        """Number of time steps."""
+        """Number of time steps.  None for irregular time steps."""
+
+        if self.time_steps is not None:
+            return None
 
         return self.validate_step(self._time_step, self.TIME_STEP_KEY)
 
+    @property
+    def time_steps(self):
+        """List of irregular time steps; None if time steps are regular."""
+
+        if self.config is None:
+            return self._time_steps
+        else:
+            return self.validate_key(self.config, self.TIME_STEPS_KEY)
+
+    @property
+    def time_unit(self):
+        """Unit of the time step."""
+
+        unit = self.time_unit_setting
+
+        if unit is None:
+
+            if self.time_steps is not None:
+                return self.time_axis.unit
+
+            return self.DEFAULT_TIME_UNIT
+
+        return unit
+
+    @property
+    def time_unit_setting(self):
+        """Time unit as provided by the user; None if not provided."""
+
+        if self.config is None:
+            unit = self._time_unit
+        else:
+            unit = self.validate_key(self.config, self.TIME_UNIT_KEY)
+
+        if unit is None:
+            return None
+
+        return TimeAxis.validate_unit(unit)
+
+    @property
+    def time_axis(self):
+        """Time axis of all steps; computed once."""
+
+        if self._time_axis is None:
+
+            time_steps = self.time_steps
+
+            if time_steps is None:
+                self._time_axis = TimeAxis.from_range(self.start_step, self.through_step, self.time_step,
+                                                      self.time_unit)
+            else:
+                self._time_axis = TimeAxis.from_steps(time_steps, self.time_unit_setting)
+
+        return self._time_axis
+
     @property
     def alpha_param(self):
         """Alpha parameter for model."""
 
+        if self.ALPHA_KEY in self._overrides:
+            return self._overrides[self.ALPHA_KEY]
+
         return self.validate_parameter(self._alpha_param, self.ALPHA_KEY)
 
     @alpha_param.setter
     def alpha_param(self, value):
         """Setter for alpha parameter."""
 
-        self._alpha_param = self.validate_parameter(value, self.ALPHA_KEY)
+        self._alpha_param = self.validate_value(value)
+        self._overrides[self.ALPHA_KEY] = self._alpha_param
+        self._trajectories.pop(self.ALPHA_KEY, None)
 
     @property
     def beta_param(self):
         """Beta parameter for model."""
 
+        if self.BETA_KEY in self._overrides:
+            return self._overrides[self.BETA_KEY]
+
         return self.validate_parameter(self._beta_param, self.BETA_KEY)
 
     @beta_param.setter
     def beta_param(self, value):
-        """Setter for alpha parameter."""
+        """Setter for beta parameter."""
+
+        self._beta_param = self.validate_value(value)
+        self._overrides[self.BETA_KEY] = self._beta_param
+        self._trajectories.pop(self.BETA_KEY, None)
+
+    @property
+    def alpha_trajectory(self):
+        """Alpha parameter value for each step as a read-only array."""
 
-        self._beta_param = self.validate_parameter(value, self.BETA_KEY)
+        return self.parameter_trajectory(self.ALPHA_KEY)
+
+    @property
+    def beta_trajectory(self):
+        """Beta parameter value for each step as a read-only array."""
+
+        return self.parameter_trajectory(self.BETA_KEY)
+
+    def parameter_trajectory(self, key):
+        """Resolve and validate a parameter for every step once; later calls return the cached array until the
+        parameter is reassigned.
+
+        :param key:                 Parameter name; one of 'alpha_param' or 'beta_param'
+        :type key:                  str
+
+        :return:                    numpy.ndarray
+
+        """
+
+        if key not in self._trajectories:
+
+            value = getattr(self, key)
+
+            if is_scalar(value):
+                trajectory = np.full(len(self.time_axis), value)
+            else:
+                trajectory = np.array(value, dtype=np.float64)
+
+            trajectory.flags.writeable = False
+            self._trajectories[key] = trajectory
+
+        return self._trajectories[key]
 
     @property
     def step_list(self):
-        """Create a list of time steps from the start and through steps by the step interval."""
+        """Time steps from the start and through steps by the step interval, or the irregular time steps."""
+
+        return self.time_axis
+
+    @property
+    def supplement_archive(self):
+        """Full path to the zip archive of supplement input data; None if not provided."""
+
+        if self.config is None:
+            archive = self._supplement_archive
+        else:
+            archive = self.validate_key(self.config, self.SUPPLEMENT_KEY)
+
+        if archive is None or os.path.isfile(archive):
+            return archive
+
+        raise FileNotFoundError(f"`supplement_archive`: {archive} does not exist.")
+
+    @property
+    def output_layout(self):
+        """Layout of the step outputs in the output directory."""
+
+        if self.config is None:
+            setting = self._output_layout
+        else:
+            setting = self.validate_key(self.config, self.OUTPUT_LAYOUT_KEY)
+
+        return OutputLayout.from_setting(setting)
+
+    @property
+    def output_compression(self):
+        """Codec used to compress step outputs; None for plain text."""
+
+        if self.config is None:
+            return self._output_compression
+
+        return self.validate_key(self.config, self.OUTPUT_COMPRESSION_KEY)
+
+    @property
+    def output_durability(self):
+        """When step outputs are synced to disk."""
+
+        if self.config is None:
+            durability = self._output_durability
+        else:
+            durability = self.validate_key(self.config, self.OUTPUT_DURABILITY_KEY)
 
-        return range(self.start_step, self.through_step + self.time_step, self.time_step)
+        return OutputWriter.validate_durability(durability)
+
+    @property
+    def output_buffer_size(self):
+        """Number of bytes of step outputs collected before they are written."""
+
+        if self.config is None:
+            buffer_size = self._output_buffer_size
+        else:
+            buffer_size = self.validate_key(self.config, self.OUTPUT_BUFFER_KEY)
+
+        return 0 if buffer_size is None else self.validate_int(buffer_size)
+
+    @property
+    def resolved_parameters(self):
+        """Dictionary of the fully resolved run parameters that can be passed back as keyword arguments."""
+
+        return {self.OUT_DIR_KEY: self.output_directory,
+                self.START_STEP_KEY: self.start_step,
+                self.THROUGH_STEP_KEY: self.through_step,
+                self.TIME_STEP_KEY: self.time_step,
+                self.ALPHA_KEY: self.alpha_param,
+                self.BETA_KEY: self.beta_param,
+                'write_logfile': self.write_logfile,
+                self.TIME_UNIT_KEY: self.time_unit,
+                self.TIME_STEPS_KEY: self.time_steps,
+                self.SUPPLEMENT_KEY: self.supplement_archive,
+                self.OUTPUT_LAYOUT_KEY: self.output_layout.to_dict(),
+                self.OUTPUT_COMPRESSION_KEY: self.output_compression,
+                self.OUTPUT_DURABILITY_KEY: self.output_durability,
+                self.OUTPUT_BUFFER_KEY: self.output_buffer_size}
+
+    @staticmethod
+    def serializable_parameters(parameters):
+        """Copy of a parameter dictionary with NumPy arrays and scalars converted to lists and Python scalars so that
+        it can be written as JSON."""
+
+        serializable = {}
+
+        for key, value in parameters.items():
+
+            if isinstance(value, (np.ndarray, np.generic)):
+                value = value.tolist()
+
+            serializable[key] = value
+
+        return serializable
 
     @property
     def logfile(self):
@@ -238,13 +564,30 @@ class ReadConfig:
         """
 
         if self.config is None:
-            is_float = self.validate_float(param)
-            return self.validate_range(is_float)
+            return self.validate_value(param)
         else:
             is_key = self.validate_key(self.config, key)
-            is_float = self.validate_float(is_key)
+            return self.validate_value(is_key)
+
+    def validate_value(self, value):
+        """Validate a scalar parameter value, or resolve a trajectory or schedule to one value per step and check
+        the range of all values at once.
+
+        :param value:               Scalar, sequence with one value per step, or schedule dictionary
+        :type value:                float; list; numpy.ndarray; dict
+
+        :return:                    float; numpy.ndarray
+
+        """
+
+        if is_scalar(value):
+            is_float = self.validate_float(value)
             return self.validate_range(is_float)
 
+        trajectory = resolve_trajectory(value, self.time_axis)
+
+        return validate_trajectory_range(trajectory, self.MIN_PARAM_VALUE, self.MAX_PARAM_VALUE)
+
     def validate_range(self, value):
         """Ensure value falls within an acceptable range."""
 
@@ -262,12 +605,24 @@ class ReadConfig:
         :param key:                 Configuration key from YAML file
         :type key:                  str
 
-        :return:                    int; time step
+        :return:                    int; time step.  For time units other than years the start and through
+                                    steps are returned as ISO 8601 strings.
 
         """
 
-        if self.config is None:
+        if self.config is not None:
+            step = self.validate_key(self.config, key)
+
+        if key == self.TIME_STEP_KEY or self.time_unit == self.DEFAULT_TIME_UNIT:
             return self.validate_int(step)
-        else:
-            is_key = self.validate_key(self.config, key)
-            return self.validate_int(is_key)
+
+        return self.validate_datetime(step, self.time_unit)
+
+    @staticmethod
+    def validate_datetime(step, unit):
+        """Ensure a time step can be interpreted in the time unit and return its ISO 8601 label."""
+
+        if step is None:
+            raise TypeError(f"Step value '{step}' is not a valid time step.")
+
+        return str(TimeAxis.to_datetime64(step, unit))
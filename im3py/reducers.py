@@ -0,0 +1,414 @@
+"""Streaming, mergeable reducers for per-step statistics across ensemble members.
+
+Each reducer holds state that is O(steps) regardless of how many members are fed to it, and reducers built by
+separate workers can be combined with `merge()`.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class WelfordReducer:
+    """Per-step count, mean, and variance using Welford's online algorithm; merged with the parallel form of
+    Chan et al.
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    """
+
+    def __init__(self, n_steps):
+
+        self.count = 0
+        self.mean = np.zeros(n_steps, dtype=np.float64)
+        self.m2 = np.zeros(n_steps, dtype=np.float64)
+
+    def update(self, values):
+        """Add one member's values for all steps.
+
+        :param values:                          Value for each step
+        :type values:                           numpy.ndarray
+
+        """
+
+        self.count += 1
+
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+
+    def merge(self, other):
+        """Combine the state of another reducer into this one.
+
+        :param other:                           Reducer fed with a disjoint set of members
+        :type other:                            WelfordReducer
+
+        """
+
+        if other.count == 0:
+            return self
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+        self.count = total
+
+        return self
+
+    def variance(self, ddof=1):
+        """Per-step variance.
+
+        :param ddof:                            Delta degrees of freedom; 1 for the sample variance
+        :type ddof:                             int
+
+        :return:                                numpy.ndarray
+
+        """
+
+        if self.count - ddof <= 0:
+            return np.full(self.mean.shape, np.nan)
+
+        return self.m2 / (self.count - ddof)
+
+
+class MinMaxReducer:
+    """Per-step minimum and maximum.
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    """
+
+    def __init__(self, n_steps):
+
+        self.min = np.full(n_steps, np.inf)
+        self.max = np.full(n_steps, -np.inf)
+
+    def update(self, values):
+        """Add one member's values for all steps."""
+
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+
+    def merge(self, other):
+        """Combine the state of another reducer into this one."""
+
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+
+        return self
+
+
+class TDigest:
+    """Mergeable t-digest quantile sketch (Dunning & Ertl) for a single stream of values.
+
+    :param compression:                         Controls the number of centroids kept and therefore the accuracy
+    :type compression:                          int
+
+    """
+
+    def __init__(self, compression=100):
+
+        self.compression = compression
+
+        self._means = np.empty(0, dtype=np.float64)
+        self._weights = np.empty(0, dtype=np.float64)
+        self._buffer = []
+        self._min = np.inf
+        self._max = -np.inf
+
+    @property
+    def count(self):
+        """Total weight of all values added."""
+
+        return float(self._weights.sum()) + sum(i.size for i in self._buffer)
+
+    @property
+    def n_centroids(self):
+        """Number of centroids after compression."""
+
+        self.compress()
+
+        return self._means.size
+
+    def update(self, values):
+        """Add one or more values.
+
+        :param values:                          Values to add
+        :type values:                           float; numpy.ndarray
+
+        """
+
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+
+        if values.size == 0:
+            return
+
+        self._buffer.append(values)
+        self._min = min(self._min, values.min())
+        self._max = max(self._max, values.max())
+
+        if sum(i.size for i in self._buffer) >= self.compression * 5:
+            self.compress()
+
+    def merge(self, other):
+        """Combine the centroids of another digest into this one."""
+
+        other.compress()
+
+        if other._means.size == 0:
+            return self
+
+        self.compress()
+
+        self._means = np.concatenate([self._means, other._means])
+        self._weights = np.concatenate([self._weights, other._weights])
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+
+        self.compress(force=True)
+
+        return self
+
+    def compress(self, force=False):
+        """Merge buffered values and existing centroids into a bounded set of centroids."""
+
+        if not self._buffer and not force:
+            return
+
+        means = np.concatenate([self._means] + self._buffer)
+        weights = np.concatenate([self._weights] + [np.ones(i.size) for i in self._buffer])
+        self._buffer = []
+
+        if means.size == 0:
+            return
+
+        order = np.argsort(means, kind='mergesort')
+        means = means[order]
+        weights = weights[order]
+
+        total = weights.sum()
+
+        new_means = []
+        new_weights = []
+
+        current_mean = means[0]
+        current_weight = weights[0]
+        cumulative = 0.0
+        k_left = self.scale(0.0)
+
+        for mean, weight in zip(means[1:], weights[1:]):
+
+            proposed = current_weight + weight
+
+            # a centroid may span at most one unit of the k1 scale function:  small in the tails, large at the median
+            if self.scale((cumulative + proposed) / total) - k_left <= 1.0:
+                current_mean += (mean - current_mean) * weight / proposed
+                current_weight = proposed
+
+            else:
+                new_means.append(current_mean)
+                new_weights.append(current_weight)
+                cumulative += current_weight
+                k_left = self.scale(cumulative / total)
+
+                current_mean = mean
+                current_weight = weight
+
+        new_means.append(current_mean)
+        new_weights.append(current_weight)
+
+        self._means = np.array(new_means)
+        self._weights = np.array(new_weights)
+
+    def scale(self, q):
+        """k1 scale function of the t-digest that maps a quantile to a centroid index."""
+
+        return self.compression / (2.0 * np.pi) * np.arcsin(2.0 * min(max(q, 0.0), 1.0) - 1.0)
+
+    def quantile(self, q):
+        """Estimate one or more quantiles.
+
+        :param q:                               Quantile(s) between 0 and 1
+        :type q:                                float; list
+
+        :return:                                float; numpy.ndarray
+
+        """
+
+        self.compress()
+
+        if self._means.size == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+
+        total = self._weights.sum()
+        centers = np.cumsum(self._weights) - self._weights / 2.0
+
+        # interpolate between centroid centers, anchored at the exact minimum and maximum
+        x = np.concatenate([[0.0], centers, [total]])
+        y = np.concatenate([[self._min], self._means, [self._max]])
+
+        return np.interp(np.asarray(q, dtype=np.float64) * total, x, y)
+
+
+class QuantileReducer:
+    """Per-step quantile sketches.  Members are buffered in small batches so that each step's digest is updated
+    with vectorized operations.
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    :param compression:                         t-digest compression
+    :type compression:                          int
+
+    :param batch_size:                          Number of members buffered before the digests are updated
+    :type batch_size:                           int
+
+    """
+
+    def __init__(self, n_steps, compression=100, batch_size=64):
+
+        self.digests = [TDigest(compression) for _ in range(n_steps)]
+        self.batch_size = batch_size
+
+        self._batch = []
+
+    def update(self, values):
+        """Add one member's values for all steps."""
+
+        self._batch.append(np.asarray(values, dtype=np.float64))
+
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Push buffered members into the per-step digests."""
+
+        if not self._batch:
+            return
+
+        batch = np.vstack(self._batch)
+        self._batch = []
+
+        for index, digest in enumerate(self.digests):
+            digest.update(batch[:, index])
+
+    def merge(self, other):
+        """Combine the state of another reducer into this one."""
+
+        self.flush()
+        other.flush()
+
+        for digest, other_digest in zip(self.digests, other.digests):
+            digest.merge(other_digest)
+
+        return self
+
+    def quantile(self, q):
+        """Per-step estimate of quantile `q`.
+
+        :return:                                numpy.ndarray
+
+        """
+
+        self.flush()
+
+        return np.array([digest.quantile(q) for digest in self.digests])
+
+
+class EnsembleReducer:
+    """Per-step mean, variance, minimum, maximum, and quantiles across ensemble members computed online.
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    :param quantiles:                           Quantiles to report
+    :type quantiles:                            tuple
+
+    :param compression:                         t-digest compression
+    :type compression:                          int
+
+    """
+
+    def __init__(self, n_steps, quantiles=(0.05, 0.5, 0.95), compression=100):
+
+        self.n_steps = n_steps
+        self.quantiles = tuple(quantiles)
+
+        self.moments = WelfordReducer(n_steps)
+        self.extremes = MinMaxReducer(n_steps)
+        self.sketch = QuantileReducer(n_steps, compression)
+
+    @property
+    def count(self):
+        """Number of members fed to the reducer."""
+
+        return self.moments.count
+
+    def update(self, values):
+        """Add one member's values for all steps.
+
+        :param values:                          Value for each step
+        :type values:                           numpy.ndarray; list
+
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+
+        if values.shape != (self.n_steps,):
+            raise ValueError(f"Expected {self.n_steps} step values; received an array of shape {values.shape}.")
+
+        self.moments.update(values)
+        self.extremes.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        """Combine the state of a reducer built from a disjoint set of members, e.g., by another worker.
+
+        :param other:                           Reducer to merge
+        :type other:                            EnsembleReducer
+
+        :return:                                EnsembleReducer; self
+
+        """
+
+        if other.n_steps != self.n_steps:
+            raise ValueError(f"Cannot merge reducers with {self.n_steps} and {other.n_steps} steps.")
+
+        self.moments.merge(other.moments)
+        self.extremes.merge(other.extremes)
+        self.sketch.merge(other.sketch)
+
+        return self
+
+    def to_frame(self, steps=None):
+        """Summarize the statistics as a data frame with one row per step.
+
+        :param steps:                           Optional.  Step labels to use as the index.
+        :type steps:                            list
+
+        :return:                                pandas.DataFrame
+
+        """
+
+        summary = {'count': np.full(self.n_steps, self.count),
+                   'mean': self.moments.mean,
+                   'variance': self.moments.variance(),
+                   'min': self.extremes.min,
+                   'max': self.extremes.max}
+
+        for q in self.quantiles:
+            summary[f"q{q:g}"] = self.sketch.quantile(q)
+
+        df = pd.DataFrame(summary, index=None if steps is None else list(steps))
+        df.index.name = 'step'
+
+        return df
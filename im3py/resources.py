@@ -0,0 +1,269 @@
+"""Probe the CPU and memory resources available to this process and size worker pools to fit them.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import logging
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# not available on Windows; peak memory is then not measured
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class ResourceProbe:
+    """Read the CPU affinity mask, the cgroup (v1 or v2) CPU quota and memory limit, and the available memory of the
+    host to choose worker counts and chunk sizes that do not oversubscribe the node.
+
+    :param cgroup_root:                         Mount point of the cgroup file system
+    :type cgroup_root:                          str
+
+    :param proc_root:                           Mount point of the proc file system
+    :type proc_root:                            str
+
+    :param memory_fraction:                     Fraction of the memory limit that workers may use
+    :type memory_fraction:                      float
+
+    """
+
+    # number of chunks per worker so that faster workers can pick up extra work
+    CHUNKS_PER_WORKER = 4
+
+    # cgroup v1 reports values at or above this as unlimited
+    CGROUP_V1_UNLIMITED = 2 ** 62
+
+    def __init__(self, cgroup_root='/sys/fs/cgroup', proc_root='/proc', memory_fraction=0.8):
+
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        self.memory_fraction = memory_fraction
+
+    @staticmethod
+    def read_text(path):
+        """Read the stripped content of a file; None if it cannot be read."""
+
+        try:
+            with open(path) as get:
+                return get.read().strip()
+        except OSError:
+            return None
+
+    def cgroup_paths(self):
+        """Cgroup path of this process for each controller; the v2 unified hierarchy is keyed by ''."""
+
+        content = self.read_text(os.path.join(self.proc_root, 'self', 'cgroup'))
+
+        paths = {}
+
+        for line in (content or '').splitlines():
+
+            _, controllers, path = line.split(':', 2)
+
+            for controller in controllers.split(','):
+                paths[controller] = path
+
+        return paths
+
+    def cgroup_file(self, controller, file_name):
+        """Read a cgroup file for this process, falling back to the root of the hierarchy as seen in containers.
+
+        :param controller:                      v1 controller (e.g., 'cpu', 'memory'); '' for the v2 hierarchy
+        :type controller:                       str
+
+        :param file_name:                       Name of the cgroup file (e.g., 'cpu.max')
+        :type file_name:                        str
+
+        :return:                                str; None if the file does not exist
+
+        """
+
+        path = self.cgroup_paths().get(controller, '/').lstrip('/')
+        mount = os.path.join(self.cgroup_root, controller) if controller else self.cgroup_root
+
+        for directory in (os.path.join(mount, path), mount):
+
+            content = self.read_text(os.path.join(directory, file_name))
+
+            if content is not None:
+                return content
+
+        return None
+
+    @property
+    def affinity_cpus(self):
+        """Number of CPUs in the affinity mask of this process."""
+
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0))
+
+        return os.cpu_count() or 1
+
+    @property
+    def cgroup_cpu_quota(self):
+        """CPU quota of the cgroup in CPUs; None if unlimited or unavailable."""
+
+        # cgroup v2:  "<quota> <period>" or "max <period>"
+        content = self.cgroup_file('', 'cpu.max')
+
+        if content is not None:
+
+            quota, period = content.split()
+
+            if quota == 'max':
+                return None
+
+            return int(quota) / int(period)
+
+        # cgroup v1:  quota of -1 is unlimited
+        quota = self.cgroup_file('cpu', 'cpu.cfs_quota_us')
+        period = self.cgroup_file('cpu', 'cpu.cfs_period_us')
+
+        if quota is None or period is None or int(quota) <= 0:
+            return None
+
+        return int(quota) / int(period)
+
+    @property
+    def cgroup_memory_limit(self):
+        """Memory limit of the cgroup in bytes; None if unlimited or unavailable."""
+
+        content = self.cgroup_file('', 'memory.max')
+
+        if content is not None:
+            return None if content == 'max' else int(content)
+
+        content = self.cgroup_file('memory', 'memory.limit_in_bytes')
+
+        if content is None or int(content) >= self.CGROUP_V1_UNLIMITED:
+            return None
+
+        return int(content)
+
+    @property
+    def available_memory(self):
+        """Memory available on the host in bytes from /proc/meminfo; None if unavailable."""
+
+        content = self.read_text(os.path.join(self.proc_root, 'meminfo'))
+
+        for line in (content or '').splitlines():
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) * 1024
+
+        return None
+
+    @property
+    def cpu_limit(self):
+        """Number of CPUs this process may use:  the affinity mask limited by the cgroup quota."""
+
+        cpus = self.affinity_cpus
+        quota = self.cgroup_cpu_quota
+
+        if quota is not None:
+            cpus = min(cpus, max(1, math.floor(quota)))
+
+        return cpus
+
+    @property
+    def memory_limit(self):
+        """Memory this process may use in bytes:  the smaller of the cgroup limit and the available memory."""
+
+        limits = [i for i in (self.cgroup_memory_limit, self.available_memory) if i is not None]
+
+        return min(limits) if limits else None
+
+    def summary(self):
+        """Dictionary of all probed resources."""
+
+        return {'affinity_cpus': self.affinity_cpus,
+                'cgroup_cpu_quota': self.cgroup_cpu_quota,
+                'cpu_limit': self.cpu_limit,
+                'cgroup_memory_limit': self.cgroup_memory_limit,
+                'available_memory': self.available_memory,
+                'memory_limit': self.memory_limit}
+
+    @staticmethod
+    def calibrate(func, *args):
+        """Run a function once in a fresh worker process and measure the peak memory of that worker.
+
+        :param func:                            Picklable function to run, e.g., a single ensemble member
+        :type func:                             function
+
+        :return:                                tuple; (result of `func`, growth of the peak resident memory of the
+                                                worker in bytes while it ran; 0 where it cannot be measured)
+
+        """
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(_measure, func, *args).result()
+
+    def plan(self, n_tasks, memory_per_worker=None, max_workers=None):
+        """Choose the number of workers and the chunk size for `n_tasks` tasks and log the decision.
+
+        :param n_tasks:                         Number of independent tasks (e.g., ensemble members)
+        :type n_tasks:                          int
+
+        :param memory_per_worker:               Optional.  Peak memory of one worker in bytes, e.g., from
+                                                `calibrate`.  If None, memory is not considered.
+        :type memory_per_worker:                int
+
+        :param max_workers:                     Optional.  Upper bound requested by the user.
+        :type max_workers:                      int
+
+        :return:                                dict; 'workers', 'chunksize', and 'reason'
+
+        """
+
+        cpus = self.cpu_limit
+        memory_limit = self.memory_limit
+
+        candidates = [(cpus, f"CPU limit of {cpus} (affinity {self.affinity_cpus}, cgroup quota "
+                             f"{self.cgroup_cpu_quota})"),
+                      (max(1, n_tasks), f"{n_tasks} task(s)")]
+
+        if memory_per_worker and memory_limit is not None:
+            memory_workers = max(1, int(memory_limit * self.memory_fraction // memory_per_worker))
+            candidates.append((memory_workers, f"memory limit of {memory_limit / 1e6:.0f} MB at "
+                                               f"{memory_per_worker / 1e6:.1f} MB per worker"))
+
+        if max_workers is not None:
+            candidates.append((max(1, max_workers), f"requested maximum of {max_workers}"))
+
+        workers, reason = min(candidates, key=lambda i: i[0])
+
+        chunksize = max(1, math.ceil(n_tasks / (workers * self.CHUNKS_PER_WORKER)))
+
+        logging.info(f"Using {workers} worker(s) with a chunk size of {chunksize}; limited by {reason}")
+
+        return {'workers': workers, 'chunksize': chunksize, 'reason': reason}
+
+
+def _max_rss():
+    """Peak resident memory of this process in bytes; 0 where it cannot be measured."""
+
+    if resource is None:
+        return 0
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    scale = 1 if sys.platform == 'darwin' else 1024
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _measure(func, *args):
+    """Run `func` and return its result with the growth of the peak resident memory of this process in bytes.  A
+    forked worker starts with the memory it inherited from its parent, which is not counted."""
+
+    baseline = _max_rss()
+
+    result = func(*args)
+
+    return result, max(0, _max_rss() - baseline)
@@ -0,0 +1,341 @@
+"""Strong and weak scaling harness for the serial model and the parallel ensemble execution paths.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from im3py.ensemble import Ensemble
+from im3py.model import Model
+
+
+# scaling modes
+STRONG = 'strong'
+WEAK = 'weak'
+
+# workloads
+WORKLOAD_MODEL = 'model'
+WORKLOAD_ENSEMBLE = 'ensemble'
+
+# default parameters of every run
+START_STEP = 2015
+ALPHA_PARAM = 2.0
+BETA_PARAM = 1.42
+
+
+def cpu_seconds():
+    """CPU time (user + system) of this process and all of its terminated child processes.  `resource` is not
+    available on Windows, where `os.times` only reports the time of this process."""
+
+    try:
+        import resource
+    except ImportError:
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+
+def io_volume(directory):
+    """Number of files and bytes under a directory.
+
+    :return:                                    tuple; (number of files, number of bytes)
+
+    """
+
+    n_files = 0
+    n_bytes = 0
+
+    for root, _, files in os.walk(directory):
+        for f in files:
+            n_files += 1
+            n_bytes += os.path.getsize(os.path.join(root, f))
+
+    return n_files, n_bytes
+
+
+def build_members(n_members):
+    """Build ensemble members with distinct alpha and beta parameters within the acceptable range."""
+
+    return [{'alpha_param': -2.0 + 4.0 * i / max(n_members - 1, 1), 'beta_param': BETA_PARAM}
+            for i in range(n_members)]
+
+
+def run_workload(output_directory, workload, n_steps, n_members, workers):
+    """Run and measure one workload.
+
+    :param output_directory:                    Directory the workload writes to
+    :type output_directory:                     str
+
+    :param workload:                            'model' for a single serial `Model` run or 'ensemble'
+    :type workload:                             str
+
+    :param n_steps:                             Number of time steps
+    :type n_steps:                              int
+
+    :param n_members:                           Number of ensemble members
+    :type n_members:                            int
+
+    :param workers:                             Number of worker processes
+    :type workers:                              int
+
+    :return:                                    dict; measurements
+
+    """
+
+    through_step = START_STEP + n_steps - 1
+
+    cpu_start = cpu_seconds()
+    td = time.perf_counter()
+
+    if workload == WORKLOAD_MODEL:
+
+        Model(output_directory=output_directory, start_step=START_STEP, through_step=through_step, time_step=1,
+              alpha_param=ALPHA_PARAM, beta_param=BETA_PARAM, write_logfile=False).run_all_steps()
+
+    else:
+
+        Ensemble(build_members(n_members), output_directory=output_directory, workers=workers,
+                 start_step=START_STEP, through_step=through_step, time_step=1, beta_param=BETA_PARAM).run()
+
+    wall_seconds = time.perf_counter() - td
+    cpu = cpu_seconds() - cpu_start
+
+    n_files, n_bytes = io_volume(output_directory)
+
+    return {'workload': workload,
+            'steps': n_steps,
+            'members': n_members,
+            'workers': workers,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu,
+            'cpu_utilization': cpu / (wall_seconds * workers) if wall_seconds > 0 else 0.0,
+            'files_written': n_files,
+            'bytes_written': n_bytes,
+            'steps_per_second': n_steps * n_members / wall_seconds if wall_seconds > 0 else 0.0}
+
+
+def run_scaling(worker_counts=(1, 2, 4), step_counts=(100,), member_counts=(8,), modes=(STRONG, WEAK),
+                repeats=1, output_directory=None, csv_file=None, plot_file=None):
+    """Run the scaling study with local process pools and record the results.
+
+    For strong scaling each (steps, members) problem is run with every worker count.  For weak scaling the number of
+    members grows with the number of workers (members x workers / smallest worker count).  The serial `Model`
+    workload is recorded once per step count as the single-member baseline.
+
+    :param worker_counts:                       Worker counts to run
+    :type worker_counts:                        tuple
+
+    :param step_counts:                         Number of time steps for each problem size
+    :type step_counts:                          tuple
+
+    :param member_counts:                       Number of ensemble members for each problem size
+    :type member_counts:                        tuple
+
+    :param modes:                               Scaling modes to run; 'strong', 'weak', or both
+    :type modes:                                tuple
+
+    :param repeats:                             Number of repeats of each run; the fastest is kept
+    :type repeats:                              int
+
+    :param output_directory:                    Optional.  Scratch directory for model outputs; a temporary
+                                                directory is used if None.
+    :type output_directory:                     str
+
+    :param csv_file:                            Optional.  Full path with file name and extension to write the
+                                                results as CSV.
+    :type csv_file:                             str
+
+    :param plot_file:                           Optional.  Full path with file name and extension to save the
+                                                speedup plot.  Requires matplotlib.
+    :type plot_file:                            str
+
+    :return:                                    pandas.DataFrame
+
+    """
+
+    worker_counts = sorted(worker_counts)
+    base_workers = worker_counts[0]
+
+    runs = []
+
+    for n_steps in step_counts:
+
+        runs.append((None, WORKLOAD_MODEL, n_steps, 1, 1))
+
+        for n_members in member_counts:
+            for workers in worker_counts:
+
+                if STRONG in modes:
+                    runs.append((STRONG, WORKLOAD_ENSEMBLE, n_steps, n_members, workers))
+
+                if WEAK in modes:
+                    runs.append((WEAK, WORKLOAD_ENSEMBLE, n_steps, n_members * workers // base_workers, workers))
+
+    records = []
+
+    with tempfile.TemporaryDirectory(dir=output_directory) as scratch:
+
+        for index, (mode, workload, n_steps, n_members, workers) in enumerate(runs):
+
+            best = None
+
+            for repeat in range(repeats):
+
+                run_dir = os.path.join(scratch, f"run_{index}_{repeat}")
+                os.makedirs(run_dir)
+
+                record = run_workload(run_dir, workload, n_steps, n_members, workers)
+
+                if best is None or record['wall_seconds'] < best['wall_seconds']:
+                    best = record
+
+            best['mode'] = mode
+            records.append(best)
+
+            logging.info(f"Scaling run {index + 1} of {len(runs)}:  {mode} {workload} steps={n_steps} "
+                         f"members={n_members} workers={workers} wall={best['wall_seconds']:.3f} s")
+
+    df = pd.DataFrame.from_records(records)
+
+    df = add_efficiency(df, base_workers)
+
+    if csv_file is not None:
+        df.to_csv(csv_file, index=False)
+
+    if plot_file is not None:
+        plot_speedup(df, plot_file)
+
+    return df
+
+
+def add_efficiency(df, base_workers):
+    """Add speedup and parallel efficiency relative to the run with the smallest worker count.
+
+    Strong scaling:  speedup = T(base) / T(p); efficiency = speedup / (p / base).
+    Weak scaling:  efficiency = T(base) / T(p); speedup = efficiency * (p / base).
+
+    :param df:                                  Scaling results
+    :type df:                                   pandas.DataFrame
+
+    :param base_workers:                        Smallest worker count
+    :type base_workers:                         int
+
+    :return:                                    pandas.DataFrame
+
+    """
+
+    df = df.copy()
+    df['speedup'] = 1.0
+    df['efficiency'] = 1.0
+
+    ensemble = df['workload'] == WORKLOAD_ENSEMBLE
+
+    # weak scaling problems are identified by the members per worker
+    df['problem'] = df['members']
+    weak = ensemble & (df['mode'] == WEAK)
+    df.loc[weak, 'problem'] = df.loc[weak, 'members'] * base_workers // df.loc[weak, 'workers']
+
+    for (mode, n_steps, problem), group in df[ensemble].groupby(['mode', 'steps', 'problem']):
+
+        base = group.loc[group['workers'] == base_workers, 'wall_seconds']
+
+        if base.empty:
+            continue
+
+        ratio = base.iloc[0] / group['wall_seconds']
+        workers = group['workers'] / base_workers
+
+        if mode == STRONG:
+            df.loc[group.index, 'speedup'] = ratio
+            df.loc[group.index, 'efficiency'] = ratio / workers
+        else:
+            df.loc[group.index, 'efficiency'] = ratio
+            df.loc[group.index, 'speedup'] = ratio * workers
+
+    return df.drop(columns='problem')
+
+
+def plot_speedup(df, plot_file):
+    """Plot strong scaling speedup and weak scaling efficiency against the number of workers.
+
+    :param df:                                  Scaling results from `run_scaling`
+    :type df:                                   pandas.DataFrame
+
+    :param plot_file:                           Full path with file name and extension of the figure
+    :type plot_file:                            str
+
+    """
+
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise ImportError("Plotting scaling results requires `matplotlib`.  Install it with `pip install matplotlib`.")
+
+    fig, (ax_strong, ax_weak) = plt.subplots(1, 2, figsize=(11, 4.5))
+
+    ensemble = df[df['workload'] == WORKLOAD_ENSEMBLE]
+    workers = sorted(ensemble['workers'].unique())
+
+    for (n_steps, n_members), group in ensemble[ensemble['mode'] == STRONG].groupby(['steps', 'members']):
+        ax_strong.plot(group['workers'], group['speedup'], marker='o', label=f"{n_steps} steps x {n_members} members")
+
+    ax_strong.plot(workers, [w / workers[0] for w in workers], linestyle='--', color='grey', label='ideal')
+    ax_strong.set_title('Strong scaling')
+    ax_strong.set_xlabel('Workers')
+    ax_strong.set_ylabel('Speedup')
+    ax_strong.legend(fontsize='small')
+
+    weak = ensemble[ensemble['mode'] == WEAK]
+    for n_steps, group in weak.groupby('steps'):
+        ax_weak.plot(group['workers'], group['efficiency'], marker='o', label=f"{n_steps} steps")
+
+    ax_weak.axhline(1.0, linestyle='--', color='grey', label='ideal')
+    ax_weak.set_title('Weak scaling')
+    ax_weak.set_xlabel('Workers')
+    ax_weak.set_ylabel('Efficiency')
+    ax_weak.legend(fontsize='small')
+
+    fig.tight_layout()
+    fig.savefig(plot_file)
+    plt.close(fig)
+
+
+def main(argv=None):
+    """Command line entry point for the scaling harness."""
+
+    parser = argparse.ArgumentParser(description="Run a strong and weak scaling study of im3py with local process pools.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker counts to run")
+    parser.add_argument('--steps', type=int, nargs='+', default=[100], help="Number of time steps per problem")
+    parser.add_argument('--members', type=int, nargs='+', default=[8], help="Number of ensemble members per problem")
+    parser.add_argument('--modes', nargs='+', default=[STRONG, WEAK], choices=[STRONG, WEAK])
+    parser.add_argument('--repeats', type=int, default=1, help="Repeats of each run; the fastest is kept")
+    parser.add_argument('--scratch', default=None, help="Scratch directory for model outputs")
+    parser.add_argument('--csv', default='scaling.csv', help="CSV file to write the results to")
+    parser.add_argument('--plot', default=None, help="Image file to save the speedup plot to (requires matplotlib)")
+
+    args = parser.parse_args(argv)
+
+    df = run_scaling(args.workers, args.steps, args.members, args.modes, args.repeats, args.scratch, args.csv,
+                     args.plot)
+
+    print(df.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
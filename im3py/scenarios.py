@@ -0,0 +1,269 @@
+"""Multi-scenario configuration files with a shared base block and a list of per-scenario overrides.
+
+    base:
+      output_directory: "<Full path to the root output directory>"
+      start_step: 2015
+      through_step: 2030
+      time_step: 1
+      beta_param: 1.42
+    scenarios:
+      - name: low
+        alpha_param: -1.0
+      - name: high
+        alpha_param: 1.0
+        beta_param: 0.5
+
+The file is parsed once and each scenario is a lightweight view that layers its overrides over the shared base.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import pickle
+from collections import ChainMap
+
+from im3py.model import Model
+from im3py.read_config import ReadConfig, load_config
+
+
+BASE_KEY = 'base'
+SCENARIOS_KEY = 'scenarios'
+NAME_KEY = 'name'
+
+# extension of the pre-compiled sidecar written next to a scenario file
+SIDECAR_EXTENSION = '.pkl'
+
+# pickle protocol of the sidecar; fixed so sidecars are readable by every supported Python version
+SIDECAR_PROTOCOL = 4
+
+# scenario file contents keyed by (path, modification time, size)
+_SCENARIO_CACHE = {}
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a file's content."""
+
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as get:
+        for chunk in iter(lambda: get.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def sidecar_path(config_file):
+    """Full path to the pre-compiled sidecar of a configuration file."""
+
+    return f"{config_file}{SIDECAR_EXTENSION}"
+
+
+def read_sidecar(config_file, digest):
+    """Read the parsed content of a configuration file from its sidecar; None if missing or stale."""
+
+    try:
+        with open(sidecar_path(config_file), 'rb') as get:
+            cached = pickle.load(get)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get('sha256') != digest:
+        return None
+
+    return cached['config']
+
+
+def write_sidecar(config_file, digest, config):
+    """Write the parsed content of a configuration file to its sidecar.  Failures to write are logged and ignored."""
+
+    target = sidecar_path(config_file)
+    temp = f"{target}.{os.getpid()}.tmp"
+
+    try:
+        with open(temp, 'wb') as out:
+            pickle.dump({'sha256': digest, 'config': config}, out, protocol=SIDECAR_PROTOCOL)
+
+        os.replace(temp, target)
+
+    except OSError as e:
+        logging.warning(f"Could not write configuration sidecar '{target}':  {e}")
+
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def read_config_data(config_file, sidecar=False):
+    """Parse a configuration file, or read it from its sidecar if `sidecar` is set and it matches the file's hash.
+
+    :param config_file:                         Full path to configuration YAML file
+    :type config_file:                          str
+
+    :param sidecar:                             Read the sidecar, and write it when the file had to be parsed.  Only
+                                                use sidecars in directories you trust; reading one unpickles it.
+    :type sidecar:                              bool
+
+    :return:                                    dict; a copy that the caller may change without affecting the cache
+
+    """
+
+    path = os.path.abspath(config_file)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    config = _SCENARIO_CACHE.get(key)
+
+    if config is None:
+
+        digest = file_hash(path) if sidecar else None
+        config = read_sidecar(path, digest) if sidecar else None
+
+        if config is None:
+
+            config = load_config(path)
+
+            if sidecar:
+                write_sidecar(path, digest, config)
+
+        for stale in [k for k in _SCENARIO_CACHE if k[0] == path]:
+            del _SCENARIO_CACHE[stale]
+
+        _SCENARIO_CACHE[key] = config
+
+    return copy.deepcopy(config)
+
+
+def is_scenario_config(config):
+    """True if parsed configuration content is a multi-scenario file."""
+
+    return isinstance(config, dict) and SCENARIOS_KEY in config
+
+
+class ScenarioFile:
+    """A multi-scenario configuration file parsed once and expanded lazily into per-scenario configuration views.
+
+    Each view is a `collections.ChainMap` of the scenario's overrides over the shared base block, so the base is
+    never copied.  Scenarios that do not set an `output_directory` write to '<base output_directory>/<name>', which
+    is created when the scenario's `ReadConfig` or `Model` is built.
+
+    :param config_file:                         Full path to the scenario YAML file with file name and extension
+    :type config_file:                          str
+
+    :param sidecar:                             Optional.  Read and write a pre-compiled sidecar ('<config_file>.pkl')
+                                                keyed by the SHA-256 of the file so that later loads skip YAML
+                                                parsing.  Off by default:  reading a sidecar unpickles it, so only
+                                                enable it for files in directories you trust and can write to.
+    :type sidecar:                              bool
+
+    Examples:
+
+        >>> from im3py.scenarios import ScenarioFile
+        >>> scenarios = ScenarioFile("<path to scenarios.yml>")
+        >>> for name in scenarios.names:
+        >>>     scenarios.model(name).run_all_steps()
+
+    """
+
+    def __init__(self, config_file, sidecar=False):
+
+        self.config_file = os.path.abspath(config_file)
+
+        content = read_config_data(self.config_file, sidecar=sidecar)
+
+        if not is_scenario_config(content):
+            raise ValueError(f"'{config_file}' is not a scenario file; expected a '{SCENARIOS_KEY}' list.")
+
+        self.base = content.get(BASE_KEY) or {}
+        self.overrides = content[SCENARIOS_KEY]
+
+        if not isinstance(self.base, dict) or not isinstance(self.overrides, list) or \
+                not all(isinstance(i, dict) for i in self.overrides):
+            raise ValueError(f"'{config_file}' must have a '{BASE_KEY}' mapping and a '{SCENARIOS_KEY}' list of "
+                             f"mappings.")
+
+        self.names = [str(i.get(NAME_KEY, f"scenario_{index}")) for index, i in enumerate(self.overrides)]
+
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Scenario names in '{config_file}' are not unique:  {self.names}")
+
+    def __len__(self):
+
+        return len(self.overrides)
+
+    def __iter__(self):
+
+        return (self.config(i) for i in range(len(self)))
+
+    def __repr__(self):
+
+        return f"ScenarioFile('{self.config_file}', scenarios={len(self)})"
+
+    def index(self, scenario):
+        """Position of a scenario given its name or index."""
+
+        if isinstance(scenario, int):
+
+            if not -len(self) <= scenario < len(self):
+                raise IndexError(f"Scenario index {scenario} is out of range for {len(self)} scenarios.")
+
+            return scenario % len(self)
+
+        try:
+            return self.names.index(scenario)
+        except ValueError:
+            raise KeyError(f"Scenario '{scenario}' is not one of:  {self.names}")
+
+    def config(self, scenario):
+        """Configuration view of a scenario.
+
+        :param scenario:                        Scenario name or index
+        :type scenario:                         str; int
+
+        :return:                                collections.ChainMap
+
+        """
+
+        index = self.index(scenario)
+        overrides = self.overrides[index]
+
+        defaults = {}
+
+        if ReadConfig.OUT_DIR_KEY not in overrides and self.base.get(ReadConfig.OUT_DIR_KEY) is not None:
+            defaults[ReadConfig.OUT_DIR_KEY] = os.path.join(self.base[ReadConfig.OUT_DIR_KEY], self.names[index])
+
+        return ChainMap(overrides, defaults, self.base)
+
+    def prepared_config(self, scenario):
+        """Configuration view of a scenario with its default output directory created."""
+
+        config = self.config(scenario)
+
+        if ReadConfig.OUT_DIR_KEY in config.maps[1]:
+            os.makedirs(config[ReadConfig.OUT_DIR_KEY], exist_ok=True)
+
+        return config
+
+    def read_config(self, scenario):
+        """`ReadConfig` over the view of a scenario."""
+
+        return ReadConfig(config_file=self.prepared_config(scenario))
+
+    def model(self, scenario, **kwargs):
+        """`Model` over the view of a scenario.
+
+        :param scenario:                        Scenario name or index
+        :type scenario:                         str; int
+
+        :param kwargs:                          Keyword arguments passed to `Model` (e.g., `kernel_backend`)
+
+        :return:                                Model
+
+        """
+
+        return Model(config_file=self.prepared_config(scenario), **kwargs)
@@ -10,6 +10,8 @@ License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
 
 import os
 
+from im3py.output_writer import atomic_write
+
 
 def get_sum(list_of_values):
     """Get the sum from a list of values.
@@ -35,7 +37,7 @@ def get_mean(list_of_values):
     return sum(list_of_values) / len(list_of_values)
 
 
-def write_file(message, yr, output_directory):
+def write_file(message, yr, output_directory, file_name=None, writer=None):
     """Write an output file for the time step.
 
     :param message:                         Message to write to file
@@ -47,13 +49,54 @@ def write_file(message, yr, output_directory):
     :param output_directory:                Full path to the output directory
     :type output_directory:                 str
 
+    :param file_name:                       Optional.  Output file name with extension, or a '/' separated path
+                                            relative to the output directory.  Defaults to 'output_year_<yr>.txt'.
+    :type file_name:                        str
+
+    :param writer:                          Optional.  Writer that buffers, compresses, and syncs the output.  If
+                                            None, the file is written immediately as plain text.
+    :type writer:                           OutputWriter
+
     """
+    if file_name is None:
+        file_name = 'output_year_{}.txt'.format(yr)
+
     # create output file path
-    out_file = os.path.join(output_directory, 'output_year_{}.txt'.format(yr))
+    out_file = os.path.join(output_directory, *file_name.split('/'))
+
+    if writer is not None:
+        writer.write(out_file, message)
+        return
+
+    # write output file to a temporary file and rename it into place so that a partial file is never visible
+    atomic_write(out_file, message.encode('utf-8'))
+
+
+def write_value_file(yr, value, output_directory, file_name=None, writer=None):
+    """Write a file containing a message to the user about a calculated value.
+
+    :param yr:                              Target year (YYYY) or time step label
+    :type yr:                               int; str
+
+    :param value:                           Calculated value
+    :type value:                            float
+
+    :param output_directory:                Full path to the output directory
+    :type output_directory:                 str
+
+    :param file_name:                       Optional.  Output file name with extension.
+    :type file_name:                        str
+
+    :param writer:                          Optional.  Writer that buffers, compresses, and syncs the output.
+    :type writer:                           OutputWriter
+
+    :return:                                Output string; write text file
+
+    """
+    message = "The value for year {} is calculated as:  {}\n".format(yr, value)
 
     # write output file
-    with open(out_file, 'w') as out:
-        out.write(message)
+    write_file(message, yr, output_directory, file_name, writer)
 
 
 def write_sum_file(yr, list_of_values, output_directory):
@@ -71,10 +114,7 @@ def write_sum_file(yr, list_of_values, output_directory):
     :return:                                Output string; write text file
 
     """
-    message = "The value for year {} is calculated as:  {}\n".format(yr, get_sum(list_of_values))
-
-    # write output file
-    write_file(message, yr, output_directory)
+    write_value_file(yr, get_sum(list_of_values), output_directory)
 
 
 def write_mean_file(yr, list_of_values, output_directory):
@@ -92,7 +132,4 @@ def write_mean_file(yr, list_of_values, output_directory):
     :return:                                Output string; write text file
 
     """
-    message = "The value for year {} is calculated as:  {}\n".format(yr, get_mean(list_of_values))
-
-    # write output file
-    write_file(message, yr, output_directory)
+    write_value_file(yr, get_mean(list_of_values), output_directory)
@@ -0,0 +1,140 @@
+"""Tests for the chunked results store.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from im3py.chunk_store import ChunkStore
+from im3py.ensemble import Ensemble, run_member
+
+
+def write_block(store_directory, start, stop):
+    """Write members [start, stop) of the reference array; run in worker processes."""
+
+    store = ChunkStore(store_directory)
+    store[start:stop] = TestChunkStore.reference(store.shape)[start:stop]
+
+    return os.getpid()
+
+
+class TestChunkStore(unittest.TestCase):
+    """Tests for `ChunkStore` and ensembles that write into it."""
+
+    @staticmethod
+    def reference(shape):
+        """Array with a distinct value in every element."""
+
+        return np.arange(np.prod(shape), dtype=np.float64).reshape(shape)
+
+    def test_hyperslabs(self):
+        """Any selection of integers and slices matches the same selection of a NumPy array."""
+
+        shape = (7, 11, 3)
+        expected = TestChunkStore.reference(shape)
+
+        keys = [(3, slice(None), 0), (slice(None), 10, 0), (slice(2, 6), slice(1, 9, 3), slice(None)), (-1,),
+                (Ellipsis, 2), (slice(5, 2),), (slice(None, None, 2), 4)]
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            for compression in (None, 'gzip'):
+                with self.subTest(compression=compression):
+
+                    store = ChunkStore.create(os.path.join(dirpath, f"{compression}"), shape, chunks=(3, 4, 2),
+                                              compression=compression)
+                    store[:] = expected
+
+                    self.assertEqual(len(store.initialized_chunks()), np.prod(store.grid))
+
+                    for key in keys:
+                        np.testing.assert_array_equal(store[key], expected[key])
+
+                    # a partial chunk write keeps the rest of the chunk
+                    store[1, 2:5, 1] = -1.0
+                    expected_update = expected.copy()
+                    expected_update[1, 2:5, 1] = -1.0
+                    np.testing.assert_array_equal(ChunkStore(store.store_directory)[:], expected_update)
+
+            with self.assertRaises(FileExistsError):
+                ChunkStore.create(os.path.join(dirpath, 'None'), shape)
+
+            with self.assertRaises(TypeError):
+                store[[0, 1]]
+
+    def test_fill_value(self):
+        """Chunks that were never written read as the fill value."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            store = ChunkStore.create(dirpath, (4, 5, 1), chunks=(2, 5, 1))
+            store.write_chunk((1, 0, 0), np.ones((2, 5, 1)))
+
+            self.assertTrue(np.isnan(store[0:2]).all())
+            self.assertTrue((store[2:] == 1.0).all())
+
+            with self.assertRaises(ValueError):
+                store.write_chunk((0, 0, 0), np.ones((3, 5, 1)))
+
+    def test_parallel_writers(self):
+        """Worker processes write disjoint chunks without locks."""
+
+        shape = (12, 6, 1)
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            store = ChunkStore.create(dirpath, shape, chunks=(3, 6, 1), compression='gzip')
+
+            with ProcessPoolExecutor(max_workers=4) as executor:
+                list(executor.map(write_block, [dirpath] * 4, range(0, 12, 3), range(3, 15, 3)))
+
+            np.testing.assert_array_equal(store[:], TestChunkStore.reference(shape))
+
+    def test_ensemble(self):
+        """Ensemble workers write each member's values into the store."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            members = [{'alpha_param': a, 'beta_param': b} for a in (-1.0, 0.0, 1.0) for b in (0.5, 1.0, 1.5)]
+
+            for workers in (1, 2, None):
+                with self.subTest(workers=workers):
+
+                    ens = Ensemble(members, output_directory=dirpath, workers=workers, start_step=2015,
+                                   through_step=2020, time_step=1)
+
+                    store = ens.create_store(os.path.join(dirpath, f"store_{workers}"), member_chunk=2)
+
+                    with mock.patch.object(Ensemble, 'MIN_SIZED_MEMBERS', 1):
+                        summary = ens.run(store=store).to_frame(ens.time_axis)
+
+                    values = store[:, :, 0]
+
+                    self.assertEqual(store.shape, (len(members), len(ens.time_axis), 1))
+                    np.testing.assert_allclose(values.mean(axis=0), summary['mean'].to_numpy())
+                    np.testing.assert_allclose(store[4, :, 0], run_member(ens.member_parameters(4), write_outputs=False))
+                    self.assertEqual(store.coordinate_index('step', 2020), 5)
+
+                    # store-backed members do not write output files
+                    self.assertEqual([i for _, _, files in os.walk(dirpath) for i in files
+                                      if i.startswith('output_')], [])
+
+            # unless asked to
+            ens = Ensemble(members[:2], output_directory=dirpath, workers=1, start_step=2015, through_step=2020,
+                           time_step=1)
+            ens.run(store=ens.create_store(os.path.join(dirpath, 'store_outputs')), member_outputs=True)
+            self.assertTrue(os.path.isfile(os.path.join(ens.member_directory(1), 'output_year_2020.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Tests for the command line interface.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import yaml
+
+import im3py.cli as cli
+
+
+class TestCli(unittest.TestCase):
+    """Tests for `im3py run`."""
+
+    def write_configs(self, dirpath, n):
+        """Write `n` configuration files that each write to their own output directory."""
+
+        config_files = []
+
+        for index in range(n):
+
+            output_directory = os.path.join(dirpath, f"out_{index}")
+            os.makedirs(output_directory)
+
+            config = {'output_directory': output_directory, 'start_step': 2015, 'through_step': 2017,
+                      'time_step': 1, 'alpha_param': 0.5 * index, 'beta_param': 1.42, 'write_logfile': False}
+
+            config_files.append(os.path.join(dirpath, f"config_{index}.yml"))
+
+            with open(config_files[-1], 'w') as out:
+                yaml.dump(config, out)
+
+        return config_files
+
+    def test_expand_configs(self):
+        """Files, directories, and globs expand to unique configuration files."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_files = self.write_configs(dirpath, 3)
+
+            expanded = cli.expand_configs([config_files[1], dirpath, os.path.join(dirpath, 'config_*.yml')])
+            self.assertEqual(expanded, [config_files[1], config_files[0], config_files[2]])
+
+            with self.assertRaises(FileNotFoundError):
+                cli.expand_configs([os.path.join(dirpath, 'missing.yml')])
+
+    def test_run(self):
+        """All configurations run in one process and the summary reports each one."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.write_configs(dirpath, 3)
+
+            # a configuration with an out of range parameter fails without stopping the batch
+            with open(os.path.join(dirpath, 'config_bad.yml'), 'w') as out:
+                yaml.dump({'output_directory': dirpath, 'start_step': 2015, 'through_step': 2016, 'time_step': 1,
+                           'alpha_param': 5.0, 'beta_param': 1.0, 'write_logfile': False}, out)
+
+            stdout = io.StringIO()
+
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+                status = cli.main(['run', dirpath])
+
+            self.assertEqual(status, 1)
+            self.assertIn('3 of 4 run(s) completed', stdout.getvalue())
+
+            for index in range(3):
+                self.assertTrue(os.path.isfile(os.path.join(dirpath, f"out_{index}", 'output_year_2017.txt')))
+
+    def test_run_workers(self):
+        """A worker pool produces the same summary as a serial run."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_files = self.write_configs(dirpath, 4)
+
+            df = cli.run_configs(config_files, workers=2)
+
+            self.assertEqual(list(df['config']), config_files)
+            self.assertTrue((df['status'] == cli.STATUS_COMPLETED).all())
+            self.assertEqual(list(df['steps']), [3] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
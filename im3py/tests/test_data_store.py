@@ -0,0 +1,166 @@
+"""Tests for the zip-backed data store.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import io
+import os
+import pkg_resources
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from im3py.data_store import ZipDataStore
+from im3py.model import Model
+
+
+class TestDataStore(unittest.TestCase):
+    """Tests for the `ZipDataStore` class."""
+
+    # comparison datasets
+    COMP_CSV = pkg_resources.resource_filename('im3py', 'tests/data/comp_data/test_no-header.csv')
+
+    ARRAY = np.arange(24, dtype=np.float64).reshape(4, 6)
+
+    def build_archive(self, dirpath):
+        """Write a zip archive with stored and deflated members."""
+
+        archive = os.path.join(dirpath, 'supplement.zip')
+
+        buffer = io.BytesIO()
+        np.save(buffer, TestDataStore.ARRAY)
+
+        with zipfile.ZipFile(archive, 'w') as zipped:
+            zipped.writestr('test/', b'')
+            zipped.writestr('test/stored.npy', buffer.getvalue(), compress_type=zipfile.ZIP_STORED)
+            zipped.writestr('test/deflated.npy', buffer.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+            zipped.writestr('test/grid.csv', "1,2\n3,4\n", compress_type=zipfile.ZIP_DEFLATED)
+            zipped.write(TestDataStore.COMP_CSV, 'test/test_no-header.csv')
+
+        return archive
+
+    def test_listdir_and_open(self):
+        """Members are listed and opened lazily from the archive."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            with ZipDataStore(self.build_archive(dirpath)) as store:
+
+                self.assertEqual(store.listdir(), ['test'])
+                self.assertEqual(store.listdir('test'), ['deflated.npy', 'grid.csv', 'stored.npy',
+                                                         'test_no-header.csv'])
+                self.assertTrue(store.isfile('test/grid.csv'))
+                self.assertFalse(store.isfile('test'))
+
+                with store.open('test/test_no-header.csv') as get, open(TestDataStore.COMP_CSV) as comp:
+                    self.assertEqual(get.read(), comp.read())
+
+                with self.assertRaises(FileNotFoundError):
+                    store.open('test/missing.csv')
+
+            # nothing was extracted
+            self.assertEqual(os.listdir(dirpath), ['supplement.zip'])
+
+    def test_read_array(self):
+        """Stored arrays are memory mapped and deflated arrays are decompressed to the same values."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            with ZipDataStore(self.build_archive(dirpath)) as store:
+
+                self.assertTrue(store.is_stored('test/stored.npy'))
+
+                stored = store.read_array('test/stored.npy')
+                deflated = store.read_array('test/deflated.npy')
+
+                np.testing.assert_array_equal(stored, TestDataStore.ARRAY)
+                np.testing.assert_array_equal(deflated, TestDataStore.ARRAY)
+
+                # zero-copy view of the memory map
+                self.assertFalse(stored.flags.owndata)
+                self.assertFalse(stored.flags.writeable)
+
+                np.testing.assert_array_equal(store.read_array('test/grid.csv'), [[1, 2], [3, 4]])
+
+                del stored
+
+    def test_index_cache(self):
+        """The central directory of an unchanged archive is parsed once across stores."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            archive = self.build_archive(dirpath)
+
+            parse = zipfile.ZipFile._RealGetContents
+
+            with mock.patch.object(zipfile.ZipFile, '_RealGetContents', autospec=True, side_effect=parse) as parsed:
+
+                for _ in range(3):
+                    with ZipDataStore(archive) as store:
+                        np.testing.assert_array_equal(store.read_array('test/deflated.npy'), TestDataStore.ARRAY)
+                        self.assertEqual(store.listdir('test'), ['deflated.npy', 'grid.csv', 'stored.npy',
+                                                                 'test_no-header.csv'])
+
+                self.assertEqual(parsed.call_count, 1)
+
+                # a changed archive is parsed again
+                with zipfile.ZipFile(archive, 'a') as zipped:
+                    zipped.writestr('test/new.csv', "5,6\n")
+
+                parsed.reset_mock()
+
+                with ZipDataStore(archive) as store:
+                    self.assertTrue(store.isfile('test/new.csv'))
+
+                self.assertEqual(parsed.call_count, 1)
+
+    def test_concurrent_reads(self):
+        """Threads locate and read stored and deflated members of the same store at the same time."""
+
+        names = ['test/stored.npy', 'test/deflated.npy', 'test/grid.csv']
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            archive = self.build_archive(dirpath)
+
+            with ZipDataStore(archive) as reference:
+                expected = [bytes(reference.read_bytes(i)) for i in names]
+                offsets = [reference.data_offset(i) for i in names]
+
+            # header offsets are located on first use, so every thread starts from a cold store
+            with ZipDataStore(archive) as store:
+
+                def read(_):
+                    return [bytes(store.read_bytes(i)) for i in names] + [store.data_offset(i) for i in names]
+
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    results = list(executor.map(read, range(64)))
+
+                for result in results:
+                    self.assertEqual(result, expected + offsets)
+
+    def test_model_supplement(self):
+        """The model reads supplement inputs directly from the archive."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2016, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False, supplement_archive=self.build_archive(dirpath))
+
+            self.assertEqual(run.supplement.read_array('test/deflated.npy').shape, (4, 6))
+
+            run.close()
+
+            self.assertIsNone(run._supplement)
+
+
+if __name__ == '__main__':
+    unittest.main()
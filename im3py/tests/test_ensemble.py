@@ -0,0 +1,99 @@
+"""Tests for ensemble runs.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import logging
+import os
+import pkg_resources
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import im3py.process_step as proc
+from im3py.ensemble import Ensemble, run_member
+from im3py.resources import ResourceProbe
+
+
+class TestEnsemble(unittest.TestCase):
+    """Tests for the `Ensemble` class."""
+
+    # test config YAML file
+    CONFIG_YAML = pkg_resources.resource_filename('im3py', 'tests/data/inputs/config.yml')
+
+    MEMBERS = [{'alpha_param': a, 'beta_param': b} for a in (-1.0, 0.5, 2.0) for b in (-0.5, 1.42)]
+
+    def expected_values(self):
+        """Per member values for the 2015-2016 configuration:  sum for the start step then the mean."""
+
+        return np.array([[m['alpha_param'] + m['beta_param'], (m['alpha_param'] + m['beta_param']) / 2]
+                         for m in TestEnsemble.MEMBERS])
+
+    def test_ensemble_serial_and_parallel(self):
+        """Serial, process pool, and automatically sized runs reduce to the same statistics."""
+
+        expected = self.expected_values()
+
+        for workers in (1, 2, None):
+            with self.subTest(workers=workers), tempfile.TemporaryDirectory() as dirpath:
+
+                ens = Ensemble(TestEnsemble.MEMBERS, output_directory=dirpath, config_file=TestEnsemble.CONFIG_YAML,
+                               workers=workers)
+
+                # size this small ensemble automatically
+                with mock.patch.object(Ensemble, 'MIN_SIZED_MEMBERS', 1):
+                    df = ens.run().to_frame(ens.time_axis)
+
+                self.assertEqual(list(df.index), [2015, 2016])
+                np.testing.assert_allclose(df['mean'].values, expected.mean(axis=0))
+                np.testing.assert_allclose(df['variance'].values, expected.var(axis=0, ddof=1))
+                np.testing.assert_allclose(df['min'].values, expected.min(axis=0))
+                np.testing.assert_allclose(df['max'].values, expected.max(axis=0))
+
+                self.assertEqual(len(os.listdir(dirpath)), len(TestEnsemble.MEMBERS))
+                self.assertTrue(os.path.isfile(os.path.join(ens.member_directory(5), 'output_year_2016.txt')))
+
+    def test_small_ensemble_in_process(self):
+        """Small ensembles run in this process by default without a calibration worker."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            ens = Ensemble(TestEnsemble.MEMBERS, output_directory=dirpath, config_file=TestEnsemble.CONFIG_YAML)
+
+            with mock.patch.object(ResourceProbe, 'calibrate') as calibrate:
+                df = ens.run().to_frame(ens.time_axis)
+
+            calibrate.assert_not_called()
+            np.testing.assert_allclose(df['mean'].values, self.expected_values().mean(axis=0))
+
+    def test_failed_member_closes_run(self):
+        """A member that fails part way through does not leave its log handlers on the process."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            ens = Ensemble(TestEnsemble.MEMBERS, output_directory=dirpath, config_file=TestEnsemble.CONFIG_YAML)
+
+            handlers = list(logging.getLogger().handlers)
+
+            with mock.patch.object(proc, 'process_step', side_effect=RuntimeError("step failed")):
+                with self.assertRaises(RuntimeError):
+                    run_member(ens.member_parameters(0))
+
+            self.assertEqual([i for i in logging.getLogger().handlers if i not in handlers], [])
+
+    def test_member_overrides_validated(self):
+        """Members may not change the shared time axis."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            with self.assertRaises(ValueError):
+                Ensemble([{'through_step': 2020}], output_directory=dirpath, config_file=TestEnsemble.CONFIG_YAML)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""Tests for incremental recompute.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import im3py.incremental as incremental
+import im3py.process_step as proc
+from im3py.model import Model
+
+
+class TestIncremental(unittest.TestCase):
+    """Tests for `Model(incremental=True)`."""
+
+    PARAMETERS = {'start_step': 2015, 'through_step': 2020, 'time_step': 1, 'alpha_param': 2.0,
+                  'beta_param': 1.42, 'write_logfile': False, 'incremental': True}
+
+    def run_model(self, output_directory, **kwargs):
+        """Run all steps and return the model and the steps that were computed."""
+
+        run = Model(output_directory=output_directory, **dict(TestIncremental.PARAMETERS, **kwargs))
+
+        with mock.patch.object(proc, 'process_step', wraps=proc.process_step) as process_step:
+            run.run_all_steps()
+
+        return run, [i.args[0] for i in process_step.call_args_list]
+
+    def test_first_run(self):
+        """A first run computes every step and saves its run parameters."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run, computed = self.run_model(dirpath)
+
+            self.assertEqual(computed, list(range(2015, 2021)))
+            self.assertEqual(run.incremental_report['reused'], [])
+
+            saved = incremental.read_run_parameters(dirpath)
+            self.assertEqual(saved['parameters']['through_step'], 2020)
+            self.assertEqual([i['step'] for i in saved['steps']], list(range(2015, 2021)))
+
+    def test_extend_horizon(self):
+        """Extending the horizon computes only the new steps."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath)
+            run, computed = self.run_model(dirpath, through_step=2025)
+
+            self.assertEqual(computed, list(range(2021, 2026)))
+            self.assertEqual(run.incremental_report['reused'], list(range(2015, 2021)))
+            self.assertEqual(run.incremental_report['changed'], {'through_step': (2020, 2025)})
+
+            # nothing changed on the next run
+            _, computed = self.run_model(dirpath, through_step=2025)
+            self.assertEqual(computed, [])
+
+    def test_start_step(self):
+        """Moving the start step recomputes only the steps whose sum or mean kernel changes."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath)
+
+            run, computed = self.run_model(dirpath, start_step=2017)
+            self.assertEqual(computed, [2017])
+            self.assertEqual(run.incremental_report['dropped'], [2015, 2016])
+
+            _, computed = self.run_model(dirpath, start_step=2014)
+            self.assertEqual(computed, [2014, 2015, 2016, 2017])
+
+            with open(os.path.join(dirpath, 'output_year_2017.txt')) as get:
+                self.assertEqual(get.read(), "The value for year 2017 is calculated as:  1.71\n")
+
+    def test_parameters(self):
+        """Changing alpha or beta recomputes every affected step, and missing outputs are recomputed."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath)
+
+            _, computed = self.run_model(dirpath, alpha_param=1.0)
+            self.assertEqual(computed, list(range(2015, 2021)))
+
+            _, computed = self.run_model(dirpath, alpha_param=[1.0, 1.0, 1.0, 0.5, 0.5, 0.5])
+            self.assertEqual(computed, [2018, 2019, 2020])
+
+            os.remove(os.path.join(dirpath, 'output_year_2016.txt'))
+
+            _, computed = self.run_model(dirpath, alpha_param=[1.0, 1.0, 1.0, 0.5, 0.5, 0.5])
+            self.assertEqual(computed, [2016])
+
+            # a different compression writes to different files
+            _, computed = self.run_model(dirpath, alpha_param=[1.0, 1.0, 1.0, 0.5, 0.5, 0.5],
+                                         output_compression='gzip')
+            self.assertEqual(len(computed), 6)
+
+    def test_reassigned_parameter(self):
+        """A parameter reassigned between steps recomputes the remaining steps."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath)
+
+            run = Model(output_directory=dirpath, **TestIncremental.PARAMETERS)
+            run.initialize()
+
+            values = [run.advance_step() for _ in range(2)]
+            run.alpha_param = 1.0
+
+            with mock.patch.object(proc, 'process_step', wraps=proc.process_step) as process_step:
+                values.extend(run.advance_step() for _ in range(4))
+
+            run.close()
+
+            self.assertEqual(process_step.call_count, 4)
+            self.assertAlmostEqual(values[0], 3.42)
+            self.assertAlmostEqual(values[-1], 1.21)
+
+    def test_interrupted_run(self):
+        """Outputs overwritten by an interrupted run are not reused by the next run."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath, alpha_param=2.0)
+
+            # the run dies after two steps without closing
+            run = Model(output_directory=dirpath, **dict(TestIncremental.PARAMETERS, alpha_param=-1.5))
+            run.initialize()
+            run.advance_step()
+            run.advance_step()
+
+            with open(os.path.join(dirpath, 'output_year_2016.txt')) as get:
+                self.assertAlmostEqual(float(get.read().split()[-1]), -0.04)
+
+            run, computed = self.run_model(dirpath, alpha_param=2.0)
+
+            self.assertEqual(computed, list(range(2015, 2021)))
+            self.assertEqual(run.incremental_report['reused'], [])
+
+            with open(os.path.join(dirpath, 'output_year_2016.txt')) as get:
+                self.assertEqual(get.read(), "The value for year 2016 is calculated as:  1.71\n")
+
+    def test_interrupted_partial_reuse(self):
+        """Steps reused by an interrupted run stay reusable; steps it changed do not."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            self.run_model(dirpath)
+
+            run = Model(output_directory=dirpath, **dict(TestIncremental.PARAMETERS,
+                                                         alpha_param=[2.0, 2.0, 2.0, 1.0, 1.0, 1.0]))
+            run.initialize()
+            values = [run.advance_step() for _ in range(4)]
+
+            run, computed = self.run_model(dirpath)
+
+            self.assertAlmostEqual(values[-1], 1.21)
+            self.assertEqual(run.incremental_report['reused'], [2015, 2016, 2017])
+            self.assertEqual(computed, [2018, 2019, 2020])
+
+
+if __name__ == '__main__':
+    unittest.main()
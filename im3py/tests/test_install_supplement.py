@@ -1,9 +1,18 @@
+import functools
+import hashlib
+import http.server
 import os
 import pkg_resources
+import socket
+import socketserver
 import tempfile
+import threading
 import unittest
+import zipfile
+from unittest import mock
 
 import pandas as pd
+import requests
 
 from im3py.install_supplement import InstallSupplement
 
@@ -40,6 +49,161 @@ class TestInstallSupplement(unittest.TestCase):
             # compare for equality
             pd.testing.assert_frame_equal(df_comp, df_test)
 
+    @staticmethod
+    def serve_directory(dirpath):
+        """Start a local HTTP stand-in server for the remote data source in a background thread."""
+
+        handler = functools.partial(QuietHandler, served_directory=dirpath)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+    @staticmethod
+    def build_manifest(remote_dir, server, n_artifacts):
+        """Write zip artifacts to the served directory and build their manifest."""
+
+        manifest = []
+
+        for i in range(n_artifacts):
+
+            name = f"dataset_{i}.zip"
+            path = os.path.join(remote_dir, name)
+
+            with zipfile.ZipFile(path, 'w') as zipped:
+                zipped.write(TestInstallSupplement.COMP_CSV, f"{TestInstallSupplement.REMOTE_DATA_DIR}/{i}/{TestInstallSupplement.REMOTE_DATA_FILE}")
+
+            with open(path, 'rb') as get:
+                sha256 = hashlib.sha256(get.read()).hexdigest()
+
+            manifest.append({'name': name,
+                             'url': f"http://127.0.0.1:{server.server_address[1]}/{name}",
+                             'size': os.path.getsize(path),
+                             'sha256': sha256})
+
+        return manifest
+
+    def test_concurrent_manifest_download(self):
+        """Test that every artifact in a manifest is downloaded, verified, cached, and read without extracting."""
+
+        with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as dirpath:
+
+            server = self.serve_directory(remote_dir)
+
+            try:
+                manifest = self.build_manifest(remote_dir, server, n_artifacts=5)
+
+                sup = InstallSupplement(dirpath, max_workers=3, manifest=manifest)
+
+                stores = sup.fetch_all_data()
+
+                self.assertEqual(sorted(stores), [i['name'] for i in manifest])
+                self.assertEqual(sup.download_stats['artifacts'], 5)
+                self.assertEqual(sup.download_stats['bytes'], sum(i['size'] for i in manifest))
+                self.assertGreater(sup.download_stats['throughput_mb_per_second'], 0)
+
+                with stores['dataset_3.zip'].open(f"{TestInstallSupplement.REMOTE_DATA_DIR}/3/{TestInstallSupplement.REMOTE_DATA_FILE}") as get:
+                    pd.testing.assert_frame_equal(pd.read_csv(TestInstallSupplement.COMP_CSV), pd.read_csv(get))
+
+                for store in stores.values():
+                    store.close()
+
+                # artifacts that are not zip archives are returned as downloaded
+                with open(os.path.join(remote_dir, 'readme.txt'), 'w') as out:
+                    out.write("data supplement\n")
+
+                with open(os.path.join(remote_dir, 'readme.txt'), 'rb') as get:
+                    sha256 = hashlib.sha256(get.read()).hexdigest()
+
+                text_artifact = {'name': 'readme.txt',
+                                 'url': f"http://127.0.0.1:{server.server_address[1]}/readme.txt",
+                                 'size': os.path.getsize(os.path.join(remote_dir, 'readme.txt')),
+                                 'sha256': sha256}
+
+                stores = InstallSupplement(dirpath, manifest=manifest[:1] + [text_artifact]).fetch_all_data()
+
+                self.assertEqual(stores['readme.txt'], os.path.join(dirpath, 'readme.txt'))
+                self.assertTrue(os.path.isfile(stores['readme.txt']))
+                stores['dataset_0.zip'].close()
+
+                # valid cached artifacts are not downloaded again
+                sup.fetch_data('dataset_1.zip', extract=True).close()
+
+                self.assertEqual(sup.download_stats['artifacts'], 0)
+                self.assertEqual(sup.download_stats['cached'], 1)
+                self.assertTrue(os.path.isfile(os.path.join(dirpath, TestInstallSupplement.REMOTE_DATA_DIR, '1', TestInstallSupplement.REMOTE_DATA_FILE)))
+
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_checksum_mismatch(self):
+        """Test that an artifact that does not match its checksum is rejected and not left on disk."""
+
+        with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as dirpath:
+
+            server = self.serve_directory(remote_dir)
+
+            try:
+                manifest = self.build_manifest(remote_dir, server, n_artifacts=1)
+                manifest[0]['sha256'] = '0' * 64
+
+                sup = InstallSupplement(dirpath, manifest=manifest)
+
+                with self.assertRaises(ValueError):
+                    sup.download_artifacts()
+
+                self.assertEqual(os.listdir(dirpath), [])
+
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_stalled_download_times_out(self):
+        """Test that a server that accepts the connection but never responds fails the download."""
+
+        with tempfile.TemporaryDirectory() as dirpath, socket.socket() as listener:
+
+            # the connection is queued by the listening socket but never answered
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+
+            artifact = {'name': 'stalled.zip',
+                        'url': f"http://127.0.0.1:{listener.getsockname()[1]}/stalled.zip",
+                        'size': None,
+                        'sha256': None}
+
+            sup = InstallSupplement(dirpath, manifest=[artifact])
+
+            with mock.patch.object(InstallSupplement, 'TIMEOUT', (1, 0.5)):
+                with self.assertRaises(requests.exceptions.Timeout):
+                    sup.download_artifacts()
+
+            self.assertEqual(os.listdir(dirpath), [])
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles each request in a thread; `http.server.ThreadingHTTPServer` needs Python 3.7."""
+
+    daemon_threads = True
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Request handler for the local stand-in server that serves `served_directory` and does not log to stderr;
+    the `directory` argument of `SimpleHTTPRequestHandler` needs Python 3.7."""
+
+    def __init__(self, *args, served_directory=None, **kwargs):
+
+        self.served_directory = served_directory
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+
+        return os.path.join(self.served_directory, os.path.relpath(super().translate_path(path), os.getcwd()))
+
+    def log_message(self, format, *args):
+        pass
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+"""Parity tests for the step kernel backends.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import decimal
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import im3py.kernels as kernels
+
+
+class TestKernels(unittest.TestCase):
+    """Tests for the kernel registry and the parity of each backend with the pure-Python reference."""
+
+    # inputs used for parity checks
+    PARITY_INPUTS = [[2.0, 1.42],
+                     [1, 2.0, 3],
+                     [-2.0],
+                     list(np.random.default_rng(42).uniform(-2.0, 2.0, 1000))]
+
+    def test_backend_parity(self):
+        """Each available backend of each registered kernel must match the Python reference."""
+
+        for name in kernels.list_kernels():
+
+            kernel = kernels.get_kernel(name)
+
+            for values in TestKernels.PARITY_INPUTS:
+
+                expected = kernel(values, backend=kernels.BACKEND_PYTHON)
+
+                for backend in kernel.available_backends:
+                    with self.subTest(kernel=name, backend=backend, n=len(values)):
+                        self.assertAlmostEqual(kernel(values, backend=backend), expected, places=12)
+
+    def test_exact_output_values(self):
+        """The values written to output files must be identical across backends."""
+
+        for name, values, expected in (('sum', [2.0, 1.42], 3.42), ('mean', [2.0, 1.42], 1.71)):
+
+            kernel = kernels.get_kernel(name)
+
+            for backend in kernel.available_backends:
+                with self.subTest(kernel=name, backend=backend):
+                    self.assertEqual(f"{kernel([2.0, 1.42], backend=backend)}", f"{expected}")
+
+    @unittest.skipIf(kernels.numba is None, "Numba is not installed")
+    def test_numba_selected_when_installed(self):
+        """Numba is preferred when installed."""
+
+        self.assertEqual(kernels.get_kernel('sum').select_backend('auto'), kernels.BACKEND_NUMBA)
+
+    @unittest.skipIf(kernels.numba is None, "Numba is not installed")
+    def test_numba_errors(self):
+        """Kernels Numba cannot type fall back to another backend; runtime errors are raised."""
+
+        def untyped(values):
+            return float(decimal.Decimal(len(values)))
+
+        def failing(values):
+            raise ValueError("bad input")
+
+        for name, func in (('test_untyped', untyped), ('test_failing', failing)):
+            kernels.register_kernel(kernels.Kernel(name=name, inputs=('list_of_values',), outputs=('value',),
+                                                   python=lambda values: 1.0, numba=func))
+
+        try:
+            untyped_kernel = kernels.get_kernel('test_untyped')
+            self.assertEqual(untyped_kernel([1.0, 2.0], backend=kernels.BACKEND_NUMBA), 1.0)
+            self.assertNotIn(kernels.BACKEND_NUMBA, untyped_kernel.available_backends)
+
+            failing_kernel = kernels.get_kernel('test_failing')
+
+            with self.assertRaises(ValueError):
+                failing_kernel([1.0, 2.0], backend=kernels.BACKEND_NUMBA)
+
+            self.assertIn(kernels.BACKEND_NUMBA, failing_kernel.available_backends)
+
+        finally:
+            kernels._REGISTRY.pop('test_untyped')
+            kernels._REGISTRY.pop('test_failing')
+
+    def test_fallback_without_numba(self):
+        """Requesting Numba without it installed falls back to the NumPy backend."""
+
+        with mock.patch.object(kernels, 'numba', None):
+
+            kernel = kernels.get_kernel('mean')
+
+            self.assertEqual(kernel.select_backend('auto'), kernels.BACKEND_NUMPY)
+            self.assertEqual(kernel.select_backend(kernels.BACKEND_NUMBA), kernels.BACKEND_NUMPY)
+            self.assertEqual(kernel([2.0, 1.42], backend=kernels.BACKEND_NUMBA), 1.71)
+
+    def test_registry(self):
+        """Test registering, retrieving, and rejecting duplicate kernels."""
+
+        kernel = kernels.Kernel(name='test_max', inputs=('list_of_values',), outputs=('value',), python=max)
+
+        kernels.register_kernel(kernel)
+
+        try:
+            self.assertIs(kernels.get_kernel('test_max'), kernel)
+            self.assertEqual(kernel.available_backends, (kernels.BACKEND_PYTHON,))
+            self.assertEqual(kernel([1, 3, 2], backend='auto'), 3)
+
+            with self.assertRaises(KeyError):
+                kernels.register_kernel(kernel)
+
+            with self.assertRaises(ValueError):
+                kernel.select_backend('gpu')
+
+        finally:
+            kernels._REGISTRY.pop('test_max')
+
+        with self.assertRaises(KeyError):
+            kernels.get_kernel('test_max')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -67,6 +67,52 @@ class TestModel(unittest.TestCase):
             self.assertEqual(self.get_file_content(run_output_2015), self.get_file_content(TestModel.OUTPUT_2015))
             self.assertEqual(self.get_file_content(run_output_2016), self.get_file_content(TestModel.OUTPUT_2016))
 
+    def test_model_branch(self):
+        """Ensure branches continue from the shared prefix with their own parameters."""
+
+        alphas = [-1.0, 0.0, 1.0]
+
+        for workers in (1, 3):
+            with self.subTest(workers=workers), tempfile.TemporaryDirectory() as dirpath:
+
+                run = Model(output_directory=dirpath,
+                            start_step=TestModel.START_STEP,
+                            through_step=2018,
+                            time_step=TestModel.TIME_STEP,
+                            alpha_param=TestModel.ALPHA_PARAM,
+                            beta_param=TestModel.BETA_PARAM,
+                            write_logfile=False)
+
+                run.initialize()
+
+                # shared prefix
+                run.advance_step()
+                run.advance_step()
+
+                snapshot = run.snapshot()
+                self.assertEqual(snapshot['step_index'], 2)
+                self.assertEqual(snapshot['next_step'], 2017)
+
+                results = run.branch(len(alphas), [{'alpha_param': a} for a in alphas], workers=workers)
+
+                # the parent is unchanged and can continue
+                self.assertEqual(run.snapshot(), snapshot)
+                self.assertAlmostEqual(run.advance_step(), (TestModel.ALPHA_PARAM + TestModel.BETA_PARAM) / 2)
+
+                run.close()
+
+                for index, alpha in enumerate(alphas):
+
+                    branch_dir = os.path.join(dirpath, f"branch_{index}")
+
+                    self.assertEqual(results[index]['output_directory'], branch_dir)
+                    self.assertEqual(results[index]['values'], [(alpha + TestModel.BETA_PARAM) / 2] * 2)
+
+                    # prefix outputs are shared with the branch
+                    self.assertEqual(self.get_file_content(os.path.join(branch_dir, 'output_year_2016.txt')),
+                                     self.get_file_content(TestModel.OUTPUT_2016))
+                    self.assertTrue(os.path.isfile(os.path.join(branch_dir, 'output_year_2018.txt')))
+
     @staticmethod
     def get_file_content(f):
         """Extract file content to a list.
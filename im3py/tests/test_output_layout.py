@@ -0,0 +1,106 @@
+"""Tests for the output directory layouts.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+
+from im3py.model import Model
+from im3py.output_layout import MARKER_FILE, OutputLayout, migrate, parse_file_name
+from im3py.time_axis import TimeAxis
+
+
+class TestOutputLayout(unittest.TestCase):
+    """Tests for `OutputLayout` and `migrate`."""
+
+    def test_time_layout(self):
+        """Time directories stop one level above the unit of the time axis."""
+
+        layout = OutputLayout('time')
+
+        annual = layout.relative_paths(TimeAxis.from_range(2015, 2016))
+        self.assertEqual(annual, ['2010s/output_year_2015.txt', '2010s/output_year_2016.txt'])
+
+        hourly = layout.relative_paths(TimeAxis.from_range('2015-12-31T23', '2016-01-01T00', unit='h'))
+        self.assertEqual(hourly[1], '2010s/2016/01/01/output_hour_2016-01-01T00.txt')
+
+        # single file names resolve to the same paths as the whole axis
+        for path in annual + hourly:
+            self.assertEqual(layout.relative_path(path.rpartition('/')[2]), path)
+
+    def test_parse_file_name(self):
+        """Steps are recovered from file names with the colons of the time of day removed."""
+
+        axis = TimeAxis.from_range('2015-01-01T05:30', '2015-01-01T05:31', unit='m')
+        value, unit = parse_file_name(str(axis.file_names[1]))
+
+        self.assertEqual(unit, 'm')
+        self.assertEqual(value, axis.values[1])
+
+        with self.assertRaises(ValueError):
+            parse_file_name('logfile.log')
+
+    def test_hash_layout(self):
+        """Hash directories have the configured depth and width."""
+
+        path = OutputLayout('hash', hash_levels=3, hash_width=1).relative_path('output_year_2015.txt')
+        parts = path.split('/')
+
+        self.assertEqual(len(parts), 4)
+        self.assertTrue(all(len(i) == 1 for i in parts[:3]))
+
+    def test_model_writes_and_migrates(self):
+        """A model writes nested outputs, records the layout, and the outputs migrate back to flat."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2021, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False, output_layout='time')
+            run.run_all_steps()
+
+            self.assertTrue(os.path.isfile(os.path.join(dirpath, '2020s', 'output_year_2021.txt')))
+            self.assertTrue(os.path.isfile(run.output_path(2015)))
+            self.assertEqual(OutputLayout.detect(dirpath), OutputLayout('time'))
+
+            # another layout may not write to the same directory
+            with self.assertRaises(ValueError):
+                Model(output_directory=dirpath, start_step=2015, through_step=2016, time_step=1, alpha_param=2.0,
+                      beta_param=1.42, write_logfile=False, output_layout='hash').initialize()
+
+            # outputs in unrelated subdirectories are left in place
+            os.makedirs(os.path.join(dirpath, 'branch_0'))
+            open(os.path.join(dirpath, 'branch_0', 'output_year_2015.txt'), 'w').close()
+
+            moves = migrate(dirpath, 'hash')
+            self.assertEqual(len(moves), 7)
+            self.assertFalse(os.path.exists(os.path.join(dirpath, '2010s')))
+
+            moves = migrate(dirpath, 'flat')
+            self.assertEqual(len(moves), 7)
+            self.assertFalse(os.path.exists(os.path.join(dirpath, MARKER_FILE)))
+            self.assertEqual(sorted(os.listdir(dirpath)),
+                             ['branch_0'] + [f"output_year_{i}.txt" for i in range(2015, 2022)])
+
+            self.assertTrue(os.path.isfile(os.path.join(dirpath, 'branch_0', 'output_year_2015.txt')))
+
+            # existing flat outputs must be migrated before writing with a nested layout
+            with self.assertRaisesRegex(ValueError, '--layout time'):
+                Model(output_directory=dirpath, start_step=2015, through_step=2016, time_step=1, alpha_param=2.0,
+                      beta_param=1.42, write_logfile=False, output_layout='time').initialize()
+
+            self.assertFalse(os.path.exists(os.path.join(dirpath, MARKER_FILE)))
+
+            migrate(dirpath, 'time')
+            Model(output_directory=dirpath, start_step=2015, through_step=2016, time_step=1, alpha_param=2.0,
+                  beta_param=1.42, write_logfile=False, output_layout='time').run_all_steps()
+            self.assertTrue(os.path.isfile(os.path.join(dirpath, '2010s', 'output_year_2016.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
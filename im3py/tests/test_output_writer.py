@@ -0,0 +1,183 @@
+"""Tests for the compressed and buffered output writer.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import im3py.output_writer as output_writer
+from im3py.model import Model
+from im3py.output_writer import OutputWriter, list_codecs, read_output
+
+
+class TestOutputWriter(unittest.TestCase):
+    """Tests for `OutputWriter` and `read_output`."""
+
+    TEXT = "The value for year 2015 is calculated as:  3.42\n"
+
+    def test_codecs(self):
+        """Every registered codec round trips through the transparent reader."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            for codec in [None] + list_codecs():
+                with self.subTest(codec=codec):
+
+                    path = os.path.join(dirpath, f"{codec}", 'output_year_2015.txt')
+
+                    with OutputWriter(codec) as writer:
+                        writer.write(path, TestOutputWriter.TEXT)
+
+                    self.assertTrue(os.path.isfile(path + writer.extension))
+                    self.assertEqual(read_output(path), TestOutputWriter.TEXT)
+
+            with self.assertRaises(ValueError):
+                OutputWriter('rar')
+
+    def test_buffering(self):
+        """Outputs are held until the buffer fills or the writer closes."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            paths = [os.path.join(dirpath, f"output_year_{i}.txt") for i in range(2015, 2020)]
+            writer = OutputWriter(buffer_size=3 * len(TestOutputWriter.TEXT))
+
+            for path in paths[:2]:
+                writer.write(path, TestOutputWriter.TEXT)
+
+            self.assertFalse(any(os.path.exists(i) for i in paths))
+
+            writer.write(paths[2], TestOutputWriter.TEXT)
+            self.assertTrue(all(os.path.exists(i) for i in paths[:3]))
+
+            writer.write(paths[3], TestOutputWriter.TEXT)
+            writer.close()
+            self.assertTrue(os.path.exists(paths[3]))
+
+    def test_durability(self):
+        """Files are synced every N steps and at close."""
+
+        self.assertEqual(OutputWriter.validate_durability('5'), 5)
+
+        for durability in ('sometimes', 0):
+            with self.assertRaises(ValueError):
+                OutputWriter.validate_durability(durability)
+
+        with tempfile.TemporaryDirectory() as dirpath, \
+                mock.patch.object(output_writer, 'fsync_path', wraps=output_writer.fsync_path) as fsync_path:
+
+            writer = OutputWriter('gzip', durability=2, buffer_size=1 << 20)
+
+            for year in range(2015, 2018):
+                writer.write(os.path.join(dirpath, f"output_year_{year}.txt"), TestOutputWriter.TEXT)
+
+            # two files and their directory after the second step
+            self.assertEqual(fsync_path.call_count, 3)
+
+            writer.close()
+            self.assertEqual(fsync_path.call_count, 5)
+
+    def test_fsync_directory_on_windows(self):
+        """Directories are not opened for syncing on Windows, where that raises PermissionError."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            with mock.patch.object(output_writer.os, 'name', 'nt'), \
+                    mock.patch.object(output_writer.os, 'open', side_effect=PermissionError) as os_open:
+                output_writer.fsync_path(dirpath)
+
+            os_open.assert_not_called()
+
+    def test_atomic_write(self):
+        """An output killed before it is committed is never visible and its temporary file is cleaned up."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            path = os.path.join(dirpath, 'output_year_2015.txt')
+
+            with mock.patch.object(output_writer.os, 'replace', side_effect=KeyboardInterrupt):
+                with self.assertRaises(KeyboardInterrupt):
+                    output_writer.atomic_write(path, TestOutputWriter.TEXT.encode('utf-8'))
+
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(len(os.listdir(dirpath)), 1)
+
+            output_writer.recover_outputs(dirpath, remove_temporary=True)
+            self.assertEqual(os.listdir(dirpath), [])
+
+    def test_journal_recovery(self):
+        """A batch killed while it is renamed into place is committed from its journal."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            journal_directory = os.path.join(dirpath, output_writer.JOURNAL_DIRECTORY)
+            paths = [os.path.join(dirpath, f"output_year_{i}.txt") for i in range(2015, 2019)]
+
+            writer = OutputWriter('gzip', buffer_size=1 << 20, journal_directory=journal_directory)
+
+            for path in paths:
+                writer.write(path, TestOutputWriter.TEXT)
+
+            with mock.patch.object(output_writer, 'commit', side_effect=KeyboardInterrupt):
+                with self.assertRaises(KeyboardInterrupt):
+                    writer.flush()
+
+            self.assertFalse(any(os.path.exists(i + writer.extension) for i in paths))
+            self.assertEqual(len(os.listdir(journal_directory)), 1)
+
+            self.assertEqual(output_writer.recover_outputs(dirpath), len(paths))
+
+            self.assertEqual([read_output(i) for i in paths], [TestOutputWriter.TEXT] * len(paths))
+            self.assertEqual(os.listdir(journal_directory), [])
+
+    def test_model(self):
+        """A compressed, buffered model run and its branches read back transparently."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2018, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False, output_layout='time', output_compression='lzma',
+                        output_durability='close', output_buffer_size=1 << 20)
+
+            run.initialize()
+            run.advance_step()
+            run.advance_step()
+
+            results = run.branch(1, {'alpha_param': 1.0}, workers=1)
+            run.close()
+
+            self.assertEqual(run.read_output(2015), "The value for year 2015 is calculated as:  3.42\n")
+            self.assertTrue(os.path.isfile(os.path.join(dirpath, '2010s', 'output_year_2015.txt.xz')))
+
+            branch = os.path.join(results[0]['output_directory'], '2010s', 'output_year_2015.txt')
+            self.assertEqual(read_output(branch), "The value for year 2015 is calculated as:  3.42\n")
+            self.assertEqual(read_output(os.path.join(results[0]['output_directory'], '2010s',
+                                                      'output_year_2018.txt')),
+                             "The value for year 2018 is calculated as:  1.21\n")
+
+
+    def test_model_without_outputs(self):
+        """A model run without outputs returns its values and writes no files."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2018, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False, output_layout='time', write_outputs=False)
+
+            run.initialize()
+            values = [run.advance_step() for _ in range(4)]
+            run.close()
+
+            self.assertAlmostEqual(values[0], 3.42)
+            self.assertEqual(os.listdir(dirpath), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
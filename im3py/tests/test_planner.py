@@ -0,0 +1,124 @@
+"""Tests for the execution planner.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import yaml
+
+import im3py.cli as cli
+import im3py.planner as planner
+from im3py.ensemble import Ensemble
+from im3py.model import Model
+
+
+class TestPlanner(unittest.TestCase):
+    """Tests for `im3py.planner`, `Model.plan`, and `im3py run --dry-run`."""
+
+    # synthetic costs in seconds per step and bytes per step
+    CALIBRATION = {'sample_steps': 5,
+                   'compute': {'numpy': 1e-5, 'python': 4e-5},
+                   'compile': {'numpy': 0.0, 'python': 0.0},
+                   'write': {'text': 1e-4, 'gzip': 1e-4},
+                   'bytes': {'text': 4096, 'gzip': 1024},
+                   'step_overhead': 1e-5,
+                   'member_overhead': 1e-3}
+
+    def choose(self, n_steps, members, cpus, calibration=None):
+        """Plan from synthetic costs."""
+
+        calibration = TestPlanner.CALIBRATION if calibration is None else calibration
+        candidates = planner.predict(calibration, n_steps, members, cpus)
+
+        return planner.ExecutionPlan(candidates, calibration, n_steps, members, cpus)
+
+    def test_strategies(self):
+        """The strategy follows the workload size and the CPUs available."""
+
+        # a single run cannot use workers
+        single = self.choose(1000, 1, 8)
+        self.assertEqual(single.strategy, planner.STRATEGY_VECTORIZED)
+        self.assertNotIn(planner.STRATEGY_PARALLEL, single.candidates['strategy'].tolist())
+
+        # many members spread over all CPUs
+        ensemble = self.choose(1000, 64, 8)
+        self.assertEqual((ensemble.strategy, ensemble.workers), (planner.STRATEGY_PARALLEL, 8))
+        self.assertEqual(ensemble.files, 64000)
+
+        # worker startup outweighs a tiny workload
+        tiny = self.choose(2, 2, 8)
+        self.assertNotEqual(tiny.strategy, planner.STRATEGY_PARALLEL)
+
+        # a costly compile outweighs a faster kernel on a short run
+        calibration = dict(TestPlanner.CALIBRATION, compile={'numpy': 10.0, 'python': 0.0})
+        self.assertEqual(self.choose(100, 1, 1, calibration).strategy, planner.STRATEGY_SERIAL)
+
+    def test_sink(self):
+        """Sinks with the same predicted runtime are chosen by I/O volume."""
+
+        execution_plan = self.choose(1000, 4, 1)
+
+        self.assertEqual(execution_plan.sink, planner.SINK_GZIP)
+        self.assertEqual(execution_plan.io_bytes, 4 * 1000 * 1024)
+        self.assertEqual(execution_plan.model_kwargs['output_compression'], 'gzip')
+
+        calibration = dict(TestPlanner.CALIBRATION, write={'text': 1e-4, 'gzip': 1e-3})
+        self.assertEqual(self.choose(1000, 4, 1, calibration).sink, planner.SINK_TEXT)
+
+    def test_model_plan(self):
+        """Planning calibrates on a sample of steps without writing to the output directory."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2064, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False)
+
+            execution_plan = run.plan(members=16, cpus=4, sample_steps=3)
+
+            self.assertEqual(os.listdir(dirpath), [])
+            self.assertEqual(execution_plan.calibration['sample_steps'], 3)
+            self.assertTrue(all(i > 0 for i in execution_plan.calibration['bytes'].values()))
+            self.assertIn(execution_plan.strategy, planner.STRATEGIES)
+            self.assertIn('Predicted runtime', str(execution_plan))
+            self.assertEqual(execution_plan.files, 16 * 50)
+
+            ens = Ensemble([{'alpha_param': a} for a in (-1.0, 1.0)], output_directory=dirpath, start_step=2015,
+                           through_step=2020, time_step=1, beta_param=1.42)
+            self.assertEqual(ens.plan(cpus=2, sample_steps=2).members, 2)
+            self.assertEqual(os.listdir(dirpath), [])
+
+    def test_dry_run(self):
+        """`im3py run --dry-run` prints the plan of each run and runs nothing."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            output_directory = os.path.join(dirpath, 'out')
+            os.makedirs(output_directory)
+
+            config_file = os.path.join(dirpath, 'config.yml')
+
+            with open(config_file, 'w') as out:
+                yaml.dump({'output_directory': output_directory, 'start_step': 2015, 'through_step': 2030,
+                           'time_step': 1, 'alpha_param': 2.0, 'beta_param': 1.42, 'write_logfile': False}, out)
+
+            stdout = io.StringIO()
+
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(cli.main(['run', config_file, '--dry-run']), 0)
+
+            self.assertIn('Strategy:', stdout.getvalue())
+            self.assertIn('1 run(s) predicted to take', stdout.getvalue())
+            self.assertEqual(os.listdir(output_directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
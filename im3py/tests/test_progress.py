@@ -0,0 +1,116 @@
+"""Tests for progress reporting and cancellation.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from im3py.model import Model
+from im3py.progress import CancellationToken, ProgressReporter
+
+
+class TestProgress(unittest.TestCase):
+    """Tests for `ProgressReporter` and `CancellationToken` as used by `Model`."""
+
+    START_STEP = 2015
+    THROUGH_STEP = 2020
+    TIME_STEP = 1
+    ALPHA_PARAM = 2.0
+    BETA_PARAM = 1.42
+
+    def build_model(self, dirpath, **kwargs):
+        """Build a model writing to `dirpath`."""
+
+        return Model(output_directory=dirpath,
+                     start_step=TestProgress.START_STEP,
+                     through_step=TestProgress.THROUGH_STEP,
+                     time_step=TestProgress.TIME_STEP,
+                     alpha_param=TestProgress.ALPHA_PARAM,
+                     beta_param=TestProgress.BETA_PARAM,
+                     write_logfile=False,
+                     **kwargs)
+
+    def test_progress_callback_and_status_file(self):
+        """Ensure callbacks receive progress and the status file reports completion."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            reports = []
+            status_file = os.path.join(dirpath, 'status.json')
+
+            run = self.build_model(dirpath, progress_callback=reports.append, progress_interval=0,
+                                   status_file=status_file)
+            run.run_all_steps()
+
+            # initial report, one per step, and the final report
+            self.assertEqual(len(reports), 8)
+            self.assertEqual(reports[-1]['completed_steps'], 6)
+            self.assertEqual(reports[-1]['total_steps'], 6)
+            self.assertEqual(reports[-1]['status'], ProgressReporter.STATUS_COMPLETED)
+            self.assertEqual(reports[-2]['eta_seconds'], 0)
+
+            with open(status_file) as get:
+                status = json.load(get)
+
+            self.assertEqual(status['status'], ProgressReporter.STATUS_COMPLETED)
+            self.assertEqual(status['completed_steps'], 6)
+
+    def test_cancel_from_callback(self):
+        """Ensure a cancelled run stops between steps and only complete outputs exist."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            token = CancellationToken()
+
+            def cancel_after_two(info):
+                if info['completed_steps'] == 2:
+                    token.cancel("test")
+
+            status_file = os.path.join(dirpath, 'status.json')
+            run = self.build_model(dirpath, progress_callback=cancel_after_two, progress_interval=0,
+                                   status_file=status_file, cancel_token=token)
+
+            with self.assertLogs(level='INFO') as logs:
+                run.run_all_steps()
+
+            self.assertTrue(any('Model run cancelled after 2 of 6 step(s)' in i for i in logs.output))
+            self.assertFalse(any('Model run completed' in i for i in logs.output))
+
+            outputs = sorted(i for i in os.listdir(dirpath) if i.startswith('output_year_'))
+            self.assertEqual(outputs, ['output_year_2015.txt', 'output_year_2016.txt'])
+
+            with open(status_file) as get:
+                status = json.load(get)
+
+            self.assertEqual(status['status'], ProgressReporter.STATUS_CANCELLED)
+            self.assertEqual(status['message'], "test")
+
+    def test_cancel_file(self):
+        """Ensure the existence of the cancel file cancels the token."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            cancel_file = os.path.join(dirpath, 'cancel')
+            token = CancellationToken(cancel_file=cancel_file)
+
+            self.assertFalse(token.cancelled)
+
+            open(cancel_file, 'w').close()
+
+            self.assertTrue(token.cancelled)
+
+            run = self.build_model(dirpath, cancel_token=token)
+            run.run_all_steps()
+
+            self.assertFalse(any(i.startswith('output_year_') for i in os.listdir(dirpath)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,7 @@ import pkg_resources
 import tempfile
 import unittest
 
-from im3py.read_config import ReadConfig
+from im3py.read_config import ReadConfig, load_config
 
 
 class TestReadConfig(unittest.TestCase):
@@ -70,6 +70,29 @@ class TestReadConfig(unittest.TestCase):
             # check type equality for each variable with expected
             self.check_types(cfg)
 
+    def test_setters_override_config(self):
+        """Test that values assigned through setters take precedence over the configuration file."""
+
+        cfg = ReadConfig(config_file=TestReadConfig.CONFIG_YAML)
+
+        cfg.alpha_param = -0.1
+        cfg.beta_param = 0.5
+
+        self.assertEqual(cfg.alpha_param, -0.1)
+        self.assertEqual(cfg.beta_param, 0.5)
+
+        with self.assertRaises(ValueError):
+            cfg.alpha_param = 3.0
+
+    def test_load_config_copies(self):
+        """Test that changing a loaded configuration does not change the cached one."""
+
+        config = load_config(TestReadConfig.CONFIG_YAML)
+        config['alpha_param'] = -0.1
+
+        self.assertEqual(load_config(TestReadConfig.CONFIG_YAML)['alpha_param'], TestReadConfig.ALPHA_PARAM)
+        self.assertEqual(ReadConfig(config_file=TestReadConfig.CONFIG_YAML).alpha_param, TestReadConfig.ALPHA_PARAM)
+
     def check_values(self, cfg):
         """Check values of each configuration attribute against expected.
 
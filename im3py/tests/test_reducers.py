@@ -0,0 +1,101 @@
+"""Tests for the streaming ensemble reducers.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import unittest
+
+import numpy as np
+
+from im3py.reducers import EnsembleReducer, TDigest
+
+
+class TestReducers(unittest.TestCase):
+    """Tests for the reducers in `reducers.py` against exact NumPy results."""
+
+    N_STEPS = 12
+    N_MEMBERS = 500
+
+    # member x step values
+    VALUES = np.random.default_rng(7).normal(0.0, 1.0, (N_MEMBERS, N_STEPS)).cumsum(axis=1)
+
+    def feed(self, members):
+        """Build a reducer from a subset of member rows."""
+
+        reducer = EnsembleReducer(TestReducers.N_STEPS, quantiles=(0.1, 0.5, 0.9))
+
+        for row in members:
+            reducer.update(row)
+
+        return reducer
+
+    def check_exact(self, reducer):
+        """Compare the moments and extremes of a reducer fed with all members to NumPy."""
+
+        np.testing.assert_allclose(reducer.moments.mean, TestReducers.VALUES.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(reducer.moments.variance(), TestReducers.VALUES.var(axis=0, ddof=1), rtol=1e-10)
+        np.testing.assert_array_equal(reducer.extremes.min, TestReducers.VALUES.min(axis=0))
+        np.testing.assert_array_equal(reducer.extremes.max, TestReducers.VALUES.max(axis=0))
+
+    def test_single_reducer(self):
+        """Test a reducer fed with every member."""
+
+        reducer = self.feed(TestReducers.VALUES)
+
+        self.assertEqual(reducer.count, TestReducers.N_MEMBERS)
+        self.check_exact(reducer)
+
+    def test_merged_reducers(self):
+        """Reducers fed with disjoint members by separate workers merge to the same result."""
+
+        parts = np.array_split(TestReducers.VALUES, 7)
+        reducer = self.feed(parts[0])
+
+        for part in parts[1:]:
+            reducer.merge(self.feed(part))
+
+        self.assertEqual(reducer.count, TestReducers.N_MEMBERS)
+        self.check_exact(reducer)
+
+        # quantile sketch stays close to the exact quantiles
+        expected = np.quantile(TestReducers.VALUES, 0.5, axis=0)
+        spread = TestReducers.VALUES.std(axis=0)
+        self.assertTrue(np.all(np.abs(reducer.sketch.quantile(0.5) - expected) < 0.05 * spread))
+
+    def test_to_frame(self):
+        """The summary frame has one row per step."""
+
+        df = self.feed(TestReducers.VALUES[:10]).to_frame(range(2015, 2015 + TestReducers.N_STEPS))
+
+        self.assertEqual(list(df.columns), ['count', 'mean', 'variance', 'min', 'max', 'q0.1', 'q0.5', 'q0.9'])
+        self.assertEqual(df.index[0], 2015)
+        self.assertEqual(len(df), TestReducers.N_STEPS)
+
+    def test_tdigest_bounded(self):
+        """The t-digest stays bounded in size and accurate in the tails."""
+
+        values = np.random.default_rng(3).uniform(0.0, 1.0, 100000)
+
+        digest = TDigest(compression=100)
+
+        for chunk in np.array_split(values, 100):
+            other = TDigest(compression=100)
+            other.update(chunk)
+            digest.merge(other)
+
+        self.assertEqual(digest.count, values.size)
+        self.assertLess(digest.n_centroids, 200)
+
+        for q in (0.001, 0.01, 0.5, 0.99, 0.999):
+            self.assertAlmostEqual(digest.quantile(q), np.quantile(values, q), delta=0.005)
+
+        self.assertEqual(digest.quantile(0.0), values.min())
+        self.assertEqual(digest.quantile(1.0), values.max())
+
+
+if __name__ == '__main__':
+    unittest.main()
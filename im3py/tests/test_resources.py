@@ -0,0 +1,126 @@
+"""Tests for the execution resource probe.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import im3py.resources as resources
+from im3py.resources import ResourceProbe
+
+
+def write_files(root, files):
+    """Write a dictionary of relative path to content under `root`."""
+
+    for name, content in files.items():
+
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'w') as out:
+            out.write(content)
+
+
+def allocate(n_bytes):
+    """Allocate and touch `n_bytes` of memory."""
+
+    return len(bytearray(n_bytes))
+
+
+class TestResourceProbe(unittest.TestCase):
+    """Tests for `ResourceProbe` against fake cgroup and proc file systems."""
+
+    MEMINFO = "MemTotal:       16000000 kB\nMemAvailable:    8000000 kB\n"
+
+    def build_probe(self, dirpath, cgroup_files, proc_cgroup):
+
+        cgroup_root = os.path.join(dirpath, 'cgroup')
+        proc_root = os.path.join(dirpath, 'proc')
+
+        write_files(cgroup_root, cgroup_files)
+        write_files(proc_root, {'self/cgroup': proc_cgroup, 'meminfo': TestResourceProbe.MEMINFO})
+
+        return ResourceProbe(cgroup_root=cgroup_root, proc_root=proc_root)
+
+    def test_cgroup_v2(self):
+        """cgroup v2 quota and memory limit are read from the process's cgroup."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            probe = self.build_probe(dirpath, {'jobs/42/cpu.max': '250000 100000', 'jobs/42/memory.max': '4000000000'},
+                                     '0::/jobs/42\n')
+
+            self.assertEqual(probe.cgroup_cpu_quota, 2.5)
+            self.assertEqual(probe.cpu_limit, min(2, probe.affinity_cpus))
+            self.assertEqual(probe.cgroup_memory_limit, 4000000000)
+            self.assertEqual(probe.available_memory, 8000000 * 1024)
+            self.assertEqual(probe.memory_limit, 4000000000)
+
+    def test_cgroup_v1_unlimited(self):
+        """cgroup v1 unlimited values fall back to the affinity mask and available memory."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            probe = self.build_probe(dirpath, {'cpu/cpu.cfs_quota_us': '-1', 'cpu/cpu.cfs_period_us': '100000',
+                                               'memory/memory.limit_in_bytes': str(2 ** 63 - 4096)},
+                                     '4:memory:/\n1:cpu,cpuacct:/\n0::/\n')
+
+            self.assertIsNone(probe.cgroup_cpu_quota)
+            self.assertEqual(probe.cpu_limit, probe.affinity_cpus)
+            self.assertIsNone(probe.cgroup_memory_limit)
+            self.assertEqual(probe.memory_limit, 8000000 * 1024)
+
+    def test_plan(self):
+        """Workers are limited by the binding constraint and the reason is reported."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            probe = self.build_probe(dirpath, {'cpu.max': '1600000 100000', 'memory.max': '1000000000'}, '0::/\n')
+            cpus = probe.cpu_limit
+
+            # memory:  0.8 * 1 GB / 400 MB per worker = 2 workers
+            decision = probe.plan(100, memory_per_worker=400000000)
+            self.assertEqual(decision['workers'], min(2, cpus))
+            self.assertEqual(decision['chunksize'], -(-100 // (decision['workers'] * 4)))
+
+            if cpus >= 2:
+                self.assertIn('memory', decision['reason'])
+
+            # fewer tasks than workers
+            self.assertEqual(probe.plan(1)['workers'], 1)
+            self.assertEqual(probe.plan(1)['chunksize'], 1)
+
+    def test_calibrate(self):
+        """Calibration returns the result and the peak memory of the worker."""
+
+        result, peak = ResourceProbe.calibrate(allocate, 50 * 1024 * 1024)
+
+        self.assertEqual(result, 50 * 1024 * 1024)
+        self.assertGreaterEqual(peak, 50 * 1024 * 1024)
+
+    def test_max_rss_units(self):
+        """Peak memory is scaled to bytes per platform and is 0 where `resource` is unavailable."""
+
+        usage = mock.Mock(ru_maxrss=2048)
+
+        with mock.patch.object(resources, 'resource', mock.Mock(getrusage=mock.Mock(return_value=usage))):
+
+            with mock.patch.object(resources.sys, 'platform', 'linux'):
+                self.assertEqual(resources._max_rss(), 2048 * 1024)
+
+            with mock.patch.object(resources.sys, 'platform', 'darwin'):
+                self.assertEqual(resources._max_rss(), 2048)
+
+        with mock.patch.object(resources, 'resource', None):
+            self.assertEqual(resources._max_rss(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
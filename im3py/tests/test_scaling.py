@@ -0,0 +1,66 @@
+"""Tests for the scaling harness.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import im3py.scaling as scaling
+
+
+class TestScaling(unittest.TestCase):
+    """Tests for `run_scaling` and the efficiency calculations."""
+
+    def test_run_scaling(self):
+        """A small study writes one CSV row per run with baseline efficiency of 1."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            csv_file = os.path.join(dirpath, 'scaling.csv')
+
+            df = scaling.run_scaling(worker_counts=(1, 2), step_counts=(3,), member_counts=(2,), output_directory=dirpath,
+                                     csv_file=csv_file)
+
+            # one model baseline, then strong and weak runs for each worker count
+            self.assertEqual(len(df), 5)
+            self.assertEqual(len(pd.read_csv(csv_file)), 5)
+
+            for column in ('wall_seconds', 'cpu_seconds', 'bytes_written', 'speedup', 'efficiency'):
+                self.assertIn(column, df.columns)
+
+            weak = df[(df['mode'] == scaling.WEAK)]
+            self.assertEqual(list(weak['members']), [2, 4])
+            self.assertEqual(list(weak['files_written']), [6, 12])
+
+            base = df[(df['workload'] == scaling.WORKLOAD_ENSEMBLE) & (df['workers'] == 1)]
+            self.assertTrue((base['efficiency'] == 1.0).all())
+
+            # scratch outputs are removed
+            self.assertEqual(os.listdir(dirpath), ['scaling.csv'])
+
+    def test_add_efficiency(self):
+        """Strong and weak efficiency follow their definitions."""
+
+        df = pd.DataFrame({'workload': [scaling.WORKLOAD_ENSEMBLE] * 4,
+                           'mode': [scaling.STRONG, scaling.STRONG, scaling.WEAK, scaling.WEAK],
+                           'steps': [10] * 4,
+                           'members': [8, 8, 8, 16],
+                           'workers': [1, 2, 1, 2],
+                           'wall_seconds': [10.0, 8.0, 10.0, 12.5]})
+
+        df = scaling.add_efficiency(df, 1)
+
+        self.assertEqual(list(df['speedup']), [1.0, 1.25, 1.0, 1.6])
+        self.assertEqual(list(df['efficiency']), [1.0, 0.625, 1.0, 0.8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Tests for multi-scenario configuration files.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+import im3py.scenarios as scenarios
+from im3py.cli import run_configs
+from im3py.scenarios import ScenarioFile
+
+
+class TestScenarioFile(unittest.TestCase):
+    """Tests for `ScenarioFile` and its sidecar."""
+
+    def write_scenarios(self, dirpath, alphas=(-1.0, 0.5, 1.0)):
+        """Write a scenario file with one scenario per alpha value."""
+
+        content = {'base': {'output_directory': dirpath, 'start_step': 2015, 'through_step': 2017, 'time_step': 1,
+                            'alpha_param': 2.0, 'beta_param': 1.42},
+                   'scenarios': [{'name': f"alpha_{i}", 'alpha_param': a} for i, a in enumerate(alphas)]}
+
+        # the last scenario writes to its own directory
+        content['scenarios'][-1]['output_directory'] = os.path.join(dirpath, 'custom')
+        os.makedirs(content['scenarios'][-1]['output_directory'], exist_ok=True)
+
+        config_file = os.path.join(dirpath, 'scenarios.yml')
+
+        with open(config_file, 'w') as out:
+            yaml.dump(content, out)
+
+        return config_file
+
+    def setUp(self):
+
+        scenarios._SCENARIO_CACHE.clear()
+
+    def test_views(self):
+        """Scenario views layer overrides over the shared base."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_file = self.write_scenarios(dirpath)
+            sf = ScenarioFile(config_file)
+
+            self.assertEqual(sf.names, ['alpha_0', 'alpha_1', 'alpha_2'])
+            self.assertIs(sf.config(0).maps[-1], sf.base)
+
+            # no sidecar by default, and views do not create directories
+            self.assertFalse(os.path.exists(scenarios.sidecar_path(config_file)))
+            self.assertFalse(os.path.exists(sf.config('alpha_1')['output_directory']))
+
+            config = sf.read_config('alpha_1')
+            self.assertEqual(config.alpha_param, 0.5)
+            self.assertEqual(config.beta_param, 1.42)
+            self.assertEqual(config.output_directory, os.path.join(dirpath, 'alpha_1'))
+            self.assertEqual(sf.read_config(-1).output_directory, os.path.join(dirpath, 'custom'))
+
+            with self.assertRaises(KeyError):
+                sf.config('missing')
+
+    def test_views_do_not_share_cache(self):
+        """Changes to the view of one scenario file do not leak into later loads of the same file."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_file = self.write_scenarios(dirpath)
+
+            view = ScenarioFile(config_file).config('alpha_0')
+            view['alpha_param'] = 0.0
+            view['through_step'] = 2030
+
+            sf = ScenarioFile(config_file)
+
+            self.assertEqual(sf.config('alpha_0')['alpha_param'], -1.0)
+            self.assertEqual(sf.base['through_step'], 2017)
+            self.assertNotIn('through_step', sf.overrides[0])
+
+    def test_sidecar(self):
+        """Reloads read the sidecar until the file changes."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_file = self.write_scenarios(dirpath)
+            ScenarioFile(config_file, sidecar=True)
+
+            self.assertTrue(os.path.isfile(scenarios.sidecar_path(config_file)))
+
+            scenarios._SCENARIO_CACHE.clear()
+
+            with mock.patch.object(scenarios, 'load_config', side_effect=AssertionError("parsed")):
+                self.assertEqual(len(ScenarioFile(config_file, sidecar=True)), 3)
+
+            # the sidecar is not read unless enabled
+            scenarios._SCENARIO_CACHE.clear()
+
+            with mock.patch.object(scenarios, 'read_sidecar', side_effect=AssertionError("unpickled")):
+                self.assertEqual(len(ScenarioFile(config_file)), 3)
+
+            # a changed file invalidates the sidecar
+            self.write_scenarios(dirpath, alphas=(0.0, 0.25))
+            scenarios._SCENARIO_CACHE.clear()
+
+            self.assertEqual(len(ScenarioFile(config_file, sidecar=True)), 2)
+
+    def test_run_scenarios(self):
+        """The command line runner runs every scenario of a scenario file."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            df = run_configs([self.write_scenarios(dirpath)])
+
+            self.assertEqual(list(df['scenario']), ['alpha_0', 'alpha_1', 'alpha_2'])
+            self.assertTrue((df['status'] == 'completed').all())
+
+            with open(os.path.join(dirpath, 'alpha_0', 'output_year_2015.txt')) as get:
+                self.assertEqual(get.read(), f"The value for year 2015 is calculated as:  {-1.0 + 1.42}\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Tests for the precomputed time axis.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from im3py.model import Model
+from im3py.read_config import ReadConfig
+from im3py.time_axis import TimeAxis
+
+
+class TestTimeAxis(unittest.TestCase):
+    """Tests for the `TimeAxis` class and its use by `ReadConfig` and `Model`."""
+
+    def test_annual_axis(self):
+        """Annual axes iterate as integer years and keep the existing output names."""
+
+        axis = TimeAxis.from_range(2015, 2030, 5)
+
+        self.assertEqual(list(axis), [2015, 2020, 2025, 2030])
+        self.assertEqual(type(axis[0]), int)
+        self.assertEqual(axis.file_names[0], 'output_year_2015.txt')
+        self.assertEqual(axis.index(2025), 2)
+        self.assertNotIn(2016, axis)
+
+    def test_monthly_axis(self):
+        """Monthly axes produce ISO labels, file names, O(1) index lookups, and slices."""
+
+        axis = TimeAxis.from_range('2015-01', '2016-12', 1, 'M')
+
+        self.assertEqual(len(axis), 24)
+        self.assertEqual(axis.values.dtype, np.dtype('datetime64[M]'))
+        self.assertEqual(axis[0], '2015-01')
+        self.assertEqual(axis[-1], '2016-12')
+        self.assertEqual(axis.file_names[13], 'output_month_2016-02.txt')
+        self.assertEqual(axis.index('2016-02'), 13)
+        self.assertEqual(axis.index(np.datetime64('2016-02')), 13)
+
+        with self.assertRaises(KeyError):
+            axis.index('2017-01')
+
+        sliced = axis[12:24:3]
+
+        self.assertEqual(list(sliced), ['2016-01', '2016-04', '2016-07', '2016-10'])
+        self.assertEqual(sliced.step_size, 3)
+        self.assertEqual(sliced.index('2016-07'), 2)
+
+    def test_irregular_axis(self):
+        """Irregular axes infer their unit and support lookups."""
+
+        axis = TimeAxis.from_steps(['2015-01-01', '2015-01-15', '2015-03-01'])
+
+        self.assertEqual(axis.unit, 'D')
+        self.assertFalse(axis.is_regular)
+        self.assertEqual(axis.index('2015-03-01'), 2)
+        self.assertNotIn('2015-01-02', axis)
+
+        with self.assertRaises(ValueError):
+            TimeAxis.from_steps([2020, 2015])
+
+    def test_large_axis(self):
+        """A large daily axis is computed with vectorized operations."""
+
+        axis = TimeAxis.from_range('1900-01-01', '2099-12-31', 1, 'D')
+
+        self.assertEqual(len(axis), 73049)
+        self.assertEqual(axis.index('2000-01-01'), 36524)
+        self.assertEqual(axis.file_names[-1], 'output_day_2099-12-31.txt')
+
+    def test_read_config_time_axis(self):
+        """`ReadConfig` builds the axis once and keeps annual step types."""
+
+        cfg = ReadConfig(start_step=2015, through_step=2016, time_step=1)
+
+        self.assertIs(cfg.time_axis, cfg.step_list)
+        self.assertEqual(list(cfg.step_list), [2015, 2016])
+
+        cfg = ReadConfig(start_step='2015-11', through_step='2016-02', time_step=1, time_unit='M')
+
+        self.assertEqual(cfg.start_step, '2015-11')
+        self.assertEqual(list(cfg.step_list), ['2015-11', '2015-12', '2016-01', '2016-02'])
+
+        cfg = ReadConfig(time_steps=[2015, 2020, 2050])
+
+        self.assertEqual(cfg.start_step, 2015)
+        self.assertEqual(cfg.through_step, 2050)
+        self.assertIsNone(cfg.time_step)
+
+    def test_model_monthly_outputs(self):
+        """Model runs write one output per sub-annual step."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath,
+                        start_step='2015-11',
+                        through_step='2016-02',
+                        time_step=1,
+                        time_unit='M',
+                        alpha_param=2.0,
+                        beta_param=1.42,
+                        write_logfile=False)
+
+            run.run_all_steps()
+
+            outputs = sorted(i for i in os.listdir(dirpath) if i.startswith('output_'))
+
+            self.assertEqual(outputs, ['output_month_2015-11.txt', 'output_month_2015-12.txt',
+                                       'output_month_2016-01.txt', 'output_month_2016-02.txt'])
+
+            with open(os.path.join(dirpath, 'output_month_2015-11.txt')) as get:
+                self.assertEqual(get.read(), "The value for year 2015-11 is calculated as:  3.42\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Tests for the Chrome trace timeline.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import glob
+import json
+import os
+import tempfile
+import unittest
+
+import im3py.tracing as tracing
+from im3py.ensemble import Ensemble
+from im3py.model import Model
+
+
+class TestTracing(unittest.TestCase):
+    """Tests for `im3py.tracing` and traced runs."""
+
+    def tearDown(self):
+
+        tracing.disable()
+
+    @staticmethod
+    def read_trace(output_directory):
+        """Read the single trace exported to an output directory."""
+
+        trace_files = glob.glob(os.path.join(output_directory, 'trace_*.json'))
+
+        assert len(trace_files) == 1, trace_files
+
+        with open(trace_files[0]) as get:
+            return json.load(get)['traceEvents']
+
+    def test_disabled(self):
+        """Spans are a shared no-op when tracing is disabled."""
+
+        self.assertFalse(tracing.is_enabled())
+        self.assertIs(tracing.span('step'), tracing.span('write', tracing.CATEGORY_WRITE))
+
+        with tracing.span('step'):
+            pass
+
+        with self.assertRaises(RuntimeError):
+            tracing.export('trace.json')
+
+    def test_export(self):
+        """Event files of each process are merged in time order with process names."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            trace_directory = os.path.join(dirpath, 'events')
+            trace_file = os.path.join(dirpath, 'trace.json')
+
+            tracing.enable(trace_directory)
+            self.assertEqual(os.environ[tracing.TRACE_DIRECTORY_ENV], trace_directory)
+
+            with tracing.span('outer', tracing.CATEGORY_RUN, step=2015):
+                with tracing.span('inner'):
+                    pass
+
+            self.assertEqual(tracing.export(trace_file, clean=True), 2)
+            self.assertFalse(tracing.is_enabled())
+            self.assertNotIn(tracing.TRACE_DIRECTORY_ENV, os.environ)
+            self.assertFalse(os.path.exists(trace_directory))
+
+            with open(trace_file) as get:
+                events = json.load(get)['traceEvents']
+
+            complete = [i for i in events if i['ph'] == 'X']
+
+            self.assertEqual([i['name'] for i in complete], ['outer', 'inner'])
+            self.assertEqual(complete[0]['args'], {'step': 2015})
+            self.assertGreaterEqual(complete[0]['dur'], complete[1]['dur'])
+            self.assertEqual(events[0]['args']['name'], f"coordinator {os.getpid()}")
+
+    def test_model(self):
+        """A traced model run exports step compute, write, and log events into its output directory."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2017, time_step=1, alpha_param=2.0,
+                        beta_param=1.42, write_logfile=False, trace=True)
+            run.run_all_steps()
+
+            self.assertFalse(tracing.is_enabled())
+            self.assertFalse(os.path.exists(os.path.join(dirpath, Model.TRACE_DIRECTORY)))
+
+            events = [i for i in self.read_trace(dirpath) if i['ph'] == 'X']
+            categories = {i['cat'] for i in events}
+
+            self.assertTrue({tracing.CATEGORY_COMPUTE, tracing.CATEGORY_WRITE, tracing.CATEGORY_LOG,
+                             tracing.CATEGORY_RUN} <= categories)
+            self.assertEqual([i['args']['step'] for i in events if i['name'] == 'step'], [2015, 2016, 2017])
+            self.assertTrue(all(i['pid'] == os.getpid() and 'tid' in i for i in events))
+
+    def test_ensemble(self):
+        """A traced ensemble records the events of each worker process and the waits of the coordinator."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            members = [{'alpha_param': a} for a in (-1.0, 0.0, 1.0, 2.0)]
+            ens = Ensemble(members, output_directory=dirpath, workers=2, start_step=2015, through_step=2016,
+                           time_step=1, beta_param=1.42, trace=True)
+            ens.run()
+
+            events = self.read_trace(dirpath)
+            pids = {i['pid'] for i in events if i['ph'] == 'X' and i['name'] == 'step'}
+
+            self.assertNotIn(os.getpid(), pids)
+            self.assertGreaterEqual(len(pids), 1)
+
+            # workers record 'queued' events that start before any event of the coordinator
+            names = {i['pid']: i['args']['name'] for i in events if i['name'] == 'process_name'}
+            self.assertEqual(names[os.getpid()], f"coordinator {os.getpid()}")
+            self.assertTrue(all(names[i] == f"worker {i}" for i in pids))
+            self.assertEqual(min(events, key=lambda i: i.get('ts', float('inf')))['name'], 'queued')
+            self.assertTrue(any(i['name'] == 'wait for worker' and i['pid'] == os.getpid() for i in events))
+            self.assertEqual(sum(1 for i in events if i['name'] == 'queued'), len(ens.chunks(workers=2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Tests for per-step parameter trajectories.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from im3py.model import Model
+from im3py.read_config import ReadConfig
+from im3py.time_axis import TimeAxis
+from im3py.trajectory import expand_schedule, resolve_trajectory
+
+
+class TestTrajectory(unittest.TestCase):
+    """Tests for `trajectory.py` and its use through `ReadConfig` and `Model`."""
+
+    AXIS = TimeAxis.from_range(2015, 2020, 1)
+
+    def test_expand_schedule(self):
+        """Schedules expand with piecewise-constant and linear interpolation."""
+
+        schedule = {2016: 1.0, 2018: 2.0}
+
+        np.testing.assert_array_equal(expand_schedule(schedule, TestTrajectory.AXIS, 'step'),
+                                      [1.0, 1.0, 1.0, 2.0, 2.0, 2.0])
+        np.testing.assert_array_equal(expand_schedule(schedule, TestTrajectory.AXIS, 'linear'),
+                                      [1.0, 1.0, 1.5, 2.0, 2.0, 2.0])
+
+        with self.assertRaises(ValueError):
+            expand_schedule(schedule, TestTrajectory.AXIS, 'cubic')
+
+    def test_resolve_trajectory(self):
+        """Scalars are broadcast and arrays must have one value per step."""
+
+        np.testing.assert_array_equal(resolve_trajectory(0.5, TestTrajectory.AXIS), [0.5] * 6)
+        np.testing.assert_array_equal(resolve_trajectory(range(6), TestTrajectory.AXIS), np.arange(6.0))
+
+        with self.assertRaises(ValueError):
+            resolve_trajectory([1.0, 2.0], TestTrajectory.AXIS)
+
+    def test_read_config_trajectories(self):
+        """Trajectories are range checked once and cached until reassigned."""
+
+        cfg = ReadConfig(start_step=2015, through_step=2020, time_step=1, alpha_param=[0.0, 0.5, 1.0, 1.5, 2.0, 2.0],
+                         beta_param={'schedule': {'2015': -1.0, '2020': 1.5}, 'interpolation': 'linear'})
+
+        np.testing.assert_allclose(cfg.beta_trajectory, [-1.0, -0.5, 0.0, 0.5, 1.0, 1.5])
+        self.assertIs(cfg.alpha_trajectory, cfg.alpha_trajectory)
+        self.assertFalse(cfg.alpha_trajectory.flags.writeable)
+
+        cfg.alpha_param = 1.0
+        np.testing.assert_array_equal(cfg.alpha_trajectory, [1.0] * 6)
+
+        with self.assertRaises(ValueError):
+            cfg.alpha_param = [0.0, 0.5, 1.0, 2.5, 2.0, 2.0]
+
+        with self.assertRaises(ValueError):
+            ReadConfig(start_step=2015, through_step=2020, time_step=1,
+                       alpha_param={'schedule': {2015: 0.0, 2020: 3.0}}).alpha_trajectory
+
+    def test_model_trajectory_outputs(self):
+        """Model outputs use the value of the trajectory at each step; setters still apply between steps."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            run = Model(output_directory=dirpath, start_step=2015, through_step=2018, time_step=1,
+                        alpha_param={'schedule': {2015: 2.0, 2017: 0.0}}, beta_param=[1.42, 1.0, 0.0, -1.0],
+                        write_logfile=False)
+
+            run.initialize()
+
+            values = [run.advance_step() for _ in range(3)]
+
+            run.beta_param = 2.0
+            values.append(run.advance_step())
+
+            run.close()
+
+            self.assertEqual(values, [3.42, 1.5, 0.0, 1.0])
+
+            with open(os.path.join(dirpath, 'output_year_2016.txt')) as get:
+                self.assertEqual(get.read(), "The value for year 2016 is calculated as:  1.5\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
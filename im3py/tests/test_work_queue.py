@@ -0,0 +1,219 @@
+"""Tests for the shared file system work queue.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import logging
+import unittest
+from unittest import mock
+
+import numpy as np
+import yaml
+
+import im3py.cli as cli
+import im3py.process_step as proc
+from im3py.ensemble import Ensemble, run_member
+from im3py.work_queue import SPECS_DIRECTORY, STATE_DONE, STATE_FAILED, STATE_LEASED, STATE_PENDING, WorkQueue
+
+
+class TestWorkQueue(unittest.TestCase):
+    """Tests for `WorkQueue` and the `im3py submit` and `im3py worker` commands."""
+
+    PARAMETERS = {'start_step': 2015, 'through_step': 2017, 'time_step': 1, 'alpha_param': 2.0,
+                  'beta_param': 1.42, 'write_logfile': False}
+
+    def test_claim(self):
+        """A spec is claimed by one worker at a time and is claimable again once released."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'))
+
+            ids = [queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath)) for _ in range(2)]
+            self.assertEqual(ids, ['task_000000', 'task_000001'])
+
+            with self.assertRaises(FileExistsError):
+                queue.submit(TestWorkQueue.PARAMETERS, task_id=ids[0])
+
+            first_id, first = queue.claim('node_a:1')
+            second_id, second = queue.claim('node_b:1')
+
+            self.assertEqual([first_id, second_id], ids)
+            self.assertIsNone(queue.claim('node_c:1'))
+            self.assertEqual(queue.state(first_id), STATE_LEASED)
+
+            first.release()
+            self.assertEqual(queue.state(first_id), STATE_PENDING)
+            self.assertEqual(queue.claim('node_c:1')[0], first_id)
+
+            second.release()
+
+    def test_stale_lease(self):
+        """A lease without heartbeats is reclaimed and its previous holder learns it was lost."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'), lease_timeout=5.0)
+            task_id = queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath))
+
+            _, lease = queue.claim('node_a:1')
+
+            # the holder stops sending heartbeats
+            old = time.time() - 10.0
+            os.utime(lease.path, (old, old))
+
+            reclaimed_id, reclaimed = queue.claim('node_b:1')
+            self.assertEqual(reclaimed_id, task_id)
+
+            lease.heartbeat()
+            self.assertTrue(lease.lost)
+
+            lease.release()
+            self.assertTrue(reclaimed.is_owner())
+
+            queue.run_task(task_id)
+            reclaimed.release()
+
+            self.assertEqual(queue.state(task_id), STATE_DONE)
+            self.assertEqual(os.listdir(os.path.join(queue.queue_directory, 'leases')), [])
+
+    def test_lost_lease_and_bad_spec(self):
+        """A worker that lost its lease does not write a record, and an unreadable spec is recorded as failed."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'), lease_timeout=5.0)
+            task_id = queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath))
+
+            _, lease = queue.claim('node_a:1')
+
+            old = time.time() - 10.0
+            os.utime(lease.path, (old, old))
+
+            _, reclaimed = queue.claim('node_b:1')
+
+            self.assertIsNone(queue.run_task(task_id, 'node_a:1', lease=lease))
+            self.assertEqual(queue.state(task_id), STATE_LEASED)
+
+            self.assertEqual(queue.run_task(task_id, 'node_b:1', lease=reclaimed)['status'], STATE_DONE)
+            reclaimed.release()
+            lease.release()
+
+            # a partially written spec fails its task instead of the worker
+            bad_id = queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath))
+
+            with open(queue.path(SPECS_DIRECTORY, bad_id), 'w') as out:
+                out.write('{"parameters": ')
+
+            records = queue.run_worker()
+
+            self.assertEqual([i['status'] for i in records], [STATE_FAILED])
+            self.assertEqual(queue.state(bad_id), STATE_FAILED)
+
+    def test_lease_moved_aside(self):
+        """A lease that is briefly unreadable, as during another worker's stale check, is not lost."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'))
+            task_id = queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath))
+
+            _, lease = queue.claim('node_a:1')
+
+            aside = f"{lease.path}.aside"
+            os.rename(lease.path, aside)
+
+            lease.heartbeat()
+            self.assertFalse(lease.lost)
+
+            os.rename(aside, lease.path)
+
+            self.assertEqual(queue.run_task(task_id, 'node_a:1', lease=lease)['status'], STATE_DONE)
+            self.assertEqual(queue.state(task_id), STATE_DONE)
+
+            lease.release()
+
+    def test_failed_task_closes_run(self):
+        """A task that fails part way through does not leave its log file handler on the worker."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'))
+            queue.submit(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath, write_logfile=True))
+
+            handlers = list(logging.getLogger().handlers)
+
+            with mock.patch.object(proc, 'process_step', side_effect=RuntimeError("step failed")):
+                records = queue.run_worker()
+
+            self.assertEqual([i['status'] for i in records], [STATE_FAILED])
+            self.assertFalse(any(isinstance(i, logging.FileHandler) for i in logging.getLogger().handlers
+                                 if i not in handlers))
+
+    def test_worker_processes(self):
+        """Several worker processes drain one queue and each member runs exactly once."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            members = [{'alpha_param': a, 'beta_param': b} for a in (-1.0, 0.0, 1.0) for b in (0.5, 1.0)]
+            ens = Ensemble(members, output_directory=dirpath, workers=1, start_step=2015, through_step=2018,
+                           time_step=1)
+
+            queue = WorkQueue(os.path.join(dirpath, 'queue'), lease_timeout=10.0)
+            queue.submit_ensemble(ens)
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.dirname(os.path.dirname(cli.__file__))] +
+                                                               sys.path))
+
+            workers = [subprocess.Popen([sys.executable, '-m', 'im3py', 'worker', queue.queue_directory, '--wait',
+                                         '--poll-interval', '0.1'], env=env, stdout=subprocess.DEVNULL)
+                       for _ in range(3)]
+
+            for worker in workers:
+                self.assertEqual(worker.wait(timeout=120), 0)
+
+            results = queue.wait(timeout=10)
+
+            self.assertEqual(len(results), len(members))
+            self.assertTrue((results['status'] == STATE_DONE).all())
+            self.assertEqual(queue.status()['done'], len(members))
+
+            for index, values in enumerate(results['values']):
+                np.testing.assert_allclose(values, run_member(ens.member_parameters(index)))
+
+    def test_cli_submit(self):
+        """`im3py submit` writes one spec per configuration."""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+
+            config_file = os.path.join(dirpath, 'config.yml')
+
+            with open(config_file, 'w') as out:
+                yaml.dump(dict(TestWorkQueue.PARAMETERS, output_directory=dirpath), out)
+
+            queue_directory = os.path.join(dirpath, 'queue')
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(cli.main(['submit', queue_directory, config_file]), 0)
+                self.assertEqual(cli.main(['worker', queue_directory]), 0)
+
+            queue = WorkQueue(queue_directory)
+
+            self.assertEqual(queue.spec('task_000000')['parameters']['output_directory'], dirpath)
+            self.assertEqual(queue.results()['steps'].tolist(), [3])
+            self.assertTrue(os.path.isfile(os.path.join(dirpath, 'output_year_2017.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,300 @@
+"""Precomputed time axis for annual, sub-annual, and irregular time steps.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import numpy as np
+
+
+class TimeAxis:
+    """Time axis backed by a `numpy.datetime64` array.  Step labels and output file names are computed once for the
+    whole axis with vectorized operations, and step to index lookups are O(1).
+
+    Annual axes (unit 'Y') iterate as integer years so that existing code and output names are unchanged.  All other
+    units iterate as ISO 8601 labels (e.g., '2015-01' for monthly or '2015-01-31' for daily steps).
+
+    :param values:                              Time steps in ascending order.
+    :type values:                               numpy.ndarray of numpy.datetime64
+
+    :param step_size:                           Optional.  Number of units between steps for a regular axis; None
+                                                for an irregular axis.
+    :type step_size:                            int
+
+    """
+
+    # supported numpy datetime units and the name used for them in output file names
+    UNIT_NAMES = {'Y': 'year',
+                  'M': 'month',
+                  'W': 'week',
+                  'D': 'day',
+                  'h': 'hour',
+                  'm': 'minute',
+                  's': 'second'}
+
+    # unit used for annual time steps
+    ANNUAL_UNIT = 'Y'
+
+    # numpy datetime64 year zero
+    EPOCH_YEAR = 1970
+
+    def __init__(self, values, step_size=None):
+
+        values = np.asarray(values)
+
+        if not np.issubdtype(values.dtype, np.datetime64):
+            raise TypeError(f"TimeAxis values must be numpy.datetime64; received dtype '{values.dtype}'.")
+
+        if values.ndim != 1 or values.size == 0:
+            raise ValueError("TimeAxis values must be a non-empty one-dimensional array.")
+
+        if values.size > 1 and not np.all(values[1:] > values[:-1]):
+            raise ValueError("TimeAxis values must be strictly increasing.")
+
+        self._values = values
+        self._unit = self.validate_unit(np.datetime_data(values.dtype)[0])
+        self._step_size = step_size
+
+        # precomputed per-step attributes
+        self._labels = None
+        self._file_names = None
+        self._steps = None
+
+        # lookup table for irregular axes; built on first use
+        self._index_lookup = None
+
+    @classmethod
+    def from_range(cls, start_step, through_step, time_step=1, unit=ANNUAL_UNIT):
+        """Build a regular time axis from the start step through the through step (inclusive).
+
+        :param start_step:                      Start time step as an integer year or an ISO 8601 string
+        :type start_step:                       int; str
+
+        :param through_step:                    Through time step as an integer year or an ISO 8601 string
+        :type through_step:                     int; str
+
+        :param time_step:                       Number of units between steps
+        :type time_step:                        int
+
+        :param unit:                            numpy datetime unit; one of 'Y', 'M', 'W', 'D', 'h', 'm', 's'
+        :type unit:                             str
+
+        :return:                                TimeAxis
+
+        """
+
+        unit = cls.validate_unit(unit)
+
+        if int(time_step) < 1:
+            raise ValueError(f"`time_step` must be a positive integer; received '{time_step}'.")
+
+        start = cls.to_datetime64(start_step, unit)
+        through = cls.to_datetime64(through_step, unit)
+
+        if through < start:
+            raise ValueError(f"`through_step` '{through_step}' is before `start_step` '{start_step}'.")
+
+        values = np.arange(start, through + np.timedelta64(1, unit), np.timedelta64(int(time_step), unit))
+
+        return cls(values, step_size=int(time_step))
+
+    @classmethod
+    def from_steps(cls, steps, unit=None):
+        """Build an irregular time axis from a sequence of steps.
+
+        :param steps:                           Integer years or ISO 8601 strings in ascending order
+        :type steps:                            list
+
+        :param unit:                            Optional.  numpy datetime unit.  If None, integer steps are treated
+                                                as years and the unit of other steps is inferred.
+        :type unit:                             str
+
+        :return:                                TimeAxis
+
+        """
+
+        steps = list(steps)
+
+        if unit is None and all(isinstance(i, (int, np.integer)) for i in steps):
+            unit = cls.ANNUAL_UNIT
+
+        if unit is None:
+            values = np.array([np.datetime64(i) for i in steps])
+        else:
+            unit = cls.validate_unit(unit)
+            values = np.array([cls.to_datetime64(i, unit) for i in steps], dtype=f'datetime64[{unit}]')
+
+        return cls(values)
+
+    @classmethod
+    def validate_unit(cls, unit):
+        """Ensure the time unit is supported."""
+
+        if unit not in cls.UNIT_NAMES:
+            raise ValueError(f"Time unit '{unit}' is not one of:  {list(cls.UNIT_NAMES)}")
+
+        return unit
+
+    @classmethod
+    def to_datetime64(cls, step, unit):
+        """Convert a step value to numpy.datetime64 in the target unit.
+
+        :param step:                            Integer year, ISO 8601 string, or date
+        :type step:                             int; str; datetime.date
+
+        :param unit:                            numpy datetime unit
+        :type unit:                             str
+
+        :return:                                numpy.datetime64
+
+        """
+
+        if isinstance(step, (int, np.integer)):
+            step = str(int(step))
+
+        try:
+            return np.datetime64(step, unit)
+        except ValueError:
+            raise ValueError(f"Step value '{step}' cannot be interpreted as a time step with unit '{unit}'.")
+
+    def __len__(self):
+
+        return self._values.size
+
+    def __iter__(self):
+
+        return iter(self.steps)
+
+    def __getitem__(self, item):
+        """Get the step at an index, or a new TimeAxis for a slice."""
+
+        if isinstance(item, slice):
+
+            step_size = self._step_size
+
+            if step_size is not None and item.step not in (None, 1):
+                step_size = step_size * item.step if item.step > 0 else None
+
+            return TimeAxis(self._values[item], step_size=step_size)
+
+        return self.steps[item]
+
+    def __eq__(self, other):
+
+        if not isinstance(other, TimeAxis):
+            return NotImplemented
+
+        return self._values.dtype == other.values.dtype and np.array_equal(self._values, other.values)
+
+    def __repr__(self):
+
+        return f"TimeAxis(unit='{self._unit}', n={len(self)}, start='{self.labels[0]}', through='{self.labels[-1]}')"
+
+    @property
+    def values(self):
+        """Time steps as a numpy.datetime64 array."""
+
+        return self._values
+
+    @property
+    def unit(self):
+        """numpy datetime unit of the axis."""
+
+        return self._unit
+
+    @property
+    def unit_name(self):
+        """Name of the unit used in output file names."""
+
+        return self.UNIT_NAMES[self._unit]
+
+    @property
+    def step_size(self):
+        """Number of units between steps for a regular axis; None if irregular."""
+
+        return self._step_size
+
+    @property
+    def is_regular(self):
+        """True if steps are evenly spaced."""
+
+        return self._step_size is not None
+
+    @property
+    def is_annual(self):
+        """True if the axis unit is years."""
+
+        return self._unit == self.ANNUAL_UNIT
+
+    @property
+    def labels(self):
+        """ISO 8601 label for each step as a numpy string array."""
+
+        if self._labels is None:
+            self._labels = np.datetime_as_string(self._values, unit=self._unit)
+
+        return self._labels
+
+    @property
+    def steps(self):
+        """Step values used when iterating:  integer years for annual axes, otherwise labels."""
+
+        if self._steps is None:
+            if self.is_annual:
+                self._steps = (self._values.astype(np.int64) + self.EPOCH_YEAR).tolist()
+            else:
+                self._steps = self.labels.tolist()
+
+        return self._steps
+
+    @property
+    def file_names(self):
+        """Output file name for each step (e.g., 'output_year_2015.txt' or 'output_month_2015-01.txt')."""
+
+        if self._file_names is None:
+            stems = np.char.add(f"output_{self.unit_name}_", np.char.replace(self.labels, ':', ''))
+            self._file_names = np.char.add(stems, '.txt')
+
+        return self._file_names
+
+    def index(self, step):
+        """Get the position of a step on the axis in O(1).
+
+        :param step:                            Step as an integer year, ISO 8601 string, or numpy.datetime64
+
+        :return:                                int; index of the step
+
+        """
+
+        value = self.to_datetime64(step, self._unit)
+
+        if self.is_regular:
+
+            offset = (value - self._values[0]).astype(np.int64)
+            index, remainder = divmod(int(offset), self._step_size)
+
+            if remainder == 0 and 0 <= index < len(self):
+                return index
+
+        else:
+
+            if self._index_lookup is None:
+                self._index_lookup = dict(zip(self._values.astype(np.int64).tolist(), range(len(self))))
+
+            index = self._index_lookup.get(int(value.astype(np.int64)))
+
+            if index is not None:
+                return index
+
+        raise KeyError(f"Step '{step}' is not on the time axis.")
+
+    def __contains__(self, step):
+
+        try:
+            self.index(step)
+            return True
+        except (KeyError, ValueError):
+            return False
@@ -0,0 +1,358 @@
+"""Opt-in timeline tracer that exports Chrome Trace Event JSON, viewable in Perfetto (https://ui.perfetto.dev) or
+chrome://tracing.
+
+Spans for step compute, output writes, logging, and queue waits are recorded with the process and thread IDs of the
+code that ran them.  Each process appends its events to its own file in a trace directory, so worker processes never
+contend for a shared file, and `export` merges them into one trace.  When tracing is disabled `span` returns a shared
+no-op context manager.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import atexit
+import glob
+import json
+import multiprocessing.util
+import os
+import shutil
+import threading
+import time
+
+
+# environment variable that enables tracing in processes started after `enable`, e.g. with the spawn start method
+TRACE_DIRECTORY_ENV = 'IM3PY_TRACE_DIRECTORY'
+
+# environment variable with the ID of the process that enabled tracing, inherited by the processes it starts
+COORDINATOR_ENV = 'IM3PY_TRACE_COORDINATOR'
+
+# file in the trace directory with the ID of the process that enabled tracing
+COORDINATOR_FILE = 'coordinator.pid'
+
+# span categories
+CATEGORY_COMPUTE = 'compute'
+CATEGORY_WRITE = 'write'
+CATEGORY_LOG = 'log'
+CATEGORY_WAIT = 'wait'
+CATEGORY_RUN = 'run'
+
+# number of buffered events that triggers an append to the process's event file
+FLUSH_EVENTS = 10000
+
+# tracer of this process; None when tracing is disabled
+_TRACER = None
+
+
+class _NullSpan:
+    """Context manager that does nothing; returned by `span` when tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Context manager that records a complete ('X') event from enter to exit."""
+
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        end = time.perf_counter()
+
+        self.tracer.record(self.name, self.category, self.start, end, self.args)
+
+        return False
+
+
+class Tracer:
+    """Buffer the trace events of this process and append them to '<trace_directory>/events_<pid>.jsonl'.
+
+    :param trace_directory:                     Full path to the directory holding the event file of each process
+    :type trace_directory:                      str
+
+    :param coordinator_pid:                     Optional.  ID of the process that enabled tracing; this process if None.
+    :type coordinator_pid:                      int
+
+    """
+
+    def __init__(self, trace_directory, coordinator_pid=None):
+
+        self.trace_directory = trace_directory
+        self.pid = os.getpid()
+        self.coordinator_pid = self.pid if coordinator_pid is None else coordinator_pid
+        self.events = []
+        self.lock = threading.Lock()
+
+        os.makedirs(trace_directory, exist_ok=True)
+
+    @property
+    def event_file(self):
+        """Full path to the event file of this process."""
+
+        return os.path.join(self.trace_directory, f"events_{self.pid}.jsonl")
+
+    def record(self, name, category, start, end, args=None):
+        """Record a complete event.  Times are `time.perf_counter` values, which share one monotonic clock across
+        processes on Linux.
+
+        :param name:                            Event name
+        :type name:                             str
+
+        :param category:                        Event category (e.g., 'compute', 'write', 'log', 'wait')
+        :type category:                         str
+
+        :param start:                           Start time in seconds
+        :type start:                            float
+
+        :param end:                             End time in seconds
+        :type end:                              float
+
+        :param args:                            Optional.  Dictionary of values shown with the event
+        :type args:                             dict
+
+        """
+
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start * 1e6, 'dur': (end - start) * 1e6,
+                 'pid': self.pid, 'tid': threading.get_ident()}
+
+        if args:
+            event['args'] = args
+
+        with self.lock:
+            self.events.append(event)
+            full = len(self.events) >= FLUSH_EVENTS
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered events to the event file of this process."""
+
+        with self.lock:
+            events, self.events = self.events, []
+
+        if not events:
+            return
+
+        with open(self.event_file, 'a') as out:
+            out.write(''.join(json.dumps(i) + '\n' for i in events))
+
+    def after_fork(self):
+        """Reset the tracer in a forked child; events inherited from the parent are the parent's to write."""
+
+        self.pid = os.getpid()
+        self.events = []
+        self.lock = threading.Lock()
+
+        # multiprocessing workers exit without running atexit handlers
+        multiprocessing.util.Finalize(self, self.flush, exitpriority=10)
+
+
+def enable(trace_directory, coordinator_pid=None):
+    """Enable tracing in this process and in the worker processes it starts.
+
+    :param trace_directory:                     Full path to the directory for the event files
+    :type trace_directory:                      str
+
+    :param coordinator_pid:                     Optional.  ID of the process that enabled tracing when this is a
+                                                worker it started; None if this process is the coordinator.
+    :type coordinator_pid:                      int
+
+    :return:                                    Tracer
+
+    """
+
+    global _TRACER
+
+    trace_directory = os.path.abspath(trace_directory)
+
+    if _TRACER is not None and _TRACER.trace_directory == trace_directory:
+        return _TRACER
+
+    if _TRACER is not None:
+        disable()
+
+    _TRACER = Tracer(trace_directory, coordinator_pid)
+
+    if coordinator_pid is None:
+        with open(os.path.join(trace_directory, COORDINATOR_FILE), 'w') as out:
+            out.write(str(_TRACER.coordinator_pid))
+
+    os.environ[TRACE_DIRECTORY_ENV] = trace_directory
+    os.environ[COORDINATOR_ENV] = str(_TRACER.coordinator_pid)
+
+    atexit.register(_TRACER.flush)
+    multiprocessing.util.register_after_fork(_TRACER, Tracer.after_fork)
+    multiprocessing.util.Finalize(_TRACER, _TRACER.flush, exitpriority=10)
+
+    return _TRACER
+
+
+def disable():
+    """Write the buffered events of this process and disable tracing."""
+
+    global _TRACER
+
+    if _TRACER is not None:
+        _TRACER.flush()
+        atexit.unregister(_TRACER.flush)
+
+    _TRACER = None
+    os.environ.pop(TRACE_DIRECTORY_ENV, None)
+    os.environ.pop(COORDINATOR_ENV, None)
+
+
+def is_enabled():
+    """True if tracing is enabled in this process."""
+
+    return _TRACER is not None
+
+
+def span(name, category=CATEGORY_COMPUTE, **args):
+    """Context manager that records the time spent in its block.
+
+    :param name:                                Event name
+    :type name:                                 str
+
+    :param category:                            Event category
+    :type category:                             str
+
+    :param args:                                Values shown with the event (e.g., `step=2015`)
+
+    Examples:
+
+        >>> from im3py import tracing
+        >>> with tracing.span('kernel', tracing.CATEGORY_COMPUTE, step=2015):
+        >>>     ...
+
+    """
+
+    if _TRACER is None:
+        return _NULL_SPAN
+
+    return _Span(_TRACER, name, category, args)
+
+
+def record(name, category, start, end=None, **args):
+    """Record an event whose start was measured elsewhere, e.g. by the process that queued a task; does nothing when
+    tracing is disabled.
+
+    :param name:                                Event name
+    :type name:                                 str
+
+    :param category:                            Event category
+    :type category:                             str
+
+    :param start:                               Start time from `time.perf_counter`
+    :type start:                                float
+
+    :param end:                                 Optional.  End time from `time.perf_counter`; now if None.
+    :type end:                                  float
+
+    :param args:                                Values shown with the event
+
+    """
+
+    if _TRACER is not None:
+        _TRACER.record(name, category, start, time.perf_counter() if end is None else end, args)
+
+
+def flush():
+    """Append the buffered events of this process to its event file; does nothing when tracing is disabled."""
+
+    if _TRACER is not None:
+        _TRACER.flush()
+
+
+def export(trace_file, trace_directory=None, clean=False):
+    """Merge the event files of all processes into one Chrome Trace Event JSON file.
+
+    :param trace_file:                          Full path with file name and extension of the JSON trace to write
+    :type trace_file:                           str
+
+    :param trace_directory:                     Optional.  Directory of the event files; defaults to the directory
+                                                of the enabled tracer.
+    :type trace_directory:                      str
+
+    :param clean:                               Remove the event files once they are merged
+    :type clean:                                bool
+
+    :return:                                    int; number of events written
+
+    """
+
+    if trace_directory is None:
+
+        if _TRACER is None:
+            raise RuntimeError("Tracing is not enabled; pass the `trace_directory` of the event files.")
+
+        trace_directory = _TRACER.trace_directory
+
+    flush()
+
+    events = []
+
+    for event_file in sorted(glob.glob(os.path.join(trace_directory, 'events_*.jsonl'))):
+        with open(event_file) as get:
+            events.extend(json.loads(line) for line in get if line.strip())
+
+    events.sort(key=lambda i: i['ts'])
+
+    # events are not a reliable guide to the coordinator; workers record events that started in the coordinator
+    try:
+        with open(os.path.join(trace_directory, COORDINATOR_FILE)) as get:
+            coordinator_pid = int(get.read())
+    except (OSError, ValueError):
+        coordinator_pid = None
+
+    # name each process in the timeline with the coordinator first
+    metadata = []
+    pids = sorted(dict.fromkeys(i['pid'] for i in events), key=lambda i: i != coordinator_pid)
+
+    for index, pid in enumerate(pids):
+        metadata.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                         'args': {'name': f"{'coordinator' if pid == coordinator_pid else 'worker'} {pid}"}})
+        metadata.append({'name': 'process_sort_index', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'sort_index': index}})
+
+    with open(trace_file, 'w') as out:
+        json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, out)
+
+    if clean:
+
+        if _TRACER is not None and _TRACER.trace_directory == os.path.abspath(trace_directory):
+            disable()
+
+        shutil.rmtree(trace_directory, ignore_errors=True)
+
+    return len(events)
+
+
+# tracing enabled by a parent process is inherited by processes started with spawn
+if os.environ.get(TRACE_DIRECTORY_ENV):
+    enable(os.environ[TRACE_DIRECTORY_ENV], int(os.environ.get(COORDINATOR_ENV) or os.getppid()))
@@ -0,0 +1,137 @@
+"""Per-step parameter trajectories resolved once against the time axis.
+
+A parameter may be given as a scalar, as an array with one value per step, or as a schedule of values at selected
+steps that is expanded with piecewise-constant ('step') or linear interpolation:
+
+    alpha_param:
+      schedule:
+        2015: 0.5
+        2030: 2.0
+      interpolation: linear
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import numpy as np
+
+
+SCHEDULE_KEY = 'schedule'
+INTERPOLATION_KEY = 'interpolation'
+
+INTERPOLATION_STEP = 'step'
+INTERPOLATION_LINEAR = 'linear'
+INTERPOLATIONS = (INTERPOLATION_STEP, INTERPOLATION_LINEAR)
+
+
+def is_scalar(value):
+    """True if a parameter value is a single number rather than a trajectory or schedule."""
+
+    return np.ndim(value) == 0 and not isinstance(value, dict)
+
+
+def expand_schedule(schedule, time_axis, interpolation=INTERPOLATION_STEP):
+    """Expand a schedule of values at selected steps to one value per step of the time axis.  Steps before the
+    first scheduled step take the first value and steps after the last scheduled step take the last value.
+
+    :param schedule:                            Dictionary of step to value
+    :type schedule:                             dict
+
+    :param time_axis:                           Time axis of the run
+    :type time_axis:                            TimeAxis
+
+    :param interpolation:                       'step' to hold each value until the next scheduled step, or
+                                                'linear' to interpolate linearly in time between scheduled steps
+    :type interpolation:                        str
+
+    :return:                                    numpy.ndarray
+
+    """
+
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Interpolation '{interpolation}' is not one of:  {INTERPOLATIONS}")
+
+    if len(schedule) == 0:
+        raise ValueError("A parameter schedule must contain at least one step.")
+
+    steps = np.array([time_axis.to_datetime64(k, time_axis.unit) for k in schedule],
+                     dtype=time_axis.values.dtype).astype(np.int64)
+    values = np.array([float(v) for v in schedule.values()], dtype=np.float64)
+
+    order = np.argsort(steps)
+    steps = steps[order]
+    values = values[order]
+
+    axis = time_axis.values.astype(np.int64)
+
+    if interpolation == INTERPOLATION_LINEAR:
+        return np.interp(axis, steps, values)
+
+    index = np.searchsorted(steps, axis, side='right') - 1
+
+    return values[np.clip(index, 0, None)]
+
+
+def resolve_trajectory(value, time_axis):
+    """Resolve a parameter value to one value per step of the time axis.
+
+    :param value:                               Scalar, sequence with one value per step, or a dictionary with a
+                                                'schedule' and an optional 'interpolation'
+    :type value:                                float; list; numpy.ndarray; dict
+
+    :param time_axis:                           Time axis of the run
+    :type time_axis:                            TimeAxis
+
+    :return:                                    numpy.ndarray
+
+    """
+
+    if isinstance(value, dict):
+
+        if SCHEDULE_KEY not in value:
+            raise ValueError(f"A parameter schedule must have a '{SCHEDULE_KEY}' key; received keys {list(value)}.")
+
+        return expand_schedule(value[SCHEDULE_KEY], time_axis, value.get(INTERPOLATION_KEY, INTERPOLATION_STEP))
+
+    try:
+        trajectory = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise TypeError(f"Parameter value '{value}' is not a float or a sequence of floats.")
+
+    if trajectory.ndim == 0:
+        return np.full(len(time_axis), float(trajectory))
+
+    if trajectory.shape != (len(time_axis),):
+        raise ValueError(f"Parameter trajectory has shape {trajectory.shape}; expected one value for each of the "
+                         f"{len(time_axis)} steps.")
+
+    return trajectory
+
+
+def validate_trajectory_range(trajectory, min_value, max_value):
+    """Check every value of a trajectory against the acceptable range in one vectorized operation.
+
+    :param trajectory:                          Parameter value for each step
+    :type trajectory:                           numpy.ndarray
+
+    :param min_value:                           Minimum acceptable value
+    :type min_value:                            float
+
+    :param max_value:                           Maximum acceptable value
+    :type max_value:                            float
+
+    :return:                                    numpy.ndarray
+
+    """
+
+    invalid = ~((trajectory >= min_value) & (trajectory <= max_value))
+
+    if invalid.any():
+        index = int(np.argmax(invalid))
+        raise ValueError(f"Parameter value '{trajectory[index]}' at step index {index} is not within the valid range "
+                         f"of {min_value} - {max_value}.  {int(invalid.sum())} value(s) out of range.")
+
+    return trajectory
@@ -0,0 +1,606 @@
+"""Work queue on a shared file system for running ensembles across nodes without a network service or MPI.
+
+A coordinator writes the resolved parameters of each run as a spec into a queue directory:
+
+    <queue>/specs/<id>.json       resolved `ReadConfig` parameters of a run
+    <queue>/leases/<id>.lease     claim of a worker; its modification time is the worker's heartbeat
+    <queue>/done/<id>.json        record of a completed run with its per-step values
+    <queue>/failed/<id>.json      record of a failed run with its error
+
+Any number of workers on any node that mounts the queue claim specs by publishing a lease with a hard link, which
+either creates the lease or fails if another worker holds it.  Workers touch their lease while the run is going and
+leases that are not touched for `lease_timeout` seconds are reclaimed by the next worker that finds them, so the
+runs of workers that die are picked up again.
+
+:author:   Chris R. Vernon
+:email:    chris.vernon@pnnl.gov
+
+License:  BSD 2-Clause, see LICENSE and DISCLAIMER files
+
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import im3py.tracing as tracing
+from im3py.model import Model
+from im3py.output_writer import atomic_write, write_temp
+from im3py.read_config import ReadConfig
+from im3py.scenarios import ScenarioFile
+
+
+SPECS_DIRECTORY = 'specs'
+LEASES_DIRECTORY = 'leases'
+DONE_DIRECTORY = 'done'
+FAILED_DIRECTORY = 'failed'
+
+SPEC_EXTENSION = '.json'
+LEASE_EXTENSION = '.lease'
+
+# states of a spec
+STATE_PENDING = 'pending'
+STATE_LEASED = 'leased'
+STATE_STALE = 'stale'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATES = (STATE_PENDING, STATE_LEASED, STATE_STALE, STATE_DONE, STATE_FAILED)
+
+
+def worker_name():
+    """Name of this worker process that is unique across the nodes sharing a queue."""
+
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def publish(path, data):
+    """Create a file with its complete content only if it does not exist yet.
+
+    The content is written to a temporary file that is hard linked to the target, so the target either appears
+    complete or the link fails because another process created it first.
+
+    :param path:                                Full path to the file
+    :type path:                                 str
+
+    :param data:                                Content of the file
+    :type data:                                 bytes
+
+    :return:                                    bool; True if this call created the file
+
+    """
+
+    temp = write_temp(path, data)
+
+    try:
+        os.link(temp, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp)
+
+
+def read_json(path):
+    """Read a JSON file; None if it does not exist or has been replaced while reading."""
+
+    try:
+        with open(path) as get:
+            return json.load(get)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class Lease:
+    """A claim on a spec that is kept alive by a heartbeat thread touching the lease file.
+
+    :param path:                                Full path to the lease file
+    :type path:                                 str
+
+    :param token:                               Unique token written into the lease file by its owner
+    :type token:                                str
+
+    :param heartbeat_interval:                  Seconds between heartbeats
+    :type heartbeat_interval:                   float
+
+    """
+
+    # reads of the lease file before it is treated as unreadable, and the seconds between them
+    READ_ATTEMPTS = 5
+    READ_RETRY_SECONDS = 0.05
+
+    def __init__(self, path, token, heartbeat_interval):
+
+        self.path = path
+        self.token = token
+        self.heartbeat_interval = heartbeat_interval
+
+        # set when the lease was reclaimed by another worker while it was held
+        self.lost = False
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+
+        self._thread = threading.Thread(target=self._beat, name=f"heartbeat {os.path.basename(self.path)}",
+                                        daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        self.release()
+
+    def _beat(self):
+
+        while not self._stop.wait(self.heartbeat_interval):
+            self.heartbeat()
+
+    def read_token(self):
+        """Token in the lease file; None if it cannot be read after `READ_ATTEMPTS` tries.  The file is briefly
+        missing while another worker checks whether it is stale, so a single failed read proves nothing."""
+
+        for attempt in range(self.READ_ATTEMPTS):
+
+            if attempt:
+                time.sleep(self.READ_RETRY_SECONDS)
+
+            content = read_json(self.path)
+
+            if content is not None:
+                return content.get('token')
+
+        return None
+
+    def is_owner(self):
+        """True if the lease file still holds the token of this lease."""
+
+        return self.read_token() == self.token
+
+    def heartbeat(self):
+        """Touch the lease file so that other workers see it is alive.  The lease is lost only once the lease file
+        holds the token of another worker."""
+
+        token = self.read_token()
+
+        if token is not None and token != self.token:
+
+            if not self.lost:
+                logging.warning(f"Lease '{self.path}' was reclaimed by another worker.")
+
+            self.lost = True
+            return
+
+        # the next heartbeat tries again if the file could not be read or was moved aside in the meantime
+        if token is not None:
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                pass
+
+    def release(self):
+        """Stop the heartbeat and remove the lease file if it is still owned by this lease."""
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if not self.lost and self.is_owner():
+            os.remove(self.path)
+
+
+class WorkQueue:
+    """A queue of model runs in a directory on a shared file system.
+
+    :param queue_directory:                     Full path to the queue directory; created if it does not exist
+    :type queue_directory:                      str
+
+    :param lease_timeout:                       Seconds without a heartbeat after which a lease is stale and may be
+                                                reclaimed by another worker.  Clocks of the nodes sharing the queue
+                                                must agree to well within this time.
+    :type lease_timeout:                        float
+
+    :param heartbeat_interval:                  Optional.  Seconds between heartbeats; a quarter of `lease_timeout`
+                                                if None.
+    :type heartbeat_interval:                   float
+
+    Examples:
+
+        >>> from im3py.work_queue import WorkQueue
+        >>> queue = WorkQueue("<shared queue directory>")
+        >>> queue.submit_config("<path to config file>")
+        >>> # on each node:  im3py worker <shared queue directory>
+        >>> results = queue.wait()
+
+    """
+
+    def __init__(self, queue_directory, lease_timeout=60.0, heartbeat_interval=None):
+
+        self.queue_directory = os.path.abspath(queue_directory)
+        self.lease_timeout = float(lease_timeout)
+        self.heartbeat_interval = self.lease_timeout / 4 if heartbeat_interval is None else float(heartbeat_interval)
+
+        if self.heartbeat_interval >= self.lease_timeout:
+            raise ValueError(f"`heartbeat_interval` ({self.heartbeat_interval}) must be less than `lease_timeout` "
+                             f"({self.lease_timeout}).")
+
+        for directory in (SPECS_DIRECTORY, LEASES_DIRECTORY, DONE_DIRECTORY, FAILED_DIRECTORY):
+            os.makedirs(os.path.join(self.queue_directory, directory), exist_ok=True)
+
+    def __repr__(self):
+
+        return f"WorkQueue('{self.queue_directory}')"
+
+    def path(self, directory, task_id, extension=SPEC_EXTENSION):
+        """Full path to the file of a task in one of the queue directories."""
+
+        return os.path.join(self.queue_directory, directory, f"{task_id}{extension}")
+
+    def task_ids(self):
+        """Ids of all submitted specs in submission order."""
+
+        directory = os.path.join(self.queue_directory, SPECS_DIRECTORY)
+
+        return sorted(i[:-len(SPEC_EXTENSION)] for i in os.listdir(directory) if i.endswith(SPEC_EXTENSION))
+
+    def submit(self, parameters, task_id=None):
+        """Write the spec of a run into the queue.
+
+        :param parameters:                      Keyword arguments for `Model`, usually `ReadConfig.resolved_parameters`
+        :type parameters:                       dict
+
+        :param task_id:                         Optional.  Id of the spec; the next free 'task_<n>' if None.
+        :type task_id:                          str
+
+        :return:                                str; id of the spec
+
+        """
+
+        spec = {'parameters': ReadConfig.serializable_parameters(parameters), 'submitted': time.time()}
+
+        if task_id is not None:
+
+            if not publish(self.path(SPECS_DIRECTORY, task_id), json.dumps(dict(spec, id=task_id)).encode('utf-8')):
+                raise FileExistsError(f"A spec with id '{task_id}' is already in queue '{self.queue_directory}'.")
+
+            return task_id
+
+        # ids are claimed like leases so that several coordinators may submit to one queue
+        index = len(self.task_ids())
+
+        while True:
+
+            task_id = f"task_{index:06d}"
+
+            if publish(self.path(SPECS_DIRECTORY, task_id), json.dumps(dict(spec, id=task_id)).encode('utf-8')):
+                return task_id
+
+            index += 1
+
+    def submit_config(self, config_file, scenario=None):
+        """Write the spec of a configuration file, or one scenario of a multi-scenario file, into the queue.
+
+        :return:                                str; id of the spec
+
+        """
+
+        if scenario is None:
+            config = ReadConfig(config_file=config_file)
+        else:
+            config = ScenarioFile(config_file).read_config(scenario)
+
+        return self.submit(config.resolved_parameters)
+
+    def submit_ensemble(self, ensemble):
+        """Write the spec of each member of an `Ensemble` into the queue with ids 'member_<n>'.
+
+        :return:                                list; ids of the specs
+
+        """
+
+        width = len(str(max(len(ensemble) - 1, 0)))
+
+        return [self.submit(dict(ensemble.member_parameters(i), write_logfile=False),
+                            task_id=f"{ensemble.MEMBER_DIR_PREFIX}{i:0{width}d}") for i in range(len(ensemble))]
+
+    def spec(self, task_id):
+        """Content of a spec."""
+
+        return read_json(self.path(SPECS_DIRECTORY, task_id))
+
+    def lease_age(self, task_id):
+        """Seconds since the last heartbeat of the lease on a spec; None if it is not leased."""
+
+        try:
+            return time.time() - os.stat(self.path(LEASES_DIRECTORY, task_id, LEASE_EXTENSION)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def state(self, task_id):
+        """State of a spec:  'pending', 'leased', 'stale', 'done', or 'failed'."""
+
+        if os.path.exists(self.path(DONE_DIRECTORY, task_id)):
+            return STATE_DONE
+
+        if os.path.exists(self.path(FAILED_DIRECTORY, task_id)):
+            return STATE_FAILED
+
+        age = self.lease_age(task_id)
+
+        if age is None:
+            return STATE_PENDING
+
+        return STATE_STALE if age > self.lease_timeout else STATE_LEASED
+
+    def status(self):
+        """Number of specs in each state.
+
+        :return:                                dict
+
+        """
+
+        counts = dict.fromkeys(STATES, 0)
+
+        for task_id in self.task_ids():
+            counts[self.state(task_id)] += 1
+
+        return counts
+
+    def is_finished(self):
+        """True if every spec is done or failed."""
+
+        return all(self.state(i) in (STATE_DONE, STATE_FAILED) for i in self.task_ids())
+
+    def reclaim(self, task_id, worker):
+        """Remove a stale lease so that the spec can be claimed again.
+
+        The stale lease is renamed aside, which only one worker can do.  If a fresh lease was created between the
+        check and the rename, it is linked back into place.
+
+        :return:                                bool; True if this worker removed the stale lease
+
+        """
+
+        lease_file = self.path(LEASES_DIRECTORY, task_id, LEASE_EXTENSION)
+        stale = read_json(lease_file)
+        aside = f"{lease_file}.{uuid.uuid4().hex}.stale"
+
+        try:
+            os.rename(lease_file, aside)
+        except FileNotFoundError:
+            return False
+
+        moved = read_json(aside)
+
+        if stale is None or moved is None or moved.get('token') != stale.get('token'):
+
+            try:
+                os.link(aside, lease_file)
+            except FileExistsError:
+                pass
+
+            os.remove(aside)
+
+            return False
+
+        os.remove(aside)
+
+        logging.warning(f"Worker {worker} reclaimed the stale lease of '{task_id}' held by {stale.get('worker')}")
+
+        return True
+
+    def claim(self, worker=None):
+        """Claim the first spec that is not done, failed, or held by a live lease.
+
+        :param worker:                          Optional.  Name of the claiming worker; this process if None.
+        :type worker:                           str
+
+        :return:                                (task id, Lease) or None if there is nothing to claim
+
+        """
+
+        worker = worker_name() if worker is None else worker
+
+        for task_id in self.task_ids():
+
+            state = self.state(task_id)
+
+            if state == STATE_STALE:
+                self.reclaim(task_id, worker)
+
+            elif state != STATE_PENDING:
+                continue
+
+            token = uuid.uuid4().hex
+            lease_file = self.path(LEASES_DIRECTORY, task_id, LEASE_EXTENSION)
+            content = json.dumps({'worker': worker, 'token': token, 'claimed': time.time()}).encode('utf-8')
+
+            if not publish(lease_file, content):
+                continue
+
+            lease = Lease(lease_file, token, self.heartbeat_interval)
+
+            # the spec may have finished between the state check and the claim
+            if self.state(task_id) in (STATE_DONE, STATE_FAILED):
+                lease.release()
+                continue
+
+            return task_id, lease
+
+        return None
+
+    def complete(self, task_id, record, failed=False):
+        """Write the record of a finished spec."""
+
+        directory = FAILED_DIRECTORY if failed else DONE_DIRECTORY
+
+        atomic_write(self.path(directory, task_id), json.dumps(record).encode('utf-8'))
+
+    def run_task(self, task_id, worker=None, kernel_backend='auto', lease=None):
+        """Run the model of a claimed spec and write its done or failed record.  Specs that cannot be read are
+        recorded as failed.
+
+        :param lease:                           Optional.  Lease held on the spec; if it was lost to another worker by
+                                                the time the run finishes, no record is written.
+        :type lease:                            Lease
+
+        :return:                                dict; record of the run, or None if the lease was lost
+
+        """
+
+        record = {'id': task_id, 'worker': worker_name() if worker is None else worker, 'status': STATE_DONE,
+                  'steps': 0, 'seconds': 0.0, 'values': [], 'error': ''}
+
+        td = time.perf_counter()
+
+        try:
+            spec = self.spec(task_id)
+
+            if spec is None or not isinstance(spec.get('parameters'), dict):
+                raise ValueError(f"Spec '{task_id}' is missing or has no parameters.")
+
+            parameters = spec['parameters']
+
+            Model.make_dir(parameters[ReadConfig.OUT_DIR_KEY])
+
+            run = Model(kernel_backend=kernel_backend, **parameters)
+
+            # a failed run must not leave its log handlers and writer to the next task of this worker
+            try:
+                run.initialize()
+                values = [run.advance_step() for _ in range(len(run.step_list))]
+            finally:
+                run.close()
+
+            record['steps'] = len(values)
+            record['values'] = np.asarray(values, dtype=np.float64).tolist()
+
+        except Exception as e:
+            record['status'] = STATE_FAILED
+            record['error'] = repr(e)
+            logging.error(f"Task '{task_id}' failed:  {e!r}")
+
+        record['seconds'] = time.perf_counter() - td
+
+        # the spec belongs to the worker that reclaimed it; its record is that worker's to write
+        if lease is not None:
+            lease.heartbeat()
+
+            if lease.lost:
+                logging.warning(f"Discarding the record of '{task_id}'; its lease was reclaimed by another worker.")
+                return None
+
+        self.complete(task_id, record, failed=record['status'] == STATE_FAILED)
+
+        return record
+
+    def run_worker(self, max_tasks=None, wait=False, poll_interval=1.0, kernel_backend='auto'):
+        """Claim and run specs until there is nothing left to claim.
+
+        :param max_tasks:                       Optional.  Stop after running this many specs.
+        :type max_tasks:                        int
+
+        :param wait:                            Keep polling until every spec is done or failed, so that the specs of
+                                                workers that die are reclaimed once their leases are stale.  If
+                                                False, stop as soon as no spec can be claimed.
+        :type wait:                             bool
+
+        :param poll_interval:                   Seconds between polls while waiting
+        :type poll_interval:                    float
+
+        :param kernel_backend:                  Backend used to run the step kernels
+        :type kernel_backend:                   str
+
+        :return:                                list; records of the specs run by this worker, without those whose
+                                                leases were lost
+
+        """
+
+        worker = worker_name()
+        records = []
+        n_tasks = 0
+
+        while max_tasks is None or n_tasks < max_tasks:
+
+            with tracing.span('claim', tracing.CATEGORY_WAIT):
+                claimed = self.claim(worker)
+
+            if claimed is None:
+
+                if not wait or self.is_finished():
+                    break
+
+                with tracing.span('poll', tracing.CATEGORY_WAIT):
+                    time.sleep(poll_interval)
+
+                continue
+
+            task_id, lease = claimed
+
+            logging.info(f"Worker {worker} claimed '{task_id}'")
+
+            with lease:
+                record = self.run_task(task_id, worker, kernel_backend, lease)
+
+            n_tasks += 1
+
+            if record is not None:
+                records.append(record)
+
+            tracing.flush()
+
+        return records
+
+    def results(self):
+        """Records of all finished specs.
+
+        :return:                                pandas.DataFrame; one row per finished spec
+
+        """
+
+        records = []
+
+        for task_id in self.task_ids():
+            for directory in (DONE_DIRECTORY, FAILED_DIRECTORY):
+                record = read_json(self.path(directory, task_id))
+
+                if record is not None:
+                    records.append(record)
+
+        columns = ['id', 'worker', 'status', 'steps', 'seconds', 'values', 'error']
+
+        return pd.DataFrame.from_records(records, columns=columns)
+
+    def wait(self, timeout=None, poll_interval=1.0):
+        """Wait until every spec is done or failed.
+
+        :param timeout:                         Optional.  Seconds to wait before raising `TimeoutError`.
+        :type timeout:                          float
+
+        :param poll_interval:                   Seconds between polls
+        :type poll_interval:                    float
+
+        :return:                                pandas.DataFrame; records of all specs
+
+        """
+
+        td = time.time()
+
+        while not self.is_finished():
+
+            if timeout is not None and time.time() - td > timeout:
+                raise TimeoutError(f"Queue '{self.queue_directory}' did not finish in {timeout} s:  {self.status()}")
+
+            time.sleep(poll_interval)
+
+        return self.results()
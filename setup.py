@@ -31,5 +31,8 @@ setup(
     description='A template Python model for IM3.',
     long_description=readme(),
     python_requires='>=3.6.*, <4',
-    install_requires=get_requirements()
+    install_requires=get_requirements(),
+    entry_points={
+        'console_scripts': ['im3py = im3py.cli:main']
+    }
 )